@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""compact year-partitioned store for alpha artifacts"""
+
+import datetime as dt
+import polars as pl
+from pathlib import Path
+
+from src.panel import sort_panel
+
+# raw columns kept next to a signal's own columns, enough for the backtests, analytics and plots
+ALPHA_COLUMNS = ["date", "barrid", "return", "specific_risk", "predicted_beta"]
+
+def alpha_columns(signal_name: str) -> list:
+    """columns of a signal's alpha artifact"""
+    return [*ALPHA_COLUMNS, signal_name, f"{signal_name}_score", f"{signal_name}_alpha"]
+
+def write_alpha_artifact(alpha_data: pl.DataFrame | pl.LazyFrame, signal_name: str, path: str) -> list:
+    """
+    One zstd parquet file per year under path, floats as Float32 and barrid dictionary encoded
+    Rows stay in barrid, date order within each year, returns the files written
+    Columns of alpha_columns missing from the data are skipped
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    data = alpha_data.lazy()
+    schema = data.collect_schema()
+    date = pl.col('date').str.to_date() if schema['date'] == pl.String else pl.col('date').cast(pl.Date)
+    data = data.select(
+        name for name in alpha_columns(signal_name) if name in schema
+    ).with_columns(
+        date,
+        pl.col('barrid').cast(pl.Categorical),
+        pl.col(pl.Float64).cast(pl.Float32)
+    ).collect()
+
+    files = []
+    for (year,), year_data in data.with_columns(pl.col('date').dt.year().alias('year')).partition_by(
+        'year', as_dict=True, maintain_order=True, include_key=False
+    ).items():
+        year_file = path / f"year={year}.parquet"
+        tmp_file = year_file.with_suffix(".parquet.tmp")
+        year_data.write_parquet(tmp_file, compression="zstd", statistics=True)
+        tmp_file.replace(year_file)
+        files.append(year_file)
+
+    # years of an earlier artifact at the same path that this one does not cover
+    for stale in set(path.glob("year=*.parquet")) - set(files):
+        stale.unlink()
+
+    total_mb = sum(f.stat().st_size for f in files) / 1e6
+    print(f"alpha artifact: {len(data)} rows in {len(files)} files, {total_mb:.1f} MB")
+    return files
+
+def scan_alpha_artifact(
+    path: str,
+    start: dt.date | None = None,
+    end: dt.date | None = None,
+    columns: list | None = None
+) -> pl.LazyFrame:
+    """
+    Lazy scan of an artifact written by write_alpha_artifact
+    Year files outside [start, end] are never opened, inside them the date filter and the
+    column selection are pushed down to the parquet row groups
+    """
+    files = sorted(Path(path).glob("year=*.parquet"))
+    first_year = start.year if start is not None else None
+    last_year = end.year if end is not None else None
+    files = [
+        f for f in files
+        if (first_year is None or _year(f) >= first_year) and (last_year is None or _year(f) <= last_year)
+    ]
+    if not files:
+        raise FileNotFoundError(f"no alpha artifact files in {path} for {start} to {end}")
+
+    data = pl.scan_parquet(files)
+    if start is not None:
+        data = data.filter(pl.col('date') >= start)
+    if end is not None:
+        data = data.filter(pl.col('date') <= end)
+    if columns is not None:
+        data = data.select(columns)
+    return data
+
+def read_alpha_artifact(
+    path: str,
+    start: dt.date | None = None,
+    end: dt.date | None = None,
+    columns: list | None = None
+) -> pl.DataFrame:
+    """the scanned artifact collected, in barrid, date order like the computed alphas"""
+    data = scan_alpha_artifact(path, start, end, columns).collect()
+    if {'date', 'barrid'} <= set(data.columns):
+        data = sort_panel(data, "asset")
+    return data
+
+def _year(year_file: Path) -> int:
+    return int(year_file.stem.removeprefix("year="))
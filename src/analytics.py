@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""signal analytics: rank IC by horizon, IC decay, quantile returns and turnover"""
+
+import polars as pl
+from pathlib import Path
+
+from src.panel import PANEL_ORDERS, is_sorted_panel
+
+HORIZONS = [1, 5, 22]
+TABLES = ["ic", "ic_decay", "quantile_returns", "turnover"]
+
+def compute_signal_analytics(
+    alpha_data: pl.DataFrame | pl.LazyFrame,
+    signal_name: str,
+    horizons: list = HORIZONS,
+    n_quantiles: int = 5
+) -> dict:
+    """
+    All tables come out of one group_by over (date, quantile)
+    Forward returns compound each barrid's own 'return' over its next h rows
+    The rank IC of a date is rebuilt from the per-quantile sums of the ranks
+    Turnover is the share of a quantile's names that were not in it the previous date
+    """
+    alpha = f"{signal_name}_alpha"
+
+    data = alpha_data.lazy().select(
+        'date',
+        pl.col('barrid').cast(pl.String),
+        pl.col(alpha).cast(pl.Float64).alias('alpha'),
+        pl.col('return').cast(pl.Float64)
+    )
+    # alphas straight from compute_alphas are already in asset order
+    if not (isinstance(alpha_data, pl.DataFrame) and is_sorted_panel(alpha_data, "asset")):
+        data = data.sort(PANEL_ORDERS["asset"])
+    data = data.with_columns(
+        # log growth to date, an h-day forward return is the difference of two of them
+        pl.col('return').log1p().cum_sum().over('barrid').alias('growth')
+    ).with_columns(
+        [
+            ((pl.col('growth').shift(-h) - pl.col('growth')).exp() - 1).over('barrid').alias(f'fwd_{h}')
+            for h in horizons
+        ]
+    ).filter(
+        # forward returns are built on every row first, rows without an alpha are only dropped now
+        pl.col('alpha').is_not_null()
+    ).with_columns(
+        ((pl.col('alpha').rank('ordinal').over('date') - 1) * n_quantiles
+         // pl.len().over('date')).cast(pl.Int8).alias('quantile')
+    ).with_columns(
+        pl.col('quantile').shift(1).over('barrid').alias('previous_quantile')
+    )
+
+    # ranks are taken over the rows that have both the alpha and the forward return
+    ranks = []
+    for h in horizons:
+        fwd = pl.col(f'fwd_{h}')
+        ranks.extend([
+            pl.when(fwd.is_not_null()).then(pl.col('alpha')).rank().over('date').alias(f'x_{h}'),
+            fwd.rank().over('date').alias(f'y_{h}'),
+        ])
+    data = data.with_columns(ranks)
+
+    sums = []
+    for h in horizons:
+        x, y = pl.col(f'x_{h}'), pl.col(f'y_{h}')
+        sums.extend([
+            x.count().alias(f'n_{h}'),
+            x.sum().alias(f'sx_{h}'),
+            y.sum().alias(f'sy_{h}'),
+            (x * y).sum().alias(f'sxy_{h}'),
+            (x * x).sum().alias(f'sxx_{h}'),
+            (y * y).sum().alias(f'syy_{h}'),
+        ])
+
+    # the single pass over the panel, everything below works on dates x quantiles rows
+    stats = data.group_by(['date', 'quantile']).agg(
+        pl.len().alias('count'),
+        *[pl.col(f'fwd_{h}').mean().alias(f'return_{h}') for h in horizons],
+        # names entering the panel count as new to their quantile
+        (pl.col('previous_quantile') != pl.col('quantile')).fill_null(True).mean().alias('turnover'),
+        *sums
+    ).sort(['date', 'quantile']).collect()
+
+    ic = stats.group_by('date').agg(
+        pl.col(f'{stat}_{h}').sum() for h in horizons for stat in ['n', 'sx', 'sy', 'sxy', 'sxx', 'syy']
+    ).select(
+        'date', *[_pearson_from_sums(h).alias(str(h)) for h in horizons]
+    ).unpivot(
+        index='date', variable_name='horizon', value_name='ic'
+    ).with_columns(
+        pl.col('horizon').cast(pl.Int16)
+    ).drop_nulls('ic').sort(['horizon', 'date'])
+
+    ic_decay = ic.group_by('horizon').agg(
+        pl.col('ic').mean().alias('mean_ic'),
+        pl.col('ic').std().alias('std_ic'),
+        (pl.col('ic').mean() / pl.col('ic').std()).alias('ic_ir'),
+        (pl.col('ic') > 0).mean().alias('hit_rate'),
+        pl.len().alias('n_dates')
+    ).sort('horizon')
+
+    quantile_returns = stats.unpivot(
+        index=['date', 'quantile', 'count'],
+        on=[f'return_{h}' for h in horizons],
+        variable_name='horizon',
+        value_name='return'
+    ).with_columns(
+        pl.col('horizon').str.strip_prefix('return_').cast(pl.Int16)
+    ).select('date', 'horizon', 'quantile', 'count', 'return').sort(['horizon', 'date', 'quantile'])
+
+    turnover = stats.select('date', 'quantile', 'turnover')
+
+    return {
+        "ic": ic,
+        "ic_decay": ic_decay,
+        "quantile_returns": quantile_returns,
+        "turnover": turnover,
+    }
+
+def _pearson_from_sums(h: int) -> pl.Expr:
+    """correlation of x and y from their count, sums and sums of products"""
+    n = pl.col(f'n_{h}')
+    sx, sy = pl.col(f'sx_{h}'), pl.col(f'sy_{h}')
+    cov = pl.col(f'sxy_{h}') - sx * sy / n
+    var_x = pl.col(f'sxx_{h}') - sx * sx / n
+    var_y = pl.col(f'syy_{h}') - sy * sy / n
+    return pl.when((n > 2) & (var_x > 0) & (var_y > 0)).then(cov / (var_x * var_y).sqrt())
+
+def write_signal_analytics(analytics: dict, path: str):
+    """one compact parquet file per table, floats stored as Float32"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    for name, table in analytics.items():
+        table.with_columns(
+            pl.col(pl.Float64).cast(pl.Float32)
+        ).write_parquet(path / f"{name}.parquet", compression="zstd")
+
+def read_signal_analytics(path: str) -> dict:
+    """tables written by write_signal_analytics"""
+    return {name: pl.read_parquet(Path(path) / f"{name}.parquet") for name in TABLES}
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""content-addressed cache for pipeline stage outputs"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+# hashed into every key, bump it when a code change alters what the stages produce
+CACHE_VERSION = 1
+
+# config keys that change how a stage runs but not what it produces
+NON_SEMANTIC_KEYS = {
+    "cache_path", "lazy", "sink_path",
+    "n_cpus", "checkpoint_every", "memory_budget_gb", "max_in_flight", "executor",
+    "risk_model_path",
+}
+
+
+def stage_key(sections: dict, upstream: str | None = None) -> str:
+    """
+    Hash of the config sections a stage depends on plus its upstream artifact key and CACHE_VERSION
+    Changing an upstream section changes every key below it
+    """
+    payload = json.dumps(
+        {"sections": _strip(sections), "upstream": upstream, "version": CACHE_VERSION},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def artifact_path(cache_root: str, stage: str, key: str) -> Path:
+    """location of a stage artifact"""
+    return Path(cache_root) / stage / f"{key}.parquet"
+
+
+def cached_stage(
+    cache_root: str | None,
+    stage: str,
+    key: str,
+    compute: Callable[[], pl.DataFrame],
+    force: bool = False,
+) -> pl.DataFrame:
+    """
+    Return the cached artifact for (stage, key) or compute and store it
+    With no cache_root the stage is always computed and nothing is written
+    """
+    if cache_root is None:
+        return compute()
+
+    path = artifact_path(cache_root, stage, key)
+
+    if path.exists() and not force:
+        print(f"[{stage}] using cached artifact {key}")
+        return pl.read_parquet(path)
+
+    frame = compute()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".parquet.tmp")
+    frame.write_parquet(tmp_path)
+    tmp_path.replace(path)
+    print(f"[{stage}] cached artifact {key}")
+
+    return frame
+
+
+def _strip(value):
+    """drop non-semantic keys at any depth"""
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in NON_SEMANTIC_KEYS}
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    return value
@@ -2,12 +2,82 @@
 """MVO backtesting engine"""
 
 import polars as pl
-import sf_quant.backtester as sfb
+import sf_quant.data as sfd
 import sf_quant.optimizer as sfo
+import datetime as dt
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from src.factor_solver import NATIVE_CONSTRAINTS, align_warm_start, solve_mvo_gammas
+from src.panel import DateIndex, sort_panel
+from src.risk_model import RiskModelStore, load_factor_model, open_risk_model
+from src.solve_log import SOLVE_COLUMNS, SOLVED, print_solve_summary, solve_frame, write_solve_log
+from src.telemetry import rss_bytes
+
+# bytes held per row of the per-date slice sent to a worker (date, barrid, alpha, beta)
+SLICE_BYTES_PER_ROW = 48
+# the optimizer works on a dense N x N covariance, with cvxpy keeping a few copies of it
+SOLVE_COPIES = 4
+# polars is not fork-safe, local worker processes are spawned
+MP_CONTEXT = "spawn"
+EXECUTORS = ["ray", "processes"]
+SOLVERS = ["sf_quant", "native"]
+# statuses of sf_quant solves that give no usable weights, its optimizer hides cvxpy's status
+# and hands back weights.value, which is None when the problem is infeasible or unbounded
+NO_SOLUTION = "no solution (infeasible or unbounded)"
+NON_FINITE = "non-finite weights"
+# calendar rebalance frequencies, an integer n means every n trading days
+REBALANCE_PERIODS = {"weekly": "1w", "monthly": "1mo"}
+
+def run_mvo_backtest(
+    alpha_data: pl.DataFrame,
+    signal_name: str,
+    constraints: list,
+    gamma: float | list,
+    n_cpus: int,
+    checkpoint_dir: str | None = None,
+    checkpoint_every: int = 250,
+    memory_budget_gb: float | None = None,
+    max_in_flight: int | None = None,
+    executor: str = "ray",
+    solver: str = "sf_quant",
+    risk_model_path: str | None = None,
+    rebalance: str | int = "daily",
+    solve_log_path: str | None = None
+) -> pl.DataFrame:
+    """
+    run MVO backtest on alpha data
+    Dates are split into chunks sized to memory_budget_gb and at most
+    max_in_flight chunks are solved at once, each worker only sees its slice
+    executor picks where chunks run: "ray" or "processes" (local pool, no cluster startup)
+    solver "native" solves on the factor model directly, warm-started from the previous date
+    With risk_model_path set, risk models are read from (and added to) the local store
+    rebalance ("daily", "weekly", "monthly" or every n days) limits solves to rebalance dates,
+    weights drift with the 'return' column on the dates in between
+    A list of gammas is solved in one pass, each date's risk model is built once for all of them,
+    and the weights get a 'gamma' column
+    With checkpoint_dir set, each finished chunk is written to disk
+    and a rerun skips the dates that are already there
+    Every solved date is logged with its universe, non-null alphas, setup and solve time,
+    iterations, solver status and the worker's memory, see solve_log.py; the log is written
+    under solve_log_path when given and the slowest dates are printed
+    A solve that does not reach SOLVED (infeasible, iteration limit, no or non-finite weights) is
+    logged with its status and gives its date no weights, the backtest carries on with the next date
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"unknown executor: {executor}")
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver: {solver}")
+    if isinstance(gamma, list) and not gamma:
+        raise ValueError("gamma list is empty")
+    if solver == "native":
+        unsupported = [name for name in constraints if name not in NATIVE_CONSTRAINTS]
+        if unsupported:
+            raise ValueError(f"native solver does not support constraints: {unsupported}")
 
-def run_mvo_backtest(alpha_data: pl.DataFrame, signal_name: str, constraints: list, gamma: int, n_cpus: int) -> pl.DataFrame:
-    """run MVO backtest on alpha data"""
-    
     # convert constraint names to objects using getattr
     constraint_objects = []
     for constraint_name in constraints:
@@ -16,24 +86,502 @@ def run_mvo_backtest(alpha_data: pl.DataFrame, signal_name: str, constraints: li
             constraint_objects.append(constraint_class())
         except AttributeError:
             raise ValueError(f"unknown constraint: {constraint_name}")
-    
+
     # prepare data for backtesting
     backtest_data = alpha_data.filter(
         pl.col(f"{signal_name}_alpha").is_not_null()
     ).select([
         'date', 'barrid', f'{signal_name}_alpha', 'predicted_beta'
-    ]).rename({f'{signal_name}_alpha': 'alpha'})
-    
+    ]).rename({f'{signal_name}_alpha': 'alpha'}).with_columns(
+        # sf_quant expects plain strings and Float64, undo any compact dtypes
+        pl.col('barrid').cast(pl.String),
+        pl.col('alpha', 'predicted_beta').cast(pl.Float64)
+    )
+    # every date is then a contiguous run of rows already in barrid order
+    backtest_data = sort_panel(backtest_data, "date")
+
     if backtest_data.is_empty():
         print("warning: no data after filtering for backtest")
         return pl.DataFrame()
-    
-    # run backtest
-    weights = sfb.backtest_parallel(
-        data=backtest_data,
-        constraints=constraint_objects,
-        gamma=gamma,
-        n_cpus=n_cpus
+
+    dates = backtest_data["date"].unique().sort().to_list()
+    solve_dates = rebalance_dates(dates, rebalance)
+    if len(solve_dates) < len(dates):
+        if "return" not in alpha_data.columns:
+            raise ValueError("rebalance other than daily needs a 'return' column to drift weights")
+        print(f"rebalance {rebalance}: solving {len(solve_dates)} of {len(dates)} dates")
+        backtest_data = backtest_data.filter(pl.col('date').is_in(solve_dates))
+
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        # the directory can hold other calls' dates, e.g. earlier years of a pipelined run
+        todo = backtest_data.filter(~pl.col('date').is_in(_checkpointed_dates(checkpoint_dir)))
+        n_done = backtest_data['date'].n_unique() - todo['date'].n_unique()
+        if n_done:
+            print(f"resuming backtest: {n_done} dates already checkpointed")
+    else:
+        todo = backtest_data
+
+    def on_chunk_done(chunk_weights: pl.DataFrame, chunk_solves: pl.DataFrame, chunk_dates: list):
+        if checkpoint_dir is not None:
+            _write_checkpoint(chunk_weights, checkpoint_dir, chunk_dates[0], chunk_dates[-1])
+            _write_checkpoint(chunk_solves, checkpoint_dir, chunk_dates[0], chunk_dates[-1], prefix="solves")
+
+    results = []
+    if todo.is_empty():
+        # a job killed after its last chunk but before its results were written
+        print("backtest: every date already checkpointed")
+    else:
+        index = DateIndex(todo)
+        date_counts = index.counts()
+        in_flight = plan_in_flight(date_counts, n_cpus, memory_budget_gb, max_in_flight)
+        # short runs are still spread over every in-flight worker
+        max_dates = min(checkpoint_every, max(1, -(-len(date_counts) // in_flight)))
+        chunks = plan_chunks(date_counts, in_flight, memory_budget_gb, max_dates)
+
+        print(f"backtest: {len(date_counts)} dates in {len(chunks)} chunks, {in_flight} in flight")
+
+        results = _run_chunks(
+            index, chunks, constraint_objects, gamma, in_flight, on_chunk_done, executor, solver, risk_model_path
+        )
+    chunk_weights = [weights for weights, _ in results]
+    chunk_solves = [solves for _, solves in results]
+
+    if checkpoint_dir is not None:
+        files = sorted(checkpoint_dir.glob("chunk_*.parquet"))
+        chunk_weights = [pl.read_parquet(f) for f in files]
+        chunk_solves = [pl.read_parquet(f) for f in sorted(checkpoint_dir.glob("solves_*.parquet"))]
+
+    if not chunk_weights:
+        return pl.DataFrame()
+
+    if chunk_solves:
+        # the universe counts every asset of the date, the solve only sees those with an alpha
+        universe = alpha_data.group_by('date').agg(pl.len().alias('universe'))
+        solves = pl.concat(chunk_solves).filter(pl.col('date').is_in(solve_dates)).join(
+            universe, on='date', how='left'
+        ).select(
+            list(SOLVE_COLUMNS)
+        ).sort('date', 'gamma')
+        print_solve_summary(solves)
+        if solve_log_path is not None:
+            write_solve_log(solves, solve_log_path)
+
+    weights = pl.concat(chunk_weights).filter(pl.col('date').is_in(solve_dates))
+    keys = ['gamma', 'date', 'barrid'] if isinstance(gamma, list) else ['date', 'barrid']
+
+    if len(solve_dates) < len(dates):
+        returns = alpha_data.select(
+            'date', pl.col('barrid').cast(pl.String), pl.col('return').cast(pl.Float64)
+        )
+        if isinstance(gamma, list):
+            weights = pl.concat([
+                drift_weights(gamma_weights.drop('gamma'), returns, dates).with_columns(pl.lit(g).alias('gamma'))
+                for (g,), gamma_weights in weights.partition_by('gamma', as_dict=True).items()
+            ])
+        else:
+            weights = drift_weights(weights, returns, dates)
+
+    return weights.select(*keys, 'weight').sort(keys)
+
+def rebalance_dates(dates: list, rebalance: str | int = "daily") -> list:
+    """first trading date of each week or month, or every n-th trading date"""
+    dates = pl.Series('date', dates).unique().sort()
+
+    if rebalance == "daily":
+        return dates.to_list()
+    if isinstance(rebalance, int) and not isinstance(rebalance, bool) and rebalance >= 1:
+        return dates.gather_every(rebalance).to_list()
+    if rebalance in REBALANCE_PERIODS:
+        period = dates.dt.truncate(REBALANCE_PERIODS[rebalance])
+        return dates.filter(period.is_first_distinct()).to_list()
+
+    raise ValueError(f"unknown rebalance frequency: {rebalance}")
+
+def drift_weights(weights: pl.DataFrame, returns: pl.DataFrame, dates: list) -> pl.DataFrame:
+    """
+    Carry rebalance-date weights through the following dates without trading
+    weights on date t earn the return of t + 1 (as in sfp.generate_returns_from_weights), so
+    w_i(t) = w_i(t-1) * (1 + r_i(t)) / (1 + sum_j w_j(t-1) * r_j(t)), uninvested cash earns nothing
+    Done in closed form per holding period: w_i(t) = w_i * G_i(t) / (1 + sum_j w_j * (G_j(t) - 1))
+    where G is the cumulative growth over the dates after the rebalance
+    """
+    # every date points at the latest rebalance on or before it
+    periods = pl.DataFrame({'date': dates}).sort('date').join_asof(
+        weights.select(pl.col('date').alias('rebalance_date')).unique().sort('rebalance_date'),
+        left_on='date',
+        right_on='rebalance_date',
+        strategy='backward'
+    ).drop_nulls()
+
+    held = periods.join(
+        weights.rename({'date': 'rebalance_date'}), on='rebalance_date'
+    ).join(
+        returns, on=['date', 'barrid'], how='left'
+    ).sort(['barrid', 'date'])
+
+    return held.with_columns(
+        # the rebalance date's own return was earned before the trade, assets without a return are flat
+        pl.when(pl.col('date') == pl.col('rebalance_date')).then(0.0).otherwise(pl.col('return'))
+        .fill_null(0).add(1).cum_prod().over(['rebalance_date', 'barrid']).alias('growth')
+    ).with_columns(
+        (pl.col('weight') * pl.col('growth')
+         / (1 + (pl.col('weight') * (pl.col('growth') - 1)).sum().over('date'))).alias('weight')
+    ).select('date', 'barrid', 'weight')
+
+def plan_in_flight(
+    date_counts: pl.DataFrame,
+    n_cpus: int,
+    memory_budget_gb: float | None = None,
+    max_in_flight: int | None = None
+) -> int:
+    """number of chunks solved at once, capped by cpus and by the memory of the largest solve"""
+    in_flight = min(n_cpus, max_in_flight or n_cpus)
+
+    if memory_budget_gb is not None and not date_counts.is_empty():
+        peak_solve = _solve_bytes(date_counts["len"].max())
+        in_flight = min(in_flight, int(memory_budget_gb * 1e9 // peak_solve))
+
+    return max(in_flight, 1)
+
+def plan_chunks(
+    date_counts: pl.DataFrame,
+    in_flight: int,
+    memory_budget_gb: float | None = None,
+    max_dates: int = 250
+) -> list:
+    """
+    Group consecutive dates into chunks
+    Each in-flight chunk gets an equal share of the budget for its slice on top of one solve
+    """
+    if memory_budget_gb is None or date_counts.is_empty():
+        slice_budget = float("inf")
+    else:
+        peak_solve = _solve_bytes(date_counts["len"].max())
+        slice_budget = max(memory_budget_gb * 1e9 / in_flight - peak_solve, 0)
+
+    chunks = []
+    current, current_bytes = [], 0
+
+    for date_, rows in date_counts.iter_rows():
+        rows_bytes = rows * SLICE_BYTES_PER_ROW
+        if current and (len(current) >= max_dates or current_bytes + rows_bytes > slice_budget):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(date_)
+        current_bytes += rows_bytes
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+def _solve_bytes(n_assets: int) -> float:
+    """rough peak memory of one date's dense covariance solve"""
+    return SOLVE_COPIES * 8 * n_assets ** 2
+
+def _run_chunks(
+    index: DateIndex,
+    chunks: list,
+    constraint_objects: list,
+    gamma: float | list,
+    in_flight: int,
+    on_chunk_done,
+    executor: str = "ray",
+    solver: str = "sf_quant",
+    risk_model_path: str | None = None
+) -> list:
+    """solve every chunk, in process when only one is in flight, otherwise on the chosen executor"""
+    if in_flight == 1:
+        results = []
+        for i, chunk_dates in enumerate(chunks):
+            chunk_weights, chunk_solves = _solve_chunk(
+                _chunk_slice(index, chunk_dates), constraint_objects, gamma, solver, risk_model_path
+            )
+            on_chunk_done(chunk_weights, chunk_solves, chunk_dates)
+            results.append((chunk_weights, chunk_solves))
+            print(f"chunk {i + 1}/{len(chunks)} done: {chunk_dates[0]} to {chunk_dates[-1]}")
+        return results
+
+    if executor == "processes":
+        return _run_chunks_processes(
+            index, chunks, constraint_objects, gamma, in_flight, on_chunk_done, solver, risk_model_path
+        )
+
+    return _run_chunks_ray(
+        index, chunks, constraint_objects, gamma, in_flight, on_chunk_done, solver, risk_model_path
     )
-    
-    return weights
+
+def _run_chunks_processes(
+    index: DateIndex,
+    chunks: list,
+    constraint_objects: list,
+    gamma: float | list,
+    in_flight: int,
+    on_chunk_done,
+    solver: str = "sf_quant",
+    risk_model_path: str | None = None
+) -> list:
+    """
+    Local process pool, works on offline nodes with no cluster to start
+    Slices travel as Arrow IPC files that workers memory-map instead of pickled frames
+    """
+    results = [None] * len(chunks)
+    context = multiprocessing.get_context(MP_CONTEXT)
+
+    with tempfile.TemporaryDirectory(prefix="backtest_spool_") as spool_dir, \
+            ProcessPoolExecutor(max_workers=in_flight, mp_context=context) as pool:
+        spool_dir = Path(spool_dir)
+        pending = {}
+        next_chunk = 0
+
+        while next_chunk < len(chunks) or pending:
+            # only in_flight slices are spooled at any time
+            while next_chunk < len(chunks) and len(pending) < in_flight:
+                input_path = spool_dir / f"chunk_{next_chunk}_input.arrow"
+                _chunk_slice(index, chunks[next_chunk]).write_ipc(input_path)
+                output_path = spool_dir / f"chunk_{next_chunk}_weights.arrow"
+                future = pool.submit(
+                    _solve_chunk_ipc, str(input_path), str(output_path),
+                    constraint_objects, gamma, solver, risk_model_path
+                )
+                pending[future] = next_chunk
+                next_chunk += 1
+
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                output_path, solves_path = (Path(path) for path in future.result())
+                results[i] = (pl.read_ipc(output_path), pl.read_ipc(solves_path))
+                output_path.unlink()
+                solves_path.unlink()
+                (spool_dir / f"chunk_{i}_input.arrow").unlink()
+                on_chunk_done(*results[i], chunks[i])
+                print(f"chunk {i + 1}/{len(chunks)} done: {chunks[i][0]} to {chunks[i][-1]}")
+
+    return results
+
+def _solve_chunk_ipc(
+    input_path: str,
+    output_path: str,
+    constraint_objects: list,
+    gamma: float | list,
+    solver: str = "sf_quant",
+    risk_model_path: str | None = None
+) -> tuple:
+    """process pool worker: memory-map a spooled slice, solve it and spool the weights and solve log back"""
+    # ipc files are memory-mapped by polars, the slice is never copied through a pipe
+    chunk = pl.read_ipc(input_path)
+    weights, solves = _solve_chunk(chunk, constraint_objects, gamma, solver, risk_model_path)
+    solves_path = output_path.replace("_weights.arrow", "_solves.arrow")
+    weights.write_ipc(output_path)
+    solves.write_ipc(solves_path)
+    return output_path, solves_path
+
+def _run_chunks_ray(
+    index: DateIndex,
+    chunks: list,
+    constraint_objects: list,
+    gamma: float | list,
+    in_flight: int,
+    on_chunk_done,
+    solver: str = "sf_quant",
+    risk_model_path: str | None = None
+) -> list:
+    """dispatch chunks to ray with at most in_flight of them submitted at a time"""
+    import ray
+
+    ray.init(ignore_reinit_error=True, num_cpus=in_flight)
+    solve_remote = ray.remote(_solve_chunk)
+
+    results = [None] * len(chunks)
+    pending = {}
+    next_chunk = 0
+
+    try:
+        while next_chunk < len(chunks) or pending:
+            # top up to the in-flight limit, each task only receives its own slice
+            while next_chunk < len(chunks) and len(pending) < in_flight:
+                chunk_slice = _chunk_slice(index, chunks[next_chunk])
+                task = solve_remote.remote(chunk_slice, constraint_objects, gamma, solver, risk_model_path)
+                pending[task] = next_chunk
+                next_chunk += 1
+
+            ready, _ = ray.wait(list(pending), num_returns=1)
+            i = pending.pop(ready[0])
+            results[i] = ray.get(ready[0])
+            on_chunk_done(*results[i], chunks[i])
+            print(f"chunk {i + 1}/{len(chunks)} done: {chunks[i][0]} to {chunks[i][-1]}")
+    finally:
+        ray.shutdown()
+
+    return results
+
+def _chunk_slice(index: DateIndex, chunk_dates: list) -> pl.DataFrame:
+    """zero-copy rows of a chunk of consecutive dates"""
+    return index.between(chunk_dates[0], chunk_dates[-1])
+
+def _solve_chunk(
+    chunk: pl.DataFrame,
+    constraint_objects: list,
+    gamma: float | list,
+    solver: str = "sf_quant",
+    risk_model_path: str | None = None
+) -> tuple:
+    """
+    solve every date of a chunk in order, the native solver starts each date from the previous one
+    Returns (weights, solve log) of the chunk
+    """
+    risk_model = open_risk_model(risk_model_path) if risk_model_path else None
+
+    if solver == "native":
+        return _solve_chunk_native(chunk, constraint_objects, gamma, risk_model)
+
+    portfolios, solves = [], []
+    for date_, subset in DateIndex(chunk):
+        portfolio, date_solves = _solve_date(date_, subset, constraint_objects, gamma, risk_model)
+        portfolios.append(portfolio)
+        solves.extend(date_solves)
+    return _stack_portfolios(portfolios, chunk.schema['date'], gamma), solve_frame(solves, chunk.schema['date'])
+
+def _solve_chunk_native(
+    chunk: pl.DataFrame,
+    constraint_objects: list,
+    gamma: float | list,
+    risk_model: RiskModelStore | None = None
+) -> tuple:
+    """
+    factor-model solves, each date warm-started from the previous date's solver state
+    Every gamma keeps its own state, the factor model and constraints are set up once per date
+    Returns (weights, solve log), solve times and iterations are OSQP's own
+    A gamma that fails on a date starts cold on the next one
+    """
+    gammas = gamma if isinstance(gamma, list) else [gamma]
+    factor_model = risk_model.factor_model if risk_model is not None else load_factor_model
+    constraints = [type(constraint).__name__ for constraint in constraint_objects]
+    portfolios, solves = [], []
+    previous = None
+
+    # chunks are (date, barrid) sorted, each date's rows are already in barrid order
+    for date_, subset in DateIndex(chunk):
+        barrids = subset['barrid'].to_list()
+
+        started = time.perf_counter()
+        exposures, factor_cov, specific_var = factor_model(date_, barrids)
+        setup_s = time.perf_counter() - started
+
+        warm_starts = None
+        if previous is not None:
+            warm_starts = [
+                align_warm_start(state, previous[0], barrids) if state is not None else None for state in previous[1]
+            ]
+
+        results = solve_mvo_gammas(
+            alphas=subset['alpha'].to_numpy(),
+            exposures=exposures,
+            factor_cov=factor_cov,
+            specific_var=specific_var,
+            gammas=gammas,
+            constraints=constraints,
+            betas=subset['predicted_beta'].to_numpy(),
+            warm_starts=warm_starts
+        )
+
+        rss_mb = rss_bytes() / 1e6
+        for g, (weights, info, _) in zip(gammas, results):
+            solves.append((date_, float(g), len(barrids), setup_s, info.run_time, info.iter, info.status, rss_mb))
+            # an infeasible or unconverged solve returns whatever iterate osqp stopped on
+            if info.status != SOLVED:
+                continue
+            portfolio = pl.DataFrame({'date': date_, 'barrid': barrids, 'weight': weights})
+            portfolios.append(_with_gamma(portfolio, gamma, g))
+
+        previous = (barrids, [state if info.status == SOLVED else None for _, info, state in results])
+
+    return _stack_portfolios(portfolios, chunk.schema['date'], gamma), solve_frame(solves, chunk.schema['date'])
+
+def _solve_date(
+    date_: dt.date,
+    subset: pl.DataFrame,
+    constraint_objects: list,
+    gamma: float | list,
+    risk_model: RiskModelStore | None = None
+) -> tuple:
+    """
+    single date mean-variance solve, same as sf_quant's per-date portfolio construction
+    With a list of gammas the covariance matrix is built once and solved for each of them
+    subset is one date's slice of the (date, barrid) sorted backtest data
+    Returns (weights, solve log rows), sf_quant reports no iterations and its status is read off
+    the weights: a gamma with null (no solution) or non-finite weights is logged but gives no weights
+    """
+    gammas = gamma if isinstance(gamma, list) else [gamma]
+    barrids = subset['barrid'].to_list()
+
+    started = time.perf_counter()
+    if risk_model is not None:
+        covariance_matrix = risk_model.covariance_matrix(date_, barrids)
+    else:
+        covariance_matrix = sfd.construct_covariance_matrix(date_, barrids)
+    covariance_matrix = covariance_matrix.drop('barrid').to_numpy()
+    setup_s = time.perf_counter() - started
+
+    portfolios, solves = [], []
+    for g in gammas:
+        started = time.perf_counter()
+        portfolio = sfo.mve_optimizer(
+            ids=barrids,
+            alphas=subset['alpha'].to_numpy(),
+            covariance_matrix=covariance_matrix,
+            gamma=g,
+            constraints=constraint_objects,
+            betas=subset['predicted_beta'].to_numpy()
+        )
+        solve_s = time.perf_counter() - started
+        status = _weights_status(portfolio['weight'])
+        solves.append((date_, float(g), len(barrids), setup_s, solve_s, None, status, rss_bytes() / 1e6))
+        if status != SOLVED:
+            continue
+        portfolio = portfolio.with_columns(pl.lit(date_).alias('date')).select('date', 'barrid', 'weight')
+        portfolios.append(_with_gamma(portfolio, gamma, g))
+
+    return _stack_portfolios(portfolios, subset.schema['date'], gamma), solves
+
+def _weights_status(weights: pl.Series) -> str:
+    """SOLVED, or why the weights sf_quant returned cannot be used"""
+    # is_finite skips nulls, a failed solve's all-null column would pass it
+    if weights.is_null().any():
+        return NO_SOLUTION
+    if not weights.cast(pl.Float64).is_finite().all():
+        return NON_FINITE
+    return SOLVED
+
+def _stack_portfolios(portfolios: list, date_dtype: pl.DataType, gamma: float | list) -> pl.DataFrame:
+    """solved portfolios as one frame, an empty weights frame when no solve gave weights"""
+    if portfolios:
+        return pl.concat(portfolios)
+    schema = {'date': date_dtype, 'barrid': pl.String, 'weight': pl.Float64}
+    if isinstance(gamma, list):
+        schema['gamma'] = pl.Float64
+    return pl.DataFrame(schema=schema)
+
+def _with_gamma(portfolio: pl.DataFrame, gamma: float | list, g: float) -> pl.DataFrame:
+    """tag a portfolio with its gamma when a list of gammas is being solved"""
+    if not isinstance(gamma, list):
+        return portfolio
+    # yaml lists can mix ints and floats, keep one dtype across gammas
+    return portfolio.with_columns(pl.lit(float(g)).alias('gamma'))
+
+def _checkpointed_dates(checkpoint_dir: Path) -> list:
+    """dates already solved on disk, those whose solves failed have a solve log row but no weights"""
+    files = sorted(checkpoint_dir.glob("chunk_*.parquet")) + sorted(checkpoint_dir.glob("solves_*.parquet"))
+    if not files:
+        return []
+    return pl.concat([pl.read_parquet(f, columns=['date']) for f in files])["date"].unique().to_list()
+
+def _write_checkpoint(frame: pl.DataFrame, checkpoint_dir: Path, first, last, prefix: str = "chunk"):
+    """write to a temp file first so a killed job never leaves a partial chunk"""
+    path = checkpoint_dir / f"{prefix}_{first}_{last}.parquet"
+    tmp_path = path.with_suffix(".parquet.tmp")
+    frame.write_parquet(tmp_path)
+    tmp_path.replace(path)
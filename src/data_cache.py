@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""on-disk parquet cache for barra asset data"""
+
+import datetime as dt
+import json
+from pathlib import Path
+
+import polars as pl
+import sf_quant.data as sfd
+
+KEY_COLUMNS = ["date", "barrid"]
+MANIFEST_NAME = "manifest.json"
+
+
+def load_assets_cached(
+    start: dt.date,
+    end: dt.date,
+    columns: list,
+    in_universe: bool,
+    cache_path: str,
+) -> pl.DataFrame:
+    """
+    Drop-in replacement for sfd.load_assets backed by a local parquet cache
+    Cache is partitioned by year and keyed by the universe flag
+    Only date ranges and columns missing from the cache are pulled from the source
+    """
+    return (
+        scan_assets_cached(start, end, columns, in_universe, cache_path)
+        .sort(["barrid", "date"])
+        .collect()
+    )
+
+
+def scan_assets_cached(
+    start: dt.date,
+    end: dt.date,
+    columns: list,
+    in_universe: bool,
+    cache_path: str,
+) -> pl.LazyFrame:
+    """
+    Lazy scan over the cached year files
+    Missing years are filled first, then column selection and any later
+    filters are pushed down into the parquet scan
+    Rows are ordered by year, then barrid and date within each year
+    Years extended by different requests can hold different columns, each file is
+    scanned on its own and only the requested columns are kept
+    """
+    files = sync_cache(start, end, columns, in_universe, cache_path)
+
+    return pl.concat(
+        [pl.scan_parquet(f).filter(pl.col("date").is_between(start, end)).select(columns) for f in files],
+        how="vertical_relaxed",
+    )
+
+
+def sync_cache(
+    start: dt.date,
+    end: dt.date,
+    columns: list,
+    in_universe: bool,
+    cache_path: str,
+) -> list:
+    """
+    Make sure every year between start and end is cached with the requested columns
+    Returns the year files covering the range
+    """
+    cache_dir = universe_dir(cache_path, in_universe)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(cache_dir)
+
+    wanted = KEY_COLUMNS + [col for col in columns if col not in KEY_COLUMNS]
+    files = []
+
+    for year in range(start.year, end.year + 1):
+        lo = max(start, dt.date(year, 1, 1))
+        hi = min(end, dt.date(year, 12, 31))
+        year_file = cache_dir / f"year={year}.parquet"
+        entry = manifest.get(str(year))
+
+        if entry is None:
+            print(f"cache miss: {lo} to {hi}")
+            frame = _fetch(lo, hi, wanted, in_universe)
+            # dates past the source's last one are not cached, a later request fetches them again
+            last = _last_date(frame, lo - dt.timedelta(days=1))
+            entry = {"start": lo.isoformat(), "end": last.isoformat(), "columns": wanted}
+        else:
+            frame, entry = _extend_year(year_file, entry, lo, hi, wanted, in_universe)
+
+        if frame is not None:
+            _write_atomic(frame, year_file)
+            manifest[str(year)] = entry
+            _write_manifest(cache_dir, manifest)
+
+        files.append(year_file)
+
+    return files
+
+
+def universe_dir(cache_path: str, in_universe: bool) -> Path:
+    """cache sub-directory for a universe flag"""
+    return Path(cache_path) / f"in_universe={bool(in_universe)}"
+
+
+def _extend_year(
+    year_file: Path,
+    entry: dict,
+    lo: dt.date,
+    hi: dt.date,
+    wanted: list,
+    in_universe: bool,
+) -> tuple:
+    """
+    Fill missing columns and dates for an already cached year
+    Returns (None, entry) when the cache already covers the request
+    """
+    cached_lo = dt.date.fromisoformat(entry["start"])
+    cached_hi = dt.date.fromisoformat(entry["end"])
+    cached_cols = entry["columns"]
+    missing_cols = [col for col in wanted if col not in cached_cols]
+
+    if not missing_cols and lo >= cached_lo and hi <= cached_hi:
+        return None, entry
+
+    frame = pl.read_parquet(year_file)
+    all_cols = cached_cols + missing_cols
+
+    if missing_cols:
+        print(f"cache missing columns {missing_cols}: {cached_lo} to {cached_hi}")
+        extra = _fetch(cached_lo, cached_hi, KEY_COLUMNS + missing_cols, in_universe)
+        frame = frame.join(extra, on=KEY_COLUMNS, how="left")
+
+    parts = [frame.select(all_cols)]
+
+    # the cached interval stays contiguous: gaps between it and the request are fetched too
+    if lo < cached_lo:
+        print(f"cache miss: {lo} to {cached_lo - dt.timedelta(days=1)}")
+        parts.append(_fetch(lo, cached_lo - dt.timedelta(days=1), all_cols, in_universe))
+    last = cached_hi
+    if hi > cached_hi:
+        print(f"cache miss: {cached_hi + dt.timedelta(days=1)} to {hi}")
+        parts.append(_fetch(cached_hi + dt.timedelta(days=1), hi, all_cols, in_universe))
+        last = _last_date(parts[-1], cached_hi)
+
+    frame = pl.concat(parts, how="vertical_relaxed").sort(["barrid", "date"])
+    entry = {
+        "start": min(lo, cached_lo).isoformat(),
+        "end": last.isoformat(),
+        "columns": all_cols,
+    }
+    return frame, entry
+
+
+def _last_date(frame: pl.DataFrame, default: dt.date) -> dt.date:
+    """latest date in a fetched frame, default when the source returned no rows"""
+    if frame.is_empty():
+        return default
+    last = frame["date"].max()
+    if isinstance(last, str):
+        return dt.date.fromisoformat(last[:10])
+    return last.date() if isinstance(last, dt.datetime) else last
+
+
+def _fetch(start: dt.date, end: dt.date, columns: list, in_universe: bool) -> pl.DataFrame:
+    """pull a date range from the silverfund source"""
+    return sfd.load_assets(start=start, end=end, in_universe=in_universe, columns=columns)
+
+
+def _read_manifest(cache_dir: Path) -> dict:
+    manifest_file = cache_dir / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {}
+    return json.loads(manifest_file.read_text())
+
+
+def _write_manifest(cache_dir: Path, manifest: dict):
+    tmp_file = cache_dir / f"{MANIFEST_NAME}.tmp"
+    tmp_file.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp_file.replace(cache_dir / MANIFEST_NAME)
+
+
+def _write_atomic(frame: pl.DataFrame, path: Path):
+    """write to a temp file first so a killed job never leaves a half-written year"""
+    tmp_file = path.with_suffix(".parquet.tmp")
+    frame.write_parquet(tmp_file)
+    tmp_file.replace(path)
@@ -5,13 +5,41 @@ import polars as pl
 import sf_quant.data as sfd
 import datetime as dt
 import yaml
+from pathlib import Path
 
-def load_barra_data(config_path: str = "config_files/research_config.yaml") -> pl.DataFrame:
+from src.data_cache import load_assets_cached, scan_assets_cached
+from src.panel import sort_panel
+from src.telemetry import stage
+
+# the forward returns sfp.generate_returns_from_weights prices weights with
+RETURN_COLUMNS = ["date", "barrid", "fwd_return"]
+IDENTIFIER_COLUMNS = ["barrid", "rootid", "ticker", "iso_country_code", "issuerid"]
+
+# percentile filters: config key -> (liquidity measure, whether a larger value is more liquid)
+LIQUIDITY_FILTERS = {
+    "dollar_volume_percentile": (pl.col("price") * pl.col("daily_volume"), True),
+    "bid_ask_spread_percentile": (pl.col("bid_ask_spread"), False),
+}
+
+def load_barra_data(
+    config_path: str = "config_files/research_config.yaml",
+    lazy: bool = False,
+    start: dt.date | None = None,
+    end: dt.date | None = None,
+    filtered: bool = True
+) -> pl.DataFrame | pl.LazyFrame:
     """
     Load Barra data using silverfund library
     Then clean data
     Then apply filters according to config
     Then validate data
+
+    With lazy=True the whole chain is returned as a LazyFrame
+    With data_loading.lazy set in the config the chain runs lazily and is
+    collected with the streaming engine (or sunk to data_loading.sink_path)
+    A returned DataFrame is always in (barrid, date) order
+    start and end override the configured date range, e.g. to load one segment of it
+    filtered=False skips the configured filters, for a caller that filters several loads together
     """
 
     with open(config_path) as f:
@@ -19,34 +47,125 @@ def load_barra_data(config_path: str = "config_files/research_config.yaml") -> p
     
     data_config = config["data_loading"]
     cleaning_config = config.get("data_cleaning", {})
+    if not filtered:
+        cleaning_config = {key: value for key, value in cleaning_config.items() if key != "filters"}
     
-    start = dt.datetime.strptime(data_config["start_date"], "%Y-%m-%d").date()
-    end = dt.datetime.strptime(data_config["end_date"], "%Y-%m-%d").date()
+    start = start or dt.datetime.strptime(data_config["start_date"], "%Y-%m-%d").date()
+    end = end or dt.datetime.strptime(data_config["end_date"], "%Y-%m-%d").date()
     
     print(f"loading data: {start} to {end}")
     
-    data = sfd.load_assets(
-        start=start,
-        end=end,
-        in_universe=data_config["russell_filter"],
-        columns=data_config["columns"]
-    )
+    if lazy:
+        # only a plan is built, nothing to time
+        data = scan_panel(start, end, data_config, cleaning_config)
+    elif data_config.get("lazy", False):
+        # the lazy steps only build the plan and all the work happens in the collect,
+        # so the streaming chain is timed as one stage
+        with stage("load+filter (streaming)") as timed:
+            data = timed.output(collect_data(
+                scan_panel(start, end, data_config, cleaning_config), data_config.get("sink_path")
+            ))
+        print(f"after filtering: {len(data)} rows ({data.estimated_size('mb'):.1f} MB)")
+    else:
+        with stage("load") as timed:
+            data = timed.output(load_source(start, end, data_config))
+        print(f"loaded {len(data)} rows")
     
-    print(f"loaded {len(data)} rows")
+        # apply all data preparation steps
+        with stage("prepare", data) as timed:
+            data = timed.output(prepare_data(data, cleaning_config))
     
-    # apply all data preparation steps
-    data = prepare_data(data, cleaning_config)
+        if "filters" in cleaning_config:
+            with stage("filter", data) as timed:
+                data = timed.output(apply_filters(data, cleaning_config["filters"]))
+            print(f"after filtering: {len(data)} rows")
     
-    if "filters" in cleaning_config:
-        data = apply_filters(data, cleaning_config["filters"])
-        print(f"after filtering: {len(data)} rows")
+    if isinstance(data, pl.DataFrame):
+        # later stages rely on (barrid, date) order, the cached source already comes that way
+        data = sort_panel(data, "asset")
     
     if not validate_data(data):
         raise ValueError("data validation failed")
     
     return data
 
-def prepare_data(data: pl.DataFrame, cleaning_config: dict) -> pl.DataFrame:
+def scan_panel(start: dt.date, end: dt.date, data_config: dict, cleaning_config: dict) -> pl.LazyFrame:
+    """the raw scan with the preparation and filters applied, as one lazy plan"""
+    data = prepare_data(scan_source(start, end, data_config), cleaning_config)
+    if "filters" in cleaning_config:
+        data = apply_filters(data, cleaning_config["filters"])
+    return data
+
+def load_source(start: dt.date, end: dt.date, data_config: dict) -> pl.DataFrame:
+    """eager load of the raw asset panel"""
+    if data_config.get("cache_path"):
+        # served from the local parquet cache, only missing dates/columns hit the source
+        return load_assets_cached(
+            start=start,
+            end=end,
+            in_universe=data_config["russell_filter"],
+            columns=data_config["columns"],
+            cache_path=data_config["cache_path"]
+        )
+
+    return sfd.load_assets(
+        start=start,
+        end=end,
+        in_universe=data_config["russell_filter"],
+        columns=data_config["columns"]
+    )
+
+def scan_source(start: dt.date, end: dt.date, data_config: dict) -> pl.LazyFrame:
+    """
+    Lazy scan of the raw asset panel
+    Projection and predicate pushdown only reach the files when the parquet cache is enabled
+    """
+    if data_config.get("cache_path"):
+        return scan_assets_cached(
+            start=start,
+            end=end,
+            in_universe=data_config["russell_filter"],
+            columns=data_config["columns"],
+            cache_path=data_config["cache_path"]
+        )
+
+    print("warning: lazy loading without data_loading.cache_path materializes the source first")
+    return load_source(start, end, data_config).lazy()
+
+def load_asset_returns(config_path: str, start: dt.date, end: dt.date, barrids: list) -> pl.DataFrame:
+    """
+    (date, barrid, fwd_return) of barrids between start and end, as decimals
+    Read like sfp.generate_returns_from_weights: the forward returns of the source's universe
+    (in_universe=True), none of the run's cleaning filters apply
+    With data_loading.cache_path the barrid and date filter reaches the parquet scan, it shares
+    the research panel's year files when the run loads the same universe
+    """
+    with open(config_path) as f:
+        data_config = yaml.safe_load(f)["data_loading"]
+    
+    source_config = {**data_config, "columns": RETURN_COLUMNS, "russell_filter": True}
+    if data_config.get("cache_path"):
+        returns = scan_source(start, end, source_config)
+    else:
+        returns = load_source(start, end, source_config).lazy()
+    
+    returns = returns.filter(pl.col("barrid").is_in(barrids))
+    date = pl.col("date").str.to_date() if returns.collect_schema()["date"] == pl.String else pl.col("date")
+    return returns.with_columns(date, pl.col("fwd_return").truediv(100)).collect()
+
+def collect_data(data: pl.LazyFrame, sink_path: str | None = None) -> pl.DataFrame:
+    """
+    Collect a lazy panel with the streaming engine
+    If sink_path is given the result is streamed straight to parquet and read back
+    """
+    if sink_path:
+        Path(sink_path).parent.mkdir(parents=True, exist_ok=True)
+        data.sink_parquet(sink_path)
+        return pl.read_parquet(sink_path)
+
+    return data.collect(engine="streaming")
+
+def prepare_data(data: pl.DataFrame | pl.LazyFrame, cleaning_config: dict) -> pl.DataFrame | pl.LazyFrame:
     """
     Load Bara data
     Then clean and prepare data for our calcualtions
@@ -66,20 +185,59 @@ def prepare_data(data: pl.DataFrame, cleaning_config: dict) -> pl.DataFrame:
     if transforms:
         data = data.with_columns(transforms)
     
+    if cleaning_config.get("compact_dtypes", False):
+        data = compact_schema(data)
+    
     return data
 
-def apply_filters(data: pl.DataFrame, filters: list) -> pl.DataFrame:
+def compact_schema(data: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Shrink the research panel
+    Identifiers become Categorical, floats become Float32 and date becomes a real Date
+    """
+    schema = data.collect_schema()
+    casts = []
+    
+    for name, dtype in schema.items():
+        if name == "date" and dtype == pl.String:
+            casts.append(pl.col(name).str.to_date())
+        elif name == "date" and dtype != pl.Date:
+            casts.append(pl.col(name).cast(pl.Date))
+        elif name in IDENTIFIER_COLUMNS and dtype == pl.String:
+            casts.append(pl.col(name).cast(pl.Categorical))
+        elif dtype == pl.Float64:
+            casts.append(pl.col(name).cast(pl.Float32))
+    
+    if not casts:
+        return data
+    
+    if isinstance(data, pl.LazyFrame):
+        return data.with_columns(casts)
+    
+    before = data.estimated_size("mb")
+    data = data.with_columns(casts)
+    print(f"compact dtypes: {before:.1f} MB -> {data.estimated_size('mb'):.1f} MB")
+    
+    return data
+
+def apply_filters(data: pl.DataFrame | pl.LazyFrame, filters: list) -> pl.DataFrame | pl.LazyFrame:
     """
     Apply data filters found in config
+    The percentile filters drop, on each date, that share of the assets left by the other filters
+    with the lowest dollar volume or the widest bid-ask spread of the previous trading day,
+    quality_level keeps that share of them ranked on both measures together
     """
+    # asset-level conditions keep or drop an asset's whole history, they can go before the lag
+    asset_conditions = []
     filter_conditions = []
+    cutoffs = {}
     
     for filter_config in filters:
         if filter_config.get("usa_only", True):
-            filter_conditions.extend([
+            asset_conditions.extend([
                 pl.col('iso_country_code').eq("USA"),
                 pl.col('rootid').eq(pl.col('barrid')),
-                pl.col('barrid').str.starts_with('US')
+                pl.col('barrid').cast(pl.String).str.starts_with('US')
             ])
         
         if filter_config.get("min_price"):
@@ -93,20 +251,77 @@ def apply_filters(data: pl.DataFrame, filters: list) -> pl.DataFrame:
         
         if filter_config.get("require_specific_risk", True):
             filter_conditions.append(pl.col("specific_risk").is_not_null())
+        
+        for key in LIQUIDITY_FILTERS:
+            if filter_config.get(key):
+                cutoffs[key] = filter_config[key]
+        
+        if filter_config.get("quality_level", 1.0) < 1.0:
+            cutoffs["quality_level"] = filter_config["quality_level"]
+    
+    # ahead of the lag window so they still reach the parquet scan
+    if asset_conditions:
+        data = data.filter(*asset_conditions)
+    
+    # a quality level ranks on every measure
+    measures = list(LIQUIDITY_FILTERS) if "quality_level" in cutoffs else list(cutoffs)
+    if measures:
+        # lag over each asset's full history so a row removed below does not shift its previous day
+        data = data.with_columns(
+            LIQUIDITY_FILTERS[key][0].shift(1).over("barrid", order_by="date").alias(f"_{key}")
+            for key in measures
+        )
     
     if filter_conditions:
         data = data.filter(*filter_conditions)
     
+    if measures:
+        data = _filter_liquidity(data, cutoffs, measures)
+    
     return data
 
-def validate_data(data: pl.DataFrame) -> bool:
+def _filter_liquidity(data: pl.DataFrame | pl.LazyFrame, cutoffs: dict, measures: list) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Per-date percentile cutoffs on the lagged measures, rows without a lagged measure are dropped
+    All percentiles come from one with_columns over date, the quality score needs a second
+    """
+    def percentile(column: pl.Expr, liquid_when_high: bool = True) -> pl.Expr:
+        """share of the date's assets less liquid than this one, in [0, 1)"""
+        rank = column.rank("min", descending=not liquid_when_high)
+        return ((rank - 1) / column.count()).over("date")
+    
+    data = data.with_columns(
+        percentile(pl.col(f"_{key}"), LIQUIDITY_FILTERS[key][1]).alias(f"_{key}") for key in measures
+    )
+    conditions = [pl.col(f"_{key}").is_not_null() for key in measures]
+    conditions += [pl.col(f"_{key}") >= cutoffs[key] for key in measures if key in cutoffs]
+    
+    if "quality_level" in cutoffs:
+        ranked = pl.all_horizontal(conditions[:len(measures)])
+        quality = pl.when(ranked).then(pl.mean_horizontal(pl.col(f"_{key}") for key in measures))
+        data = data.with_columns(percentile(quality).alias("_quality_level"))
+        # the best quality_level share of each date has a percentile of at least 1 - quality_level
+        conditions.append(pl.col("_quality_level") >= 1 - cutoffs["quality_level"])
+        measures = [*measures, "quality_level"]
+    
+    return data.filter(*conditions).drop([f"_{key}" for key in measures])
+
+def validate_data(data: pl.DataFrame | pl.LazyFrame) -> bool:
     """basic data validation"""
-    if data.is_empty():
+    if isinstance(data, pl.LazyFrame):
+        # only pull a single row to check for emptiness
+        is_empty = data.head(1).collect().is_empty()
+        columns = data.collect_schema().names()
+    else:
+        is_empty = data.is_empty()
+        columns = data.columns
+
+    if is_empty:
         print("warning: data is empty")
         return False
     
     required_cols = ['date', 'barrid', 'return', 'specific_risk']
-    missing_cols = [col for col in required_cols if col not in data.columns]
+    missing_cols = [col for col in required_cols if col not in columns]
     
     if missing_cols:
         print(f"error: missing columns: {missing_cols}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""native factor-model MVO solver"""
+
+import numpy as np
+import osqp
+import polars as pl
+import scipy.sparse as sp
+
+# constraints the native solver knows how to express, everything else goes through sf_quant
+NATIVE_CONSTRAINTS = ["FullInvestment", "LongOnly", "NoBuyingOnMargin", "UnitBeta"]
+# same tolerances cvxpy hands to OSQP for sf_quant's optimizer
+OSQP_SETTINGS = {"eps_abs": 1e-5, "eps_rel": 1e-5, "max_iter": 20000, "polishing": True, "verbose": False}
+
+
+def solve_mvo(
+    alphas: np.ndarray,
+    exposures: np.ndarray,
+    factor_cov: np.ndarray,
+    specific_var: np.ndarray,
+    gamma: float,
+    constraints: list,
+    betas: np.ndarray | None = None,
+    warm_start: dict | None = None
+) -> tuple:
+    """
+    max a'w - gamma/2 * (w'B F B'w + sum(d * w^2)) solved with OSQP
+    The factor loadings y = B'w are extra variables so P stays block diagonal with
+    N + K^2 non-zeros instead of a dense N x N covariance
+    warm_start is the state returned for the previous date, aligned to these assets
+    Returns (weights, osqp info, state)
+    """
+    return solve_mvo_gammas(
+        alphas, exposures, factor_cov, specific_var, [gamma], constraints, betas, [warm_start]
+    )[0]
+
+
+def solve_mvo_gammas(
+    alphas: np.ndarray,
+    exposures: np.ndarray,
+    factor_cov: np.ndarray,
+    specific_var: np.ndarray,
+    gammas: list,
+    constraints: list,
+    betas: np.ndarray | None = None,
+    warm_starts: list | None = None
+) -> list:
+    """
+    solve_mvo for several gammas on one date
+    P is gamma times a fixed matrix, so the problem is set up once and every further
+    gamma only updates the values of P, everything else (A, bounds, q) is shared
+    warm_starts holds the previous date's state for each gamma (or None), a gamma
+    without one starts from the solution of the gamma solved before it
+    Returns one (weights, osqp info, state) per gamma
+    """
+    n_assets, n_factors = exposures.shape
+    unknown = [name for name in constraints if name not in NATIVE_CONSTRAINTS]
+    if unknown:
+        raise ValueError(f"native solver does not support constraints: {unknown}")
+    warm_starts = warm_starts or [None] * len(gammas)
+
+    # x = [w, y], osqp minimizes 1/2 x'Px + q'x, P is built for gamma = 1 and scaled per solve
+    P = sp.triu(sp.block_diag([sp.diags(specific_var), sp.csc_matrix(factor_cov)], format="csc"), format="csc")
+    q = np.concatenate([-alphas, np.zeros(n_factors)])
+
+    # rows: B'w - y = 0, then the scalar constraints, then one row per asset for LongOnly
+    # every date has the same rows up to the per-asset block, so duals carry over by position
+    rows = [sp.hstack([sp.csc_matrix(exposures.T), -sp.identity(n_factors)])]
+    lower, upper = [np.zeros(n_factors)], [np.zeros(n_factors)]
+
+    weights_only = lambda block: sp.hstack([block, sp.csc_matrix((block.shape[0], n_factors))])
+
+    if "FullInvestment" in constraints:
+        rows.append(weights_only(sp.csc_matrix(np.ones((1, n_assets)))))
+        lower.append([1.0])
+        upper.append([1.0])
+    if "NoBuyingOnMargin" in constraints:
+        rows.append(weights_only(sp.csc_matrix(np.ones((1, n_assets)))))
+        lower.append([-np.inf])
+        upper.append([1.0])
+    if "UnitBeta" in constraints:
+        if betas is None:
+            raise ValueError("UnitBeta requires betas")
+        rows.append(weights_only(sp.csc_matrix(betas.reshape(1, -1))))
+        lower.append([1.0])
+        upper.append([1.0])
+
+    n_head = sum(len(bound) for bound in lower)
+
+    if "LongOnly" in constraints:
+        rows.append(weights_only(sp.identity(n_assets, format="csc")))
+        lower.append(np.zeros(n_assets))
+        upper.append(np.full(n_assets, np.inf))
+
+    A = sp.vstack(rows, format="csc")
+
+    settings = dict(OSQP_SETTINGS)
+    if warm_starts[0] is not None:
+        # a step size tuned on yesterday's problem converges in a fraction of the iterations
+        settings["rho"] = warm_starts[0]["rho"]
+
+    solver = osqp.OSQP()
+    solver.setup(
+        gammas[0] * P, q, A,
+        np.concatenate(lower), np.concatenate(upper),
+        **settings
+    )
+
+    results = []
+    previous = None
+
+    for i, (gamma, warm_start) in enumerate(zip(gammas, warm_starts)):
+        if i > 0:
+            solver.update(Px=gamma * P.data)
+            if warm_start is not None:
+                solver.update_settings(rho=warm_start["rho"])
+
+        # the previous gamma on this date is the next best start after yesterday's state
+        warm_start = warm_start if warm_start is not None else previous
+        if warm_start is not None:
+            weights = warm_start["weights"]
+            duals = warm_start["duals"]
+            if "LongOnly" in constraints:
+                duals = np.concatenate([duals, warm_start["asset_duals"]])
+            solver.warm_start(x=np.concatenate([weights, exposures.T @ weights]), y=duals)
+
+        result = solver.solve()
+
+        state = {
+            "weights": result.x[:n_assets],
+            "duals": result.y[:n_head],
+            "asset_duals": result.y[n_head:] if "LongOnly" in constraints else np.zeros(n_assets),
+            "rho": result.info.rho_estimate,
+        }
+        results.append((result.x[:n_assets], result.info, state))
+        previous = state
+
+    return results
+
+
+def align_warm_start(state: dict, previous_barrids: list, barrids: list) -> dict:
+    """carry a previous date's solver state over to today's assets, new assets start at 0"""
+    aligned = pl.DataFrame({"barrid": barrids}).join(
+        pl.DataFrame({
+            "barrid": previous_barrids,
+            "weight": state["weights"],
+            "asset_dual": state["asset_duals"],
+        }),
+        on="barrid",
+        how="left"
+    ).fill_null(0)
+
+    return {
+        **state,
+        "weights": aligned["weight"].to_numpy(),
+        "asset_duals": aligned["asset_dual"].to_numpy(),
+    }
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""cross-sectional normalization of a signal: rank, z-score, winsorize and neutralize per date"""
+
+import numpy as np
+import polars as pl
+
+# keys of signal.normalization, the defaults give the plain per-date z-score
+NORMALIZATION = {
+    "rank": False,  # score the per-date rank of the signal instead of its value
+    "winsorize": None,  # clip z-scores to [-winsorize, winsorize]
+    "neutralize": [],  # numeric exposures regressed out per date, e.g. predicted_beta
+    "groups": None,  # categorical column demeaned within each date, e.g. an industry
+}
+
+def normalize_signal(data: pl.DataFrame, signal_name: str, normalization: dict | None = None) -> pl.DataFrame:
+    """
+    Add {signal_name}_score, the signal normalized across the assets of each date
+    The signal is ranked (optional), z-scored and clipped, then its residual on the groups and
+    exposures is taken and z-scored again, rows missing an exposure or group get no score
+    The residual comes from one group_by over date that collects the cross-products of the
+    demeaned exposures, the per-date least squares systems are solved together in numpy
+    Only the score and one column per exposure are added while it runs
+    """
+    settings = {**NORMALIZATION, **(normalization or {})}
+    unknown = sorted(set(settings) - set(NORMALIZATION))
+    if unknown:
+        raise ValueError(f"unknown normalization keys: {unknown}")
+
+    score = f"{signal_name}_score"
+    exposures = list(settings["neutralize"])
+    groups = settings["groups"]
+
+    frame = data.lazy()
+    if settings["rank"]:
+        frame = frame.with_columns(pl.col(signal_name).rank("average").over("date").cast(pl.Float64).alias(score))
+        signal = pl.col(score)
+    else:
+        signal = pl.col(signal_name)
+
+    z = _zscore(signal)
+    if settings["winsorize"] is not None:
+        z = z.clip(-settings["winsorize"], settings["winsorize"])
+    frame = frame.with_columns(z.alias(score))
+
+    if not exposures and groups is None:
+        if settings["winsorize"] is not None:
+            # clipping moves the mean and shrinks the spread
+            frame = frame.with_columns(_zscore(pl.col(score)).alias(score))
+        return frame.collect()
+
+    frame = _neutralize(frame.collect(), score, exposures, groups)
+    return frame.with_columns(_zscore(pl.col(score)).alias(score))
+
+def _zscore(column: pl.Expr) -> pl.Expr:
+    return (column - column.mean().over("date")) / column.std().over("date")
+
+def _neutralize(data: pl.DataFrame, score: str, exposures: list, groups: str | None) -> pl.DataFrame:
+    """
+    Residual of score on group dummies and exposures, per date
+    Demeaning score and exposures within (date, group) takes out the dummies (or the intercept),
+    the residual on the demeaned exposures is then the residual of the full regression
+    """
+    partition = ["date"] if groups is None else ["date", groups]
+    valid = pl.all_horizontal(pl.col(name).is_not_null() for name in [score, *exposures, *partition])
+    deviations = [f"_{name}_dev" for name in exposures]
+
+    def demeaned(name):
+        column = pl.when(valid).then(pl.col(name).cast(pl.Float64))
+        return column - column.mean().over(partition)
+
+    data = data.with_columns(
+        demeaned(score).alias(score),
+        *(demeaned(name).alias(dev) for name, dev in zip(exposures, deviations))
+    )
+    if not exposures:
+        return data
+
+    # X'X and X'y of every date from one pass, then a stack of k x k solves
+    k = len(exposures)
+    pairs = [(i, j) for i in range(k) for j in range(i, k)]
+    sums = data.group_by("date").agg(
+        *((pl.col(deviations[i]) * pl.col(deviations[j])).sum().alias(f"xx_{i}_{j}") for i, j in pairs),
+        *((pl.col(deviations[i]) * pl.col(score)).sum().alias(f"xy_{i}") for i in range(k))
+    )
+    xx = np.empty((len(sums), k, k))
+    for i, j in pairs:
+        xx[:, i, j] = xx[:, j, i] = sums[f"xx_{i}_{j}"].to_numpy()
+    xy = np.stack([sums[f"xy_{i}"].to_numpy() for i in range(k)], axis=1)
+    # the pseudo-inverse keeps dates with collinear or constant exposures finite
+    slopes = np.einsum("dij,dj->di", np.linalg.pinv(xx), xy)
+
+    coefficients = pl.DataFrame(
+        {"date": sums["date"], **{f"_slope_{i}": slopes[:, i] for i in range(k)}}
+    )
+    residual = pl.col(score) - pl.sum_horizontal(
+        pl.col(f"_slope_{i}") * pl.col(dev) for i, dev in enumerate(deviations)
+    )
+    return data.join(coefficients, on="date", how="left", maintain_order="left").with_columns(
+        residual.alias(score)
+    ).drop(*deviations, *coefficients.columns[1:])
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""long panel row order and date index, dense date x asset panel for signal computation"""
+
+import numpy as np
+import polars as pl
+
+# assets processed at once by the rolling kernels, bounds the cumulative-sum temporaries
+BLOCK_COLUMNS = 1024
+# rolling window kernels of Panel.rolling
+ROLLING_KERNELS = ["sum", "mean", "std"]
+# row orders of a long panel: "asset" for time-series work, "date" for cross sections
+PANEL_ORDERS = {"asset": ["barrid", "date"], "date": ["date", "barrid"]}
+
+def is_sorted_panel(data: pl.DataFrame, order: str = "asset") -> bool:
+    """whether the rows are strictly in the order's (key, key) sequence, checked without sorting"""
+    first, second = PANEL_ORDERS[order]
+    if len(data) < 2:
+        return True
+
+    # identifiers compare as text whatever their dtype, the outer key is only checked once per run
+    outer = data[first].rle().struct.field("value")
+    outer = outer.cast(pl.String) if first == "barrid" else outer
+    if outer.n_unique() < len(outer) or not outer.is_sorted():
+        return False
+
+    inner = pl.col(second).cast(pl.String) if second == "barrid" else pl.col(second)
+    run = pl.col(first).rle_id()
+    in_order = (inner > inner.shift()) | (run != run.shift())
+    return data.select(in_order.slice(1).all()).item()
+
+def sort_panel(data: pl.DataFrame, order: str = "asset") -> pl.DataFrame:
+    """the frame in the order's row sequence, returned as is when it already is"""
+    if is_sorted_panel(data, order):
+        return data
+    return data.sort(PANEL_ORDERS[order])
+
+class DateIndex:
+    """
+    date -> (offset, length) of the rows of a date-sorted frame
+    Every date's rows, or a run of consecutive dates, is a zero-copy slice of the frame
+    """
+
+    def __init__(self, data: pl.DataFrame):
+        runs = data["date"].rle().struct.unnest()
+        if runs["value"].n_unique() < len(runs):
+            raise ValueError("date index needs a frame sorted by date")
+        self.data = data
+        self._runs = runs.select("value", "len").rename({"value": "date"})
+        self.dates = runs["value"].to_list()
+        self.lengths = runs["len"].to_list()
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).tolist()
+        self.positions = {date_: i for i, date_ in enumerate(self.dates)}
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __iter__(self):
+        """(date, rows) for every date in order"""
+        for i, date_ in enumerate(self.dates):
+            yield date_, self.data.slice(self.offsets[i], self.lengths[i])
+
+    def __getitem__(self, date_) -> pl.DataFrame:
+        i = self.positions[date_]
+        return self.data.slice(self.offsets[i], self.lengths[i])
+
+    def between(self, first, last) -> pl.DataFrame:
+        """rows of the dates from first through last, both in the index"""
+        start, stop = self.positions[first], self.positions[last] + 1
+        return self.data.slice(self.offsets[start], self.offsets[stop] - self.offsets[start])
+
+    def counts(self) -> pl.DataFrame:
+        """rows per date, like group_by('date').len() in date order"""
+        return self._runs
+
+class Panel:
+    """
+    Columns of a long (date, barrid) frame held as dense T x N float64 matrices
+    Built once, signals work on whole matrices and only the result goes back to long form
+    Absent (date, barrid) pairs and nulls are NaN, present marks the rows of the source frame
+    Rolling windows and shifts step through each asset's own observations, so they match
+    .over('barrid') on the long frame sorted by date, gaps in an asset's history are skipped
+    """
+
+    def __init__(self, data: pl.DataFrame, columns: list):
+        dates = data['date']
+        barrids = data['barrid'].cast(pl.String)
+        self.dates = dates.unique().sort()
+        self.barrids = barrids.unique().sort()
+        # source row i sits at (rows[i], cols[i]), used to hand results back in source order
+        self.rows = _positions(dates, self.dates)
+        self.cols = _positions(barrids, self.barrids)
+        self.shape = (len(self.dates), len(self.barrids))
+
+        self.present = np.zeros(self.shape, dtype=bool)
+        self.present[self.rows, self.cols] = True
+        if self.present.sum() != len(data):
+            raise ValueError("panel needs unique (date, barrid) rows")
+
+        # flat position of every source row in the T x N matrices
+        self._cells = self.rows * self.shape[1] + self.cols
+
+        # per block of assets: flat positions of its present cells in the T x N matrices and in
+        # the packed matrix, whose row k holds every asset's k-th observation
+        observations = np.cumsum(self.present, axis=0, dtype=np.int32) - 1
+        self._blocks = []
+        for start in range(0, self.shape[1], BLOCK_COLUMNS):
+            block = slice(start, start + BLOCK_COLUMNS)
+            width = len(range(*block.indices(self.shape[1])))
+            rows, cols = np.nonzero(self.present[:, block])
+            obs = observations[:, block][rows, cols].astype(np.int64)
+            # rows past the longest history in the block would only hold NaN
+            n_obs = obs.max() + 1 if len(obs) else 0
+            self._blocks.append(((n_obs, width), rows * self.shape[1] + start + cols, obs * width + cols))
+
+        self.values = {name: self.scatter(data[name].cast(pl.Float64).to_numpy()) for name in columns}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.values[name]
+
+    def __setitem__(self, name: str, values: np.ndarray):
+        self.values[name] = values
+
+    def scatter(self, values: np.ndarray) -> np.ndarray:
+        """long values in source row order into a T x N matrix"""
+        matrix = np.full(self.shape, np.nan)
+        matrix.reshape(-1)[self._cells] = values
+        return matrix
+
+    def series(self, name: str, values: np.ndarray, dtype: pl.DataType = pl.Float64) -> pl.Series:
+        """a T x N matrix back in source row order, NaN becomes null"""
+        return pl.Series(name, np.ascontiguousarray(values).reshape(-1).take(self._cells)).fill_nan(None).cast(dtype)
+
+    def by_asset(self, data: pl.DataFrame) -> pl.DataFrame:
+        """the source frame (or one aligned with it) in (barrid, date) order, read off the grid instead of sorted"""
+        source_row = np.full(self.shape, -1, dtype=np.int64)
+        source_row.reshape(-1)[self._cells] = np.arange(len(self.rows))
+        return data[source_row.T[self.present.T]]
+
+    def rolling(self, values: np.ndarray, windows: list) -> list:
+        """
+        Several rolling windows of one column in a single pass, windows are
+        (kernel, window, min_periods, lag) with kernel in ROLLING_KERNELS, each result lagged by lag observations
+        The column is packed into observation time once and its running sums are shared by every window
+        """
+        for kernel, *_ in windows:
+            if kernel not in ROLLING_KERNELS:
+                raise ValueError(f"unknown rolling kernel: {kernel}")
+
+        def kernels(block):
+            moments = _moments(block, squares=any(kernel == "std" for kernel, *_ in windows))
+            return [_lag(_window_stat(moments, *window[:3]), window[3]) for window in windows]
+        return self._over_observations(values, kernels)
+
+    def rolling_sum(self, values: np.ndarray, window: int, min_periods: int | None = None) -> np.ndarray:
+        """sum over each asset's last window observations, null when fewer than min_periods are valid"""
+        return self.rolling(values, [("sum", window, min_periods, 0)])[0]
+
+    def rolling_mean(self, values: np.ndarray, window: int, min_periods: int | None = None) -> np.ndarray:
+        """mean over each asset's last window observations"""
+        return self.rolling(values, [("mean", window, min_periods, 0)])[0]
+
+    def rolling_std(
+        self, values: np.ndarray, window: int, min_periods: int | None = None, ddof: int = 1
+    ) -> np.ndarray:
+        """standard deviation over each asset's last window observations"""
+        def std(block):
+            return [_window_stat(_moments(block), "std", window, min_periods, ddof)]
+        return self._over_observations(values, std)[0]
+
+    def shift(self, values: np.ndarray, periods: int = 1) -> np.ndarray:
+        """each asset's value from periods observations earlier"""
+        return self._over_observations(values, lambda block: [_lag(block, periods)])[0]
+
+    def _over_observations(self, values: np.ndarray, kernel) -> list:
+        """
+        Run a time-series kernel in observation time
+        Each block of assets is packed so row k holds every asset's k-th observation,
+        the kernel runs down the rows and returns a list of packed results, each unpacked onto the dates
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+        results = None
+
+        for shape, cells, packed_cells in self._blocks:
+            packed = np.full(shape, np.nan)
+            packed.reshape(-1)[packed_cells] = values.take(cells)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                outs = kernel(packed)
+            if results is None:
+                results = [np.full(self.shape, np.nan) for _ in outs]
+            for result, out in zip(results, outs):
+                result.reshape(-1)[cells] = out.reshape(-1).take(packed_cells)
+
+        return results if results is not None else [np.full(self.shape, np.nan) for _ in kernel(np.empty((0, 0)))]
+
+def _positions(column: pl.Series, levels: pl.Series) -> np.ndarray:
+    """index of each value of column in the sorted unique levels"""
+    if column.dtype == pl.String:
+        # an enum over the sorted levels has exactly those positions as its codes
+        return column.cast(pl.Enum(levels)).to_physical().to_numpy().astype(np.int64)
+    return np.searchsorted(levels.to_physical().to_numpy(), column.to_physical().to_numpy())
+
+def _moments(block: np.ndarray, squares: bool = True) -> dict:
+    """
+    running count, sum and (if squares) sum of squares down the rows, NaN ignored
+    Sums are of each asset's values minus its mean (center) so squares do not cancel
+    """
+    valid = ~np.isnan(block)
+    values = np.where(valid, block, 0.0)
+
+    n_valid = valid.sum(axis=0)
+    center = np.where(n_valid > 0, values.sum(axis=0) / np.maximum(n_valid, 1), 0.0)
+    centered = np.where(valid, values - center, 0.0)
+
+    return {
+        "center": center,
+        "count": np.cumsum(valid, axis=0, dtype=np.float64),
+        "sum": np.cumsum(centered, axis=0),
+        "squares": np.cumsum(centered * centered, axis=0) if squares else None,
+    }
+
+def _windowed(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """totals over the last window rows from running totals"""
+    totals = cumulative.copy()
+    totals[window:] -= cumulative[:-window]
+    return totals
+
+def _window_stat(moments: dict, kernel: str, window: int, min_periods: int | None = None, ddof: int = 1) -> np.ndarray:
+    """
+    sum, mean or std over the last window rows from running moments
+    Windows with fewer than min_periods (default window) valid values are NaN
+    """
+    min_periods = window if min_periods is None else min_periods
+    count = _windowed(moments["count"], window)
+    count[count < max(min_periods, 1)] = np.nan
+    centered_sum = _windowed(moments["sum"], window)
+
+    if kernel == "sum":
+        return centered_sum + count * moments["center"]
+    if kernel == "mean":
+        return centered_sum / count + moments["center"]
+    centered_squares = _windowed(moments["squares"], window)
+    variance = (centered_squares - centered_sum * centered_sum / count) / (count - ddof)
+    return np.sqrt(np.clip(variance, 0, None))
+
+def _lag(block: np.ndarray, periods: int) -> np.ndarray:
+    """rows moved down by periods, NaN coming in"""
+    if periods == 0:
+        return block
+    shifted = np.full_like(block, np.nan)
+    if periods > 0:
+        shifted[periods:] = block[:len(block) - periods]
+    else:
+        shifted[:periods] = block[-periods:]
+    return shifted
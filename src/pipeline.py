@@ -4,18 +4,45 @@ Complete research pipeline: data → signals → backtest → results
 """
 
 import polars as pl
+import datetime as dt
 import yaml
 import argparse
+import glob
 from pathlib import Path
+from typing import Callable
+import shutil
 import sys
 
 # Absolute imports
-from src.data_loader import load_barra_data
-from src.signal_loader import compute_alphas
+from src.data_loader import load_asset_returns, load_barra_data
+from src.signal_loader import compute_alphas, update_alphas
+from src.signals import signal_spec
 from src.backtester import run_mvo_backtest
+from src.quick_backtester import run_quick_backtest
+from src.alpha_store import read_alpha_artifact, write_alpha_artifact
+from src.weights_store import WEIGHT_THRESHOLD, scan_sparse_weights, write_sparse_weights
+from src.portfolio_returns import stream_portfolio_returns
+from src.pipelined import run_pipelined
+from src.analytics import HORIZONS, compute_signal_analytics, write_signal_analytics
+from src.artifact_cache import cached_stage, stage_key
+from src.telemetry import run_report, stage
 import sf_quant.performance as sfp
 
-def main(config_path: str):
+DATA_SECTIONS = ["data_loading", "data_cleaning"]
+BACKTEST_MODES = ["mvo", "quick"]
+RETURN_ENGINES = ["sf_quant", "streaming"]
+EXECUTION_MODES = ["monolithic", "pipelined"]
+# backtest settings the quick mode reads, the mvo backtest reads all others
+QUICK_BACKTEST_KEYS = ["mode", "quick", "rebalance"]
+# calendar days loaded ahead of an update's new dates for the liquidity filters' previous-day values
+LOAD_PADDING_DAYS = 31
+
+def main(config_path: str, load_data: Callable[[], pl.DataFrame] | None = None, force: bool = False):
+    """
+    Run the pipeline for a single config
+    load_data overrides the data stage (used by sweeps to share one load)
+    Stage outputs are cached under output.cache_path unless force is set
+    """
     config_file = Path(config_path)
     
     # 1. Derive Run Name from Filename
@@ -38,38 +65,118 @@ def main(config_path: str):
 
     signal_config = config["signal"]
     signal_name = signal_config["name"]
+    backtest_config = config["backtest"]
+    backtest_mode = backtest_config.get("mode", "mvo")
+    if backtest_mode not in BACKTEST_MODES:
+        raise ValueError(f"unknown backtest mode: {backtest_mode}")
+    returns_config = config.get("returns", {})
+    if returns_config.get("engine", "sf_quant") not in RETURN_ENGINES:
+        raise ValueError(f"unknown returns engine: {returns_config['engine']}")
+    execution_mode = config.get("execution", {}).get("mode", "monolithic")
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"unknown execution mode: {execution_mode}")
+    # a sweep hands in data it already loaded, there is nothing left to overlap
+    pipelined = execution_mode == "pipelined" and load_data is None
 
     # 4. Prepare Output Directory
     # e.g., data/results/str_22_low_quality/
     output_dir = Path(config["output"]["results_path"]) / run_name
     output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # stage keys chain: each one hashes its config section plus the upstream key
+    cache_root = config["output"].get("cache_path")
+    keys = stage_keys(config, "pipelined" if pipelined else "monolithic")
 
     # 5. Load Data
     # Note: passing the path string as your loader likely expects a string
-    print("Loading data...")
-    data = load_barra_data(str(config_file))
+    if load_data is None:
+        load_data = lambda: load_data_stage(str(config_file), force)
     
     # 6. Compute Signals
-    print(f"Computing signals (Type: {signal_config.get('type')})...")
-    alpha_data = compute_alphas(data, signal_config)
+    # pipelined runs produce the weights together with the alphas, year by year
+    pipelined_weights = {}
+    def alpha_stage():
+        if pipelined:
+            print("Computing signals and backtests by year...")
+            alpha_data, pipelined_weights["data"] = run_pipelined(
+                str(config_file), signal_config, backtest_alphas, backtest_config.get("rebalance", "daily")
+            )
+            return alpha_data
+        data = load_data()
+        print(f"Computing signals (Type: {signal_config.get('type')})...")
+        return compute_alphas(data, signal_config)
+    
+    # the backtest and the analytics share one copy of the alphas
+    alphas = {}
+    def load_alphas():
+        if "data" not in alphas:
+            alphas["data"] = cached_stage(cache_root, "alphas", keys["alphas"], alpha_stage, force)
+        return alphas["data"]
     
     # 7. Run Backtest
-    print("Running backtests...")
-    weights = run_mvo_backtest(
-        alpha_data=alpha_data,
-        signal_name=signal_name, 
-        constraints=config["backtest"]["constraints"],
-        gamma=config["backtest"]["gamma"],
-        n_cpus=config["backtest"]["n_cpus"]
-    )
-    returns = sfp.generate_returns_from_weights(weights=weights)
+    # per-date solver log of the mvo backtest, one file per backtest call (a year when pipelined)
+    solve_log_path = output_dir / f"{run_name}_solves"
+    def weights_stage():
+        # recomputed weights replace the whole log, cached ones keep the log they were solved with
+        if solve_log_path.exists():
+            shutil.rmtree(solve_log_path)
+        alpha_data = load_alphas()
+        if "data" in pipelined_weights:
+            return pipelined_weights.pop("data")
+        return backtest_alphas(alpha_data)
     
-    # 8. Save Core Artifacts
-    print(f"Saving results to: {output_dir}")
+    def backtest_alphas(alpha_data: pl.DataFrame) -> pl.DataFrame:
+        with stage("backtest", alpha_data) as timed:
+            return timed.output(
+                backtest_weights(alpha_data, signal_name, backtest_config, str(checkpoint_dir), str(solve_log_path))
+            )
     
-    weights.write_parquet(output_dir / f"{run_name}_weights.parquet")
-    #alpha_data.write_parquet(output_dir / f"{run_name}_alphas.parquet")    # takes up too much space & is unnecessary
-    returns.write_parquet(output_dir / f"{run_name}_returns.parquet")
+    # checkpoints are keyed like the weights artifact so a rerun of the same config resumes
+    checkpoint_dir = Path(cache_root or output_dir) / "checkpoints" / keys["weights"]
+    if force and checkpoint_dir.exists():
+        shutil.rmtree(checkpoint_dir)
+    
+    # stage timings, cpu, memory and row counts under output_dir/telemetry, see telemetry.py
+    with run_report(run_name, output_dir, config.get("execution", {}).get("profile")):
+        weights = cached_stage(cache_root, "weights", keys["weights"], weights_stage, force)
+    
+        # 8. Save Core Artifacts
+        print(f"Saving results to: {output_dir}")
+    
+        # near-zero weights are dropped, the streaming returns engine reads these files back
+        weights_path = output_dir / f"{run_name}_weights"
+        with stage("write", weights):
+            write_sparse_weights(weights, weights_path, returns_config.get("weights_threshold", WEIGHT_THRESHOLD))
+        
+        def returns_stage():
+            with stage("returns", weights) as timed:
+                return timed.output(generate_returns(weights, returns_config, weights_path, str(config_file)))
+        returns = cached_stage(cache_root, "returns", keys["returns"], returns_stage, force)
+        
+        # only the columns the analytics and plots read, as Float32 by year, see read_alpha_artifact
+        alpha_data = load_alphas()
+        with stage("write", alpha_data):
+            write_alpha_artifact(alpha_data, signal_name, output_dir / f"{run_name}_alphas")
+            returns.write_parquet(output_dir / f"{run_name}_returns.parquet")
+    
+        # the finished weights supersede the per-chunk checkpoints
+        if checkpoint_dir.exists():
+            shutil.rmtree(checkpoint_dir)
+    
+        # 9. Signal Analytics (IC by horizon, quantile returns, turnover), read back by the plots
+        analytics_config = config.get("analytics")
+        if analytics_config is not None:
+            print("Computing signal analytics...")
+            with stage("analytics", alpha_data):
+                analytics = compute_signal_analytics(
+                    alpha_data,
+                    signal_name,
+                    horizons=analytics_config.get("horizons", HORIZONS),
+                    n_quantiles=analytics_config.get("n_quantiles", 5)
+                )
+                write_signal_analytics(analytics, output_dir / "analytics")
+        del alpha_data
+        alphas.clear()
     
     # # 10. Generate Visualizations
     # print("Generating visualizations...")
@@ -77,22 +184,277 @@ def main(config_path: str):
     #     weights=weights,
     #     alpha_data=alpha_data,
     #     signal_name=run_name,
-    #     output_path=str(output_dir)
+    #     output_path=str(output_dir),
+    #     analytics_path=str(output_dir / "analytics")
     # )
     
     print(f"Pipeline complete for: {run_name}")
 
+def backtest_weights(
+    alpha_data: pl.DataFrame,
+    signal_name: str,
+    backtest_config: dict,
+    checkpoint_dir: str,
+    solve_log_path: str
+) -> pl.DataFrame:
+    """weights of the configured backtest mode, the mvo backtest checkpoints to checkpoint_dir"""
+    if backtest_config.get("mode", "mvo") == "quick":
+        # optimizer-free screen, same weights schema as the MVO backtest
+        quick_config = backtest_config.get("quick", {})
+        print("Running quick backtest...")
+        return run_quick_backtest(
+            alpha_data=alpha_data,
+            signal_name=signal_name,
+            portfolio=quick_config.get("portfolio", "quantile"),
+            n_quantiles=quick_config.get("n_quantiles", 5),
+            beta_neutral=quick_config.get("beta_neutral", True),
+            rebalance=backtest_config.get("rebalance", "daily")
+        )
+    print("Running backtests...")
+    return run_mvo_backtest(
+        alpha_data=alpha_data,
+        signal_name=signal_name, 
+        constraints=backtest_config["constraints"],
+        gamma=backtest_config["gamma"],
+        n_cpus=backtest_config["n_cpus"],
+        checkpoint_dir=checkpoint_dir,
+        checkpoint_every=backtest_config.get("checkpoint_every", 250),
+        memory_budget_gb=backtest_config.get("memory_budget_gb"),
+        max_in_flight=backtest_config.get("max_in_flight"),
+        executor=backtest_config.get("executor", "ray"),
+        solver=backtest_config.get("solver", "sf_quant"),
+        risk_model_path=backtest_config.get("risk_model_path"),
+        rebalance=backtest_config.get("rebalance", "daily"),
+        solve_log_path=solve_log_path
+    )
+
+def update_run(config_path: str):
+    """
+    Extend a finished run to its config's end_date without recomputing the history
+    The stored alpha artifact is continued through update_alphas with the dates after its last one,
+    only those dates are backtested and added to the stored weights, returns and analytics are rebuilt
+    """
+    config_file = Path(config_path)
+    run_name = config_file.stem
+    with open(config_file) as f:
+        config = yaml.safe_load(f)
+    
+    signal_config = config["signal"]
+    signal_name = signal_config["name"]
+    backtest_config = config["backtest"]
+    # a weekly or monthly period running across the last stored date would be rebalanced twice
+    if backtest_config.get("rebalance", "daily") != "daily":
+        raise ValueError(f"updating a run needs daily rebalancing, got {backtest_config['rebalance']}")
+    
+    output_dir = Path(config["output"]["results_path"]) / run_name
+    alpha_path = output_dir / f"{run_name}_alphas"
+    weights_path = output_dir / f"{run_name}_weights"
+    alpha_data = read_alpha_artifact(alpha_path)
+    last_date = alpha_data["date"].max()
+    
+    print(f"Updating {run_name} after {last_date}")
+    # padded so the liquidity filters see the days before the first new date
+    new_data = load_barra_data(config_path, start=last_date - dt.timedelta(days=LOAD_PADDING_DAYS))
+    alpha_data = update_alphas(alpha_data, new_data, signal_config).with_columns(
+        pl.col("barrid").cast(pl.String), pl.col(pl.Float32).cast(pl.Float64)
+    )
+    new_alphas = alpha_data.filter(pl.col("date") > last_date)
+    if new_alphas.is_empty():
+        return
+    
+    checkpoint_dir = Path(config["output"].get("cache_path") or output_dir) / "checkpoints" / f"{run_name}_update"
+    if checkpoint_dir.exists():
+        shutil.rmtree(checkpoint_dir)
+    new_weights = backtest_weights(
+        new_alphas, signal_name, backtest_config, str(checkpoint_dir), str(output_dir / f"{run_name}_solves")
+    )
+    stored = scan_sparse_weights(weights_path).collect()
+    weights = pl.concat([stored, new_weights.select(stored.columns)], how="vertical_relaxed")
+    if checkpoint_dir.exists():
+        shutil.rmtree(checkpoint_dir)
+    
+    returns_config = config.get("returns", {})
+    write_sparse_weights(weights, weights_path, returns_config.get("weights_threshold", WEIGHT_THRESHOLD))
+    returns = generate_returns(weights, returns_config, weights_path, config_path)
+    write_alpha_artifact(alpha_data, signal_name, alpha_path)
+    returns.write_parquet(output_dir / f"{run_name}_returns.parquet")
+    
+    analytics_config = config.get("analytics")
+    if analytics_config is not None:
+        print("Computing signal analytics...")
+        analytics = compute_signal_analytics(
+            alpha_data,
+            signal_name,
+            horizons=analytics_config.get("horizons", HORIZONS),
+            n_quantiles=analytics_config.get("n_quantiles", 5)
+        )
+        write_signal_analytics(analytics, output_dir / "analytics")
+    
+    print(f"Update complete for: {run_name}, {new_alphas['date'].n_unique()} dates added")
+
+def generate_returns(
+    weights: pl.DataFrame,
+    returns_config: dict | None = None,
+    weights_path: str | None = None,
+    config_path: str | None = None
+) -> pl.DataFrame:
+    """
+    portfolio returns from the weights, one series per gamma when gamma was a list
+    The streaming engine walks the sparse weights at weights_path chunk by chunk against the
+    forward returns sfp reads, loaded for the held assets only (see load_asset_returns,
+    config_path is the run's config), and adds turnover and returns net of returns.cost_bps
+    """
+    returns_config = returns_config or {}
+    if returns_config.get("engine", "sf_quant") == "streaming":
+        def asset_returns(start: dt.date, end: dt.date, barrids: list) -> pl.DataFrame:
+            return load_asset_returns(config_path, start, end, barrids)
+        
+        gammas = weights["gamma"].unique(maintain_order=True).to_list() if "gamma" in weights.columns else [None]
+        returns = []
+        for gamma in gammas:
+            gamma_returns = stream_portfolio_returns(
+                scan_sparse_weights(weights_path, gamma), asset_returns, returns_config.get("cost_bps", 0.0)
+            )
+            returns.append(gamma_returns if gamma is None else gamma_returns.with_columns(pl.lit(gamma).alias("gamma")))
+        return pl.concat(returns)
+    
+    if "gamma" not in weights.columns:
+        return sfp.generate_returns_from_weights(weights=weights)
+    
+    return pl.concat([
+        sfp.generate_returns_from_weights(weights=gamma_weights.drop("gamma")).with_columns(
+            pl.lit(gamma).alias("gamma")
+        )
+        for (gamma,), gamma_weights in weights.partition_by("gamma", as_dict=True, maintain_order=True).items()
+    ])
+
+def load_data_stage(config_path: str, force: bool = False) -> pl.DataFrame:
+    """load and clean the panel, going through the stage cache when configured"""
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    
+    def load():
+        print("Loading data...")
+        return load_barra_data(config_path)
+    
+    cache_root = config.get("output", {}).get("cache_path")
+    return cached_stage(cache_root, "data", data_key(config), load, force)
+
+def stage_keys(config: dict, execution_mode: str | None = None) -> dict:
+    """
+    artifact keys for every stage of a config, each hashing only the settings its mode reads
+    execution_mode is the mode the run actually uses when it is not the configured one,
+    a pipelined config run on data handed in by a sweep is monolithic
+    """
+    keys = {"data": data_key(config)}
+    # pipelined runs compute the alphas and weights segment by segment, keep them apart from monolithic ones
+    mode = execution_mode or config.get("execution", {}).get("mode", "monolithic")
+    signal_config = config.get("signal")
+    signal_configs = signal_config if isinstance(signal_config, list) else [signal_config]
+    versions = [signal_spec(entry)["version"] for entry in signal_configs if entry is not None]
+    keys["alphas"] = stage_key(
+        {"signal": signal_config, "signal_versions": versions, "execution": mode}, keys["data"]
+    )
+    keys["weights"] = stage_key({"backtest": backtest_settings(config.get("backtest") or {})}, keys["alphas"])
+    keys["returns"] = stage_key({"returns": returns_settings(config.get("returns") or {})}, keys["weights"])
+    return keys
+
+def backtest_settings(backtest_config: dict) -> dict:
+    """the backtest section without the settings of the other mode"""
+    mode = backtest_config.get("mode", "mvo")
+    if mode == "quick":
+        settings = {key: value for key, value in backtest_config.items() if key in QUICK_BACKTEST_KEYS}
+    else:
+        settings = {key: value for key, value in backtest_config.items() if key != "quick"}
+    return {**settings, "mode": mode}
+
+def returns_settings(returns_config: dict) -> dict:
+    """the returns section, only the engine for sf_quant, which reads neither the stored weights nor costs"""
+    engine = returns_config.get("engine", "sf_quant")
+    if engine == "sf_quant":
+        return {"engine": engine}
+    return {**returns_config, "engine": engine}
+
+def run_sweep(config_paths: list, force: bool = False):
+    """
+    Run several configs, loading data once per distinct data section
+    Each config still writes to its own output directory
+    """
+    groups = group_configs(config_paths)
+    
+    print(f"Sweep: {len(config_paths)} configs in {len(groups)} data group(s)")
+    
+    for paths in groups.values():
+        shared = {}
+        
+        # loaded on first use, so fully cached configs never touch the data
+        def load_shared(path=paths[0]):
+            if "data" not in shared:
+                print(f"Loading shared data for: {', '.join(Path(p).stem for p in paths)}")
+                shared["data"] = load_data_stage(str(path), force)
+            return shared["data"]
+        
+        for path in paths:
+            main(path, load_data=load_shared, force=force)
+        
+        shared.clear()
+
+def group_configs(config_paths: list) -> dict:
+    """group config paths by a hash of their data_loading/data_cleaning sections"""
+    groups = {}
+    for path in config_paths:
+        with open(path) as f:
+            config = yaml.safe_load(f)
+        groups.setdefault(data_key(config), []).append(path)
+    return groups
+
+def data_key(config: dict) -> str:
+    """stable hash of the config sections that determine the cleaned panel"""
+    return stage_key({name: config.get(name) for name in DATA_SECTIONS})
+
+def expand_config_paths(patterns: list) -> list:
+    """expand glob patterns into a sorted, de-duplicated list of config files"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        paths.extend(match for match in matches if match not in paths)
+    return paths
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the research pipeline for a specific signal.")
     
-    parser.add_argument(
+    configs = parser.add_mutually_exclusive_group(required=True)
+    configs.add_argument(
         "--config", 
         type=str, 
-        required=True,
         dest="config_path", # Maps the input to 'args.config_path'
         help="Path to the configuration file."
     )
+    configs.add_argument(
+        "--configs",
+        type=str,
+        nargs="+",
+        dest="config_paths",
+        help="Config files or glob patterns to run as a sweep sharing data loads."
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Extend finished runs to their config's end_date, computing only the new dates."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Recompute every stage, ignoring cached artifacts."
+    )
     
     args = parser.parse_args()
-    # passes the string (e.g., "config_files/str_22_low_quality.yaml") to main()
-    main(config_path=args.config_path)
\ No newline at end of file
+    if args.update:
+        for path in expand_config_paths(args.config_paths or [args.config_path]):
+            update_run(path)
+    elif args.config_paths:
+        # e.g. --configs "config_files/*.yaml"
+        run_sweep(expand_config_paths(args.config_paths), force=args.force)
+    else:
+        # passes the string (e.g., "config_files/str_22_low_quality.yaml") to main()
+        main(config_path=args.config_path, force=args.force)
\ No newline at end of file
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""streaming portfolio returns, turnover and cost-adjusted returns"""
+
+from itertools import islice
+
+import polars as pl
+
+from src.panel import DateIndex, sort_panel
+
+# weight dates whose asset returns are loaded at once
+RETURN_CHUNK_DATES = 63
+
+def stream_portfolio_returns(
+    weights: pl.LazyFrame | pl.DataFrame,
+    load_returns,
+    cost_bps: float = 0.0
+) -> pl.DataFrame:
+    """
+    Walk the dates in order holding one date's book at a time
+    weights (date, barrid, weight) are read as batches, RETURN_CHUNK_DATES weight dates at a time,
+    load_returns(start, end, barrids) gives the (date, barrid, fwd_return) of barrids from start
+    through end and is called once per chunk with the assets it holds, so only one chunk's
+    returns are in memory
+    Weights dated t earn t's forward return, as in sfp.generate_returns_from_weights, assets
+    without one are flat, between weight dates the book drifts with the forward returns
+    turnover on t is sum |w_t - w_{t-1} drifted to t|, the first book is traded from cash
+    net_return is return less cost_bps of the turnover traded on t
+    """
+    schema = {'date': weights.lazy().collect_schema()['date'], 'return': pl.Float64, 'turnover': pl.Float64}
+    weight_days = _by_date(weights.lazy().select('date', 'barrid', 'weight').collect_batches())
+
+    rows = []
+    book, previous = None, None
+    while chunk := list(islice(weight_days, RETURN_CHUNK_DATES)):
+        books = {
+            date_: day.select(pl.col('barrid').cast(pl.String), pl.col('weight').cast(pl.Float64))
+            for date_, day in chunk
+        }
+        # the book carried in drifts up to the chunk's first weights
+        held = [book['barrid']] if book is not None else []
+        barrids = pl.concat(held + [day['barrid'] for day in books.values()]).unique().to_list()
+        first = chunk[0][0] if previous is None else previous
+        returns = load_returns(first, chunk[-1][0], barrids).select(
+            'date', pl.col('barrid').cast(pl.String), pl.col('fwd_return').cast(pl.Float64).alias('return')
+        )
+        if previous is not None:
+            returns = returns.filter(pl.col('date') > previous)
+        return_days = DateIndex(sort_panel(returns, "date"))
+
+        for date_ in books:
+            if date_ not in return_days.positions:
+                raise ValueError(f"weights on {date_} have no asset returns on that date")
+
+        for date_, day_returns in return_days:
+            trade = None
+            if date_ in books:
+                trade = _turnover(books[date_], book)
+                book = books[date_]
+            book, period_return = _drift(book, day_returns)
+            if trade is not None:
+                rows.append((date_, period_return, trade))
+        previous = chunk[-1][0]
+
+    return pl.DataFrame(rows, schema=schema, orient='row').with_columns(
+        (pl.col('return') - cost_bps / 1e4 * pl.col('turnover')).alias('net_return')
+    )
+
+def _drift(book: pl.DataFrame, day_returns: pl.DataFrame) -> tuple:
+    """the book's return over a date and its weights after the move"""
+    held = book.join(day_returns.select('barrid', 'return'), on='barrid', how='left').with_columns(
+        pl.col('return').fill_null(0.0)
+    )
+    period_return = (held['weight'] * held['return']).sum()
+    drifted = held.select('barrid', (pl.col('weight') * (1 + pl.col('return')) / (1 + period_return)).alias('weight'))
+    return drifted, period_return
+
+def _turnover(new_book: pl.DataFrame, book: pl.DataFrame | None) -> float:
+    """sum of absolute weight changes from the held book"""
+    if book is None:
+        return new_book['weight'].abs().sum()
+    change = new_book.join(book, on='barrid', how='full', coalesce=True, suffix='_held').select(
+        (pl.col('weight').fill_null(0.0) - pl.col('weight_held').fill_null(0.0)).abs().sum()
+    )
+    return change.item()
+
+def _by_date(batches):
+    """(date, rows) from date-ordered batches, a date split across two batches comes out whole"""
+    carry = None
+    for batch in batches:
+        if batch.is_empty():
+            continue
+        if carry is not None:
+            batch = pl.concat([carry, batch], rechunk=False)
+        days = list(DateIndex(batch))
+        yield from days[:-1]
+        carry = days[-1][1]
+    if carry is not None:
+        yield carry['date'][0], carry
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""optimizer-free quick backtests built straight from the alphas"""
+
+import polars as pl
+
+from src.backtester import drift_weights, rebalance_dates
+
+PORTFOLIOS = ["quantile", "rank", "alpha"]
+
+def run_quick_backtest(
+    alpha_data: pl.DataFrame,
+    signal_name: str,
+    portfolio: str = "quantile",
+    n_quantiles: int = 5,
+    beta_neutral: bool = True,
+    rebalance: str | int = "daily"
+) -> pl.DataFrame:
+    """
+    Screen a signal without the optimizer, every date's portfolio is a few window expressions
+    "quantile" is long the top and short the bottom quantile, equally weighted within each leg
+    "rank" weights by demeaned cross-sectional rank, "alpha" by demeaned alpha
+    beta_neutral takes out each date's beta exposure while keeping the book dollar neutral
+    Books are scaled to 1 long / 1 short, same date/barrid/weight schema as run_mvo_backtest
+    """
+    if portfolio not in PORTFOLIOS:
+        raise ValueError(f"unknown portfolio: {portfolio}")
+    if n_quantiles < 2:
+        raise ValueError("n_quantiles must be at least 2")
+
+    data = alpha_data.lazy().filter(
+        pl.col(f"{signal_name}_alpha").is_not_null()
+    ).select(
+        'date',
+        pl.col('barrid').cast(pl.String),
+        pl.col(f'{signal_name}_alpha').cast(pl.Float64).alias('alpha'),
+        pl.col('predicted_beta').cast(pl.Float64)
+    )
+    if beta_neutral:
+        data = data.filter(pl.col('predicted_beta').is_not_null())
+
+    data = _raw_weights(data.sort(['date', 'barrid']), portfolio, n_quantiles)
+
+    if beta_neutral:
+        data = _beta_neutralize(data)
+
+    weights = data.with_columns(
+        # a date with nothing to go long or short gets an empty book
+        (2 * pl.col('weight') / pl.col('weight').abs().sum().over('date')).fill_nan(0).alias('weight')
+    ).select('date', 'barrid', 'weight').collect()
+
+    if weights.is_empty():
+        print("warning: no data after filtering for backtest")
+        return pl.DataFrame()
+
+    dates = weights["date"].unique().sort().to_list()
+    solve_dates = rebalance_dates(dates, rebalance)
+    if len(solve_dates) < len(dates):
+        if "return" not in alpha_data.columns:
+            raise ValueError("rebalance other than daily needs a 'return' column to drift weights")
+        returns = alpha_data.select(
+            'date', pl.col('barrid').cast(pl.String), pl.col('return').cast(pl.Float64)
+        )
+        weights = drift_weights(
+            weights.filter(pl.col('date').is_in(solve_dates)), returns, dates
+        ).sort(['date', 'barrid'])
+
+    # the daily book keeps the date/barrid order it was built in
+    return weights
+
+def _raw_weights(data: pl.LazyFrame, portfolio: str, n_quantiles: int) -> pl.LazyFrame:
+    """unscaled dollar-neutral weights for each date"""
+    alpha = pl.col('alpha')
+
+    if portfolio == "alpha":
+        return data.with_columns((alpha - alpha.mean().over('date')).alias('weight'))
+
+    if portfolio == "rank":
+        data = data.with_columns(alpha.rank('average').over('date').alias('rank'))
+        return data.with_columns((pl.col('rank') - pl.col('rank').mean().over('date')).alias('weight'))
+
+    # ordinal ranks split ties by barrid, the frame is sorted on it
+    bucket = (alpha.rank('ordinal') - 1) * n_quantiles // pl.len()
+    data = data.with_columns(
+        pl.when(bucket.over('date') == n_quantiles - 1).then(1.0)
+        .when(bucket.over('date') == 0).then(-1.0)
+        .otherwise(0.0).alias('side')
+    )
+    return data.with_columns((pl.col('side') / pl.len().over('date', 'side')).alias('weight'))
+
+def _beta_neutralize(data: pl.LazyFrame) -> pl.LazyFrame:
+    """residual of each date's weights regressed on [1, beta], so sum(w) = 0 and sum(w * beta) = 0"""
+    data = data.with_columns(
+        (pl.col('weight') - pl.col('weight').mean().over('date')).alias('weight_dev'),
+        (pl.col('predicted_beta') - pl.col('predicted_beta').mean().over('date')).alias('beta_dev')
+    )
+    weight_dev, beta_dev = pl.col('weight_dev'), pl.col('beta_dev')
+    beta_var = (beta_dev ** 2).sum().over('date')
+    slope = pl.when(beta_var > 0).then((weight_dev * beta_dev).sum().over('date') / beta_var).otherwise(0.0)
+    return data.with_columns((weight_dev - slope * beta_dev).alias('weight'))
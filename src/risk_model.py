@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""on-disk per-date barra risk model store"""
+
+import datetime as dt
+import functools
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import sf_quant.data as sfd
+
+# dates kept open in memory per store
+LRU_DATES = 32
+ARRAYS = ["exposures", "factor_cov", "specific_var"]
+# arrays are stored in single precision, solves upcast the rows they read
+STORE_DTYPE = np.float32
+
+
+class RiskModelStore:
+    """
+    Each date's exposures, factor covariance and specific variance, in decimal space
+    A date only holds the assets solved on it: each build adds a part with the assets a solve asked
+    for that were not stored yet. Arrays are stored as float32 .npy files and memory-mapped on read
+    The store only depends on the date: gammas, constraints and signals all share it
+    """
+
+    def __init__(self, path: str, max_dates: int = LRU_DATES):
+        self.path = Path(path)
+        self.max_dates = max_dates
+        self._dates = OrderedDict()
+
+    def factor_model(self, date_: dt.date, barrids: list) -> tuple:
+        """(exposures N x K, factor_cov K x K, specific_var N) for barrids, assets barra does not cover are 0"""
+        model = self.load(date_, barrids)
+        exposures, specific_var = select_assets(
+            model["index"], model["exposures"], model["specific_var"], barrids
+        )
+        return exposures, np.asarray(model["factor_cov"], dtype=np.float64), specific_var
+
+    def covariance_matrix(self, date_: dt.date, barrids: list) -> pl.DataFrame:
+        """drop-in for sfd.construct_covariance_matrix served from the store"""
+        exposures, factor_cov, specific_var = self.factor_model(date_, barrids)
+        covariance = exposures @ factor_cov @ exposures.T + np.diag(specific_var)
+
+        return pl.DataFrame({
+            "barrid": barrids,
+            **{barrid: covariance[:, i] for i, barrid in enumerate(barrids)},
+        })
+
+    def load(self, date_: dt.date, barrids: list) -> dict:
+        """memory-mapped arrays and barrid index of a date holding at least barrids, through the LRU"""
+        model = self._dates.get(date_)
+        if model is None or any(barrid not in model["index"] for barrid in barrids):
+            model = self._read(date_)
+            missing = sorted(set(barrids) - model["index"].keys())
+            if missing:
+                self.build(date_, missing)
+                model = self._read(date_)
+            self._dates[date_] = model
+
+        self._dates.move_to_end(date_)
+        if len(self._dates) > self.max_dates:
+            self._dates.popitem(last=False)
+
+        return model
+
+    def build(self, date_: dt.date, barrids: list):
+        """
+        pull barrids on a date from sf_quant and write them as a new part of the date,
+        a concurrent build of the same part wins or loses cleanly
+        """
+        barrids, factors, exposures, factor_cov, specific_var = load_risk_model(date_, barrids)
+
+        date_dir = self.path / date_.isoformat()
+        part = "part_" + hashlib.sha256("\n".join(barrids).encode()).hexdigest()[:16]
+        tmp_dir = date_dir / f".{part}.tmp{os.getpid()}"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        pl.DataFrame({"barrid": barrids}).write_parquet(tmp_dir / "barrids.parquet")
+        (tmp_dir / "factors.json").write_text(json.dumps(factors))
+        for name, array in zip(ARRAYS, [exposures, factor_cov, specific_var]):
+            np.save(tmp_dir / f"{name}.npy", array.astype(STORE_DTYPE))
+
+        try:
+            tmp_dir.rename(date_dir / part)
+            print(f"risk model cached: {date_}, {len(barrids)} assets")
+        except OSError:
+            # another worker finished the same part first
+            shutil.rmtree(tmp_dir)
+
+    def _read(self, date_: dt.date) -> dict:
+        """every part of a date, a single part is used memory-mapped as it is"""
+        parts = sorted((self.path / date_.isoformat()).glob("part_*"))
+        if not parts:
+            return {"index": {}}
+
+        barrids = pl.concat([pl.read_parquet(part / "barrids.parquet") for part in parts])["barrid"].to_list()
+        model = {
+            name: np.concatenate([np.load(part / f"{name}.npy", mmap_mode="r") for part in parts])
+            if len(parts) > 1 else np.load(parts[0] / f"{name}.npy", mmap_mode="r")
+            for name in ["exposures", "specific_var"]
+        }
+        # the factor covariance only depends on the date
+        model["factor_cov"] = np.load(parts[0] / "factor_cov.npy", mmap_mode="r")
+        model["factors"] = json.loads((parts[0] / "factors.json").read_text())
+        model["index"] = {barrid: row for row, barrid in enumerate(barrids)}
+        return model
+
+
+@functools.lru_cache(maxsize=None)
+def open_risk_model(path: str) -> RiskModelStore:
+    """one store per path per process, so workers keep hot dates across chunks"""
+    return RiskModelStore(path)
+
+
+def load_factor_model(date_: dt.date, barrids: list) -> tuple:
+    """
+    (exposures N x K, factor_cov K x K, specific_var N) for barrids straight from sf_quant
+    Same inputs construct_covariance_matrix multiplies out into a dense N x N matrix
+    """
+    model_barrids, _, exposures, factor_cov, specific_var = load_risk_model(date_, barrids)
+    index = {barrid: row for row, barrid in enumerate(model_barrids)}
+    exposures, specific_var = select_assets(index, exposures, specific_var, barrids)
+    return exposures, factor_cov, specific_var
+
+
+def select_assets(index: dict, exposures: np.ndarray, specific_var: np.ndarray, barrids: list) -> tuple:
+    """rows of the stored arrays for barrids, in that order, unknown assets are 0"""
+    rows = np.array([index.get(barrid, -1) for barrid in barrids], dtype=np.int64)
+    found = rows >= 0
+
+    selected_exposures = np.zeros((len(barrids), exposures.shape[1]))
+    selected_exposures[found] = exposures[rows[found]]
+    selected_specific = np.zeros(len(barrids))
+    selected_specific[found] = specific_var[rows[found]]
+
+    return selected_exposures, selected_specific
+
+
+def load_risk_model(date_: dt.date, barrids: list) -> tuple:
+    """
+    Risk model of barrids on a date from the silverfund tables, in decimal space
+    Built like sf_quant's construct_covariance_matrix: on its factor list, with 0 exposure or
+    specific risk for assets missing from a table and 0 for NaN factor covariances
+    Returns (barrids sorted, factors, exposures N x K, factor_cov K x K, specific_var N)
+    """
+    factors = sfd.get_factor_names()
+    covariances = sfd.load_covariances_by_date(date_).drop("date")
+    exposures = sfd.load_exposures_by_date(date_).select(["barrid"] + factors)
+    specific = sfd.load_assets_by_date(
+        date_, in_universe=False, columns=["date", "barrid", "specific_risk"]
+    ).select("barrid", "specific_risk")
+
+    assets = (
+        pl.DataFrame({"barrid": sorted(set(barrids))}, schema={"barrid": pl.String})
+        .join(exposures, on="barrid", how="left")
+        .join(specific, on="barrid", how="left")
+        .fill_null(0)
+        .sort("barrid")
+    )
+
+    # barra stores the upper triangle only
+    upper = (
+        covariances.filter(pl.col("factor_1").is_in(factors))
+        .sort("factor_1")
+        .select(factors)
+        .to_numpy()
+    )
+    factor_cov = np.nan_to_num(np.where(np.isnan(upper), upper.T, upper)) / 100**2
+
+    return (
+        assets["barrid"].to_list(),
+        factors,
+        assets.select(factors).to_numpy(),
+        factor_cov,
+        assets["specific_risk"].to_numpy() ** 2 / 100**2,
+    )
@@ -4,30 +4,108 @@
 import polars as pl
 import yaml
 from . import signals
+from .normalization import normalize_signal
+from .telemetry import stage
 
-def compute_alphas(data: pl.DataFrame, signal_config: dict) -> pl.DataFrame:
-    """compute the configured signal"""
-    signal_name = signal_config["name"]
-    signal_type = signal_config["type"]
-    
-    # compute signal using getattr
-    compute_function_name = f"compute_{signal_type}"
-    try:
-        compute_function = getattr(signals, compute_function_name)
-    except AttributeError:
-        # Fallback to global namespace if not found in signals module
-        compute_function = globals().get(compute_function_name)
-        if compute_function is None:
-            raise ValueError(f"unknown signal type: {signal_type}")
-    
-    data = compute_function(data, signal_name, signal_config)
-    
-    # convert to alpha
-    data = data.with_columns(
-        ((pl.col(signal_name) - pl.col(signal_name).mean().over("date")) 
-         / pl.col(signal_name).std().over("date")).alias(f"{signal_name}_score")
-    ).with_columns(
+def compute_alphas(data: pl.DataFrame, signal_config: dict | list) -> pl.DataFrame:
+    """
+    compute the configured signal
+    A list of signal configs is computed in one fused pass and each signal gets its own alpha
+    """
+    signal_configs = signal_config if isinstance(signal_config, list) else [signal_config]
+
+    # every signal type is declared in the registry
+    with stage("signal", data) as timed:
+        data = timed.output(signals.compute_signals(data, signal_configs))
+
+    with stage("alpha", data) as timed:
+        for config in signal_configs:
+            data = score_alphas(data, config["name"], config.get("normalization"))
+        timed.output(data)
+
+    return data
+
+def score_alphas(data: pl.DataFrame, signal_name: str, normalization: dict | None = None) -> pl.DataFrame:
+    """
+    cross-sectional score of the signal per date, scaled by specific risk into an alpha
+    normalization is the signal config's normalization section, without it the score is the z-score
+    """
+    return normalize_signal(data, signal_name, normalization).with_columns(
         (pl.col(f"{signal_name}_score") * pl.col("specific_risk")).alias(f"{signal_name}_alpha")
     )
-    
-    return data
\ No newline at end of file
+
+def update_alphas(
+    alpha_data: pl.DataFrame | pl.LazyFrame,
+    new_data: pl.DataFrame,
+    signal_config: dict
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Append the dates of new_data to a previously computed alpha artifact
+    Only each asset's last lookback observations are fed back through the signal with the new rows,
+    and only the new dates are z-scored, so the cost follows the window length, not the history
+    The artifact needs date, barrid and the signal's inputs (see signals.signal_inputs), new_data
+    needs those plus the normalization columns and the raw columns the artifact keeps
+    Rows of new_data on or before the artifact's last date are ignored
+    """
+    signal_name = signal_config["name"]
+    lookback = signals.signal_lookback(signal_config)
+
+    alphas = alpha_data.lazy()
+    schema = alphas.collect_schema()
+    inputs = ["date", "barrid", *signals.signal_inputs(signal_config)]
+    missing = [name for name in inputs if name not in schema]
+    if missing:
+        raise ValueError(f"alpha artifact is missing signal inputs: {missing}")
+
+    # everything in the artifact the signal and its score do not produce comes from new_data
+    normalization = signal_config.get("normalization") or {}
+    produced = [signal_name, f"{signal_name}_score", f"{signal_name}_alpha", *signals.SHARED]
+    required = [
+        *inputs, "specific_risk", *normalization.get("neutralize", []), normalization.get("groups"),
+        *(name for name in schema if name not in produced)
+    ]
+    missing = [name for name in dict.fromkeys(required) if name is not None and name not in new_data.columns]
+    if missing:
+        raise ValueError(f"new data is missing columns: {missing}")
+
+    last_date = alphas.select(pl.col("date").max()).collect().item()
+    new_data = new_data.filter(pl.col("date") > last_date)
+    if new_data.is_empty():
+        print(f"no dates after {last_date} to add")
+        return alpha_data
+
+    # the history takes the new rows' dtypes, a compact artifact stores Float32 and Categorical
+    history = _trailing_history(alphas, new_data["barrid"].unique(), inputs, lookback)
+    history = history.cast({name: new_data.schema[name] for name in inputs})
+    combined = pl.concat([history, new_data], how="diagonal")
+
+    computed = signals.compute_signals(combined, [signal_config]).filter(pl.col("date") > last_date)
+    appended = score_alphas(computed, signal_name, normalization)
+    appended = appended.select(schema.names()).cast(dict(schema))
+    print(f"added {appended['date'].n_unique()} dates from {lookback} observations of history")
+
+    if isinstance(alpha_data, pl.LazyFrame):
+        return pl.concat([alpha_data, appended.lazy()])
+    return pl.concat([alpha_data, appended], rechunk=False)
+
+def _trailing_history(alphas: pl.LazyFrame, barrids: pl.Series, columns: list, lookback: int) -> pl.DataFrame:
+    """
+    Each asset's last lookback raw rows in the artifact
+    The last lookback dates cover every asset that traded on all of them,
+    only assets with gaps in that span go further back
+    """
+    alphas = alphas.filter(pl.col("barrid").cast(pl.String).is_in(barrids.cast(pl.String).implode())).select(columns)
+    if lookback <= 0:
+        return alphas.head(0).collect()
+
+    dates = alphas.select(pl.col("date").unique()).collect()["date"].sort()
+    cutoff = dates[max(len(dates) - lookback, 0)]
+    recent = alphas.filter(pl.col("date") >= cutoff).collect()
+
+    # assets absent from every recent date are short too
+    full = recent.group_by("barrid").len().filter(pl.col("len") >= lookback)["barrid"]
+    older = alphas.filter(
+        (pl.col("date") < cutoff) & ~pl.col("barrid").is_in(full.implode())
+    ).sort("date").group_by("barrid", maintain_order=True).tail(lookback).select(columns).collect()
+
+    return pl.concat([older, recent])
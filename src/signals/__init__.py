@@ -1,3 +1,5 @@
 """make signal functions available to the loader"""
+from .registry import SHARED, SIGNALS, compute_signals, register_signal, rolling, signal_expression, signal_inputs, signal_lookback, signal_spec
 from .idio_vol import compute_idio_vol
 from .str import compute_str
+from . import cost, price_impact
@@ -0,0 +1,9 @@
+"""trading cost signal"""
+import polars as pl
+
+from .registry import register_signal, rolling
+
+# long stocks that are expensive to trade, average quoted bid-ask spread
+@register_signal("cost", window=252, lag=2, direction=1)
+def cost(window: int, config: dict) -> dict:
+    return rolling("mean", pl.col("bid_ask_spread"), config.get("min_periods", window))
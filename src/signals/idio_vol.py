@@ -1,18 +1,12 @@
 """idio volatility signal"""
 import polars as pl
 
+from .registry import compute_signals, register_signal, rolling
+
+# long low idio vol stocks, short high idio vol stocks
+@register_signal("idio_vol", window=252, lag=2, direction=-1)
+def idio_vol(window: int, config: dict) -> dict:
+    return rolling("mean", pl.col("specific_risk"), config.get("min_periods", window))
+
 def compute_idio_vol(data: pl.DataFrame, name: str, config: dict) -> pl.DataFrame:
-    # long low idio vol stocks, short high idio vol stocks
-    window_size = config.get("window_size", 252)
-    min_periods = config.get("min_periods", 252)
-    idio_vol = (
-        data.with_columns(
-            (pl.col("specific_risk").rolling_mean(window_size=window_size, min_samples=min_periods))
-            .mul(-1)
-            .shift(2)
-            .over('barrid')
-            .alias('idio_vol')
-        )
-        .sort(['barrid', 'date'])
-    )
-    return idio_vol
+    return compute_signals(data, [{**config, "name": name, "type": "idio_vol"}])
@@ -0,0 +1,9 @@
+"""price impact (Amihud illiquidity) signal"""
+import polars as pl
+
+from .registry import register_signal, rolling
+
+# long illiquid stocks, average absolute return per dollar traded
+@register_signal("price_impact", window=22, lag=2, direction=1, shared=["dollar_volume"])
+def price_impact(window: int, config: dict) -> dict:
+    return rolling("mean", pl.col("return").abs() / pl.col("dollar_volume"), config.get("min_periods", window))
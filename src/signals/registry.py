@@ -0,0 +1,133 @@
+"""declarative signal registry and the fused multi-signal compiler"""
+import polars as pl
+
+from ..panel import ROLLING_KERNELS, Panel, is_sorted_panel
+
+# sub-expressions several signals read, each is added as a column once per pass
+SHARED = {
+    "log_return": pl.col("return").log1p(),
+    "dollar_volume": pl.col("price") * pl.col("daily_volume"),
+}
+
+# signal type -> rolling window builder plus default window, lag and direction
+SIGNALS = {}
+
+def rolling(kernel: str, column: pl.Expr, min_periods: int | None = None) -> dict:
+    """
+    A rolling window over an asset's last window values of column, a row-wise expression
+    kernel is one of ROLLING_KERNELS, windows with fewer than min_periods (default window) values are null
+    """
+    if kernel not in ROLLING_KERNELS:
+        raise ValueError(f"unknown rolling kernel: {kernel}")
+    return {"kernel": kernel, "column": column, "min_periods": min_periods}
+
+def register_signal(
+    signal_type: str, window: int, lag: int = 0, direction: int = 1, shared: list | None = None, version: int = 1
+):
+    """
+    Declare a signal type
+    The decorated function maps (window, config) to a rolling() window, config window_size,
+    shift and direction override the defaults
+    shared names the SHARED columns the expression reads
+    version goes into the cached alphas' key, bump it when the window changes
+    """
+    def decorator(builder):
+        SIGNALS[signal_type] = {
+            "builder": builder,
+            "window": window,
+            "lag": lag,
+            "direction": direction,
+            "shared": shared or [],
+            "version": version,
+        }
+        return builder
+    return decorator
+
+def signal_spec(signal_config: dict) -> dict:
+    """registry entry of a config with its window, lag, direction and rolling window resolved"""
+    signal_type = signal_config["type"]
+    if signal_type not in SIGNALS:
+        raise ValueError(f"unknown signal type: {signal_type}")
+
+    spec = SIGNALS[signal_type]
+    window = signal_config.get("window_size", spec["window"])
+    return {
+        **spec,
+        "window": window,
+        "lag": signal_config.get("shift", spec["lag"]),
+        "direction": signal_config.get("direction", spec["direction"]),
+        "rolling": spec["builder"](window, signal_config),
+    }
+
+def signal_lookback(signal_config: dict) -> int:
+    """earlier observations of an asset that feed its newest signal value"""
+    spec = signal_spec(signal_config)
+    return spec["window"] - 1 + spec["lag"]
+
+def signal_inputs(signal_config: dict) -> list:
+    """raw columns a signal reads, shared columns resolved to the columns they are built from"""
+    inputs = []
+    for name in signal_spec(signal_config)["rolling"]["column"].meta.root_names():
+        inputs.extend(SHARED[name].meta.root_names() if name in SHARED else [name])
+    return list(dict.fromkeys(inputs))
+
+def signal_expression(signal_config: dict) -> pl.Expr:
+    """
+    The signal as a polars window over the long frame sorted by date,
+    direction * rolling window lagged by lag observations, per asset
+    """
+    spec = signal_spec(signal_config)
+    window = spec["rolling"]
+    expression = getattr(window["column"], f"rolling_{window['kernel']}")(
+        window_size=spec["window"], min_samples=window["min_periods"]
+    ).shift(spec["lag"])
+    return (expression * spec["direction"]).over("barrid").alias(signal_config["name"])
+
+def compute_signals(data: pl.DataFrame, signal_configs: list) -> pl.DataFrame:
+    """
+    Compute every configured signal in one pass over a date x asset panel
+    The shared columns and the columns the rolling windows read are added once, the panel is
+    built once from them, every window (and lag) runs as a matrix kernel and only the signals
+    go back to long form, the rows come out in (barrid, date) order
+    Equal to signal_expression over the long frame
+    """
+    names = [config["name"] for config in signal_configs]
+    if len(set(names)) < len(names):
+        raise ValueError(f"signal names must be unique: {names}")
+
+    specs = [signal_spec(config) for config in signal_configs]
+    shared = list(dict.fromkeys(name for spec in specs for name in spec["shared"]))
+
+    # each distinct window input is one panel column, row-wise inputs get a temporary name
+    inputs, temporary = [], []
+    for spec in specs:
+        column = spec["rolling"]["column"]
+        match = next((name for name, expr in inputs if expr.meta.eq(column)), None)
+        if match is None:
+            match = column.meta.output_name() if column.meta.is_column() else f"_input_{len(inputs)}"
+            inputs.append((match, column))
+            if not column.meta.is_column():
+                temporary.append(match)
+        spec["input"] = match
+
+    frame = data.lazy().with_columns(
+        SHARED[name].alias(name) for name in shared
+    ).with_columns(expr.alias(name) for name, expr in inputs if name in temporary).collect()
+
+    # the windows on one input run in a single pass over its packed matrix
+    panel = Panel(frame, [name for name, _ in inputs])
+    signals = {}
+    for input_name, _ in inputs:
+        using = [(config, spec) for config, spec in zip(signal_configs, specs) if spec["input"] == input_name]
+        windows = panel.rolling(panel[input_name], [
+            (spec["rolling"]["kernel"], spec["window"], spec["rolling"]["min_periods"], spec["lag"]) for _, spec in using
+        ])
+        dtype = frame.schema[input_name]
+        for (config, spec), values in zip(using, windows):
+            signals[config["name"]] = panel.series(
+                config["name"], spec["direction"] * values, dtype if dtype.is_float() else pl.Float64
+            )
+
+    frame = frame.with_columns(signals[name] for name in names).drop(temporary)
+    # a loaded panel is already in asset order, otherwise read it off the date x asset grid
+    return frame if is_sorted_panel(frame, "asset") else panel.by_asset(frame)
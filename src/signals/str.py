@@ -1,28 +1,12 @@
 """short-term reversal signal"""
 import polars as pl
 
-def compute_str(data: pl.DataFrame, name: str, config: dict) -> pl.DataFrame:
-    # get log return
-    data = (
-        data.with_columns(
-            pl.col('return')
-            .log1p()
-            .alias('log_return')
-        )
-    )
-
-    signal_config = config.get("signal", {})
-    period = signal_config.get("period", 22)
+from .registry import compute_signals, register_signal, rolling
 
-    # get scores
-    data = (
-        data.with_columns(
-            pl.col('log_return')
-            .rolling_sum(window_size=period)
-            .over('barrid')
-            .mul(-1)
-            .alias('str')
-        )
-    ).sort(['barrid', 'date'])
+# short recent winners, long recent losers
+@register_signal("str", window=22, direction=-1, shared=["log_return"])
+def short_term_reversal(window: int, config: dict) -> dict:
+    return rolling("sum", pl.col("log_return"))
 
-    return data
\ No newline at end of file
+def compute_str(data: pl.DataFrame, name: str, config: dict) -> pl.DataFrame:
+    return compute_signals(data, [{**config, "name": name, "type": "str"}])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""per-date solver log of a backtest: universe size, solve time, iterations, status and memory"""
+
+import polars as pl
+from pathlib import Path
+
+# one row per solved date (and gamma), in this order
+SOLVE_COLUMNS = {
+    "date": pl.Date,
+    "gamma": pl.Float64,
+    "universe": pl.UInt32,
+    "n_alphas": pl.UInt32,
+    "setup_s": pl.Float64,
+    "solve_s": pl.Float64,
+    "iterations": pl.Int64,
+    "status": pl.String,
+    "rss_mb": pl.Float64,
+}
+# the status of a solve that produced usable weights
+SOLVED = "solved"
+# dates listed in a summary
+N_SLOWEST = 10
+
+def solve_frame(rows: list, date_dtype: pl.DataType = pl.Date) -> pl.DataFrame:
+    """
+    solve log rows, tuples in SOLVE_COLUMNS order without the universe, as a frame
+    date_dtype is the backtest data's, String dates stay strings like the weights' dates
+    """
+    schema = {name: dtype for name, dtype in SOLVE_COLUMNS.items() if name != "universe"}
+    schema["date"] = date_dtype
+    return pl.DataFrame(rows, schema=schema, orient="row")
+
+def write_solve_log(solves: pl.DataFrame, path: str) -> Path:
+    """
+    Write the log of one backtest call as solves_<first>_<last>.parquet under path
+    A pipelined run calls the backtest once per year, each call adds its own file
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    dates = solves["date"]
+    solve_file = path / f"solves_{dates.min()}_{dates.max()}.parquet"
+    tmp_file = solve_file.with_suffix(".parquet.tmp")
+    solves.write_parquet(tmp_file)
+    tmp_file.replace(solve_file)
+    return solve_file
+
+def read_solve_log(path: str) -> pl.DataFrame:
+    """every file of a solve log, in date order"""
+    files = sorted(Path(path).glob("solves_*.parquet"))
+    if not files:
+        raise FileNotFoundError(f"no solve log in {path}")
+    solves = pl.concat([pl.read_parquet(f) for f in files], how="diagonal")
+    return solves.sort([key for key in ["date", "gamma"] if key in solves.columns])
+
+def summarize_solves(solves: pl.DataFrame, n_slowest: int = N_SLOWEST) -> dict:
+    """
+    The slowest dates by total setup and solve time, with every gamma of a date added up,
+    and every solve whose status is not SOLVED
+    """
+    if solves.is_empty():
+        return {"slowest": solves, "failed": solves, "solve_s": 0.0}
+    by_date = solves.group_by("date", maintain_order=True).agg(
+        pl.col("universe", "n_alphas").first(),
+        (pl.col("setup_s").first() + pl.col("solve_s").sum()).alias("total_s"),
+        # sf_quant's optimizer does not report iterations, its dates keep a null
+        pl.when(pl.col("iterations").is_not_null().any()).then(pl.col("iterations").sum()).alias("iterations"),
+        pl.col("rss_mb").max(),
+    )
+    return {
+        "slowest": by_date.sort("total_s", descending=True).head(n_slowest),
+        "failed": solves.filter(pl.col("status") != SOLVED),
+        "solve_s": by_date["total_s"].sum(),
+    }
+
+def print_solve_summary(solves: pl.DataFrame, n_slowest: int = N_SLOWEST):
+    """log lines for the slowest dates and the failed solves"""
+    if solves.is_empty():
+        return
+    summary = summarize_solves(solves, n_slowest)
+    times = summary["slowest"]["total_s"]
+    print(f"solves: {solves['date'].n_unique()} dates in {summary['solve_s']:.1f}s, slowest {times.max():.2f}s")
+    for date_, universe, n_alphas, total_s, iterations, rss_mb in summary["slowest"].iter_rows():
+        iterations = "" if iterations is None else f", {iterations} iterations"
+        print(f"  {date_}: {total_s:.2f}s, {n_alphas} alphas of {universe} assets{iterations}, {rss_mb:.0f} MB")
+    failed = summary["failed"]
+    if not failed.is_empty():
+        print(f"solves: {len(failed)} not solved")
+        for row in failed.iter_rows(named=True):
+            print(f"  {row['date']} gamma {row['gamma']:g}: {row['status']}")
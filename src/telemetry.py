@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""stage-level wall time, cpu time, memory and row count telemetry for pipeline runs"""
+
+import cProfile
+import json
+import os
+import resource
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import polars as pl
+
+PROFILERS = ["cprofile", "pyinstrument"]
+# seconds between resident memory samples
+SAMPLE_INTERVAL = 0.05
+# scheduler settings kept with a report, to compare against what the stages used
+SLURM_VARIABLES = ["SLURM_JOB_ID", "SLURM_CPUS_PER_TASK", "SLURM_MEM_PER_NODE", "SLURM_MEM_PER_CPU"]
+
+# the report stages are recorded into, stages outside a run_report are not recorded
+_active = None
+
+class RunReport:
+    """
+    Stage records of one pipeline run
+    A sampling thread follows resident memory so each stage gets its own peak, not the process's
+    The JSON report is rewritten when a stage starts and when it ends, so a job killed for memory
+    still leaves a report naming the stage it was in
+    """
+
+    def __init__(self, run_name: str, output_dir: str, profile: str | None = None):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"unknown profiler: {profile}")
+        self.run_name = run_name
+        self.path = Path(output_dir) / "telemetry"
+        self.profile = profile
+        self.started = time.time()
+        self.records = []
+        self._open = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="telemetry", daemon=True)
+
+    def start(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            rss = rss_bytes()
+            with self._lock:
+                for record in self._open:
+                    record["peak_rss_mb"] = max(record["peak_rss_mb"], rss / 1e6)
+
+    @contextmanager
+    def stage(self, name: str, data: pl.DataFrame | pl.LazyFrame | None = None):
+        rows_in, mb_in = _frame_stats(data)
+        thread = threading.current_thread().name
+        record = {
+            "stage": name,
+            "thread": thread,
+            "status": "running",
+            "start": time.time() - self.started,
+            "wall_s": None,
+            "cpu_s": None,
+            "rss_start_mb": rss_bytes() / 1e6,
+            "peak_rss_mb": rss_bytes() / 1e6,
+            "peak_rss_delta_mb": None,
+            "rows_in": rows_in,
+            "mb_in": mb_in,
+            "rows_out": None,
+            "mb_out": None,
+        }
+        with self._lock:
+            # cProfile cannot nest, an inner stage runs inside its parent's profile
+            nested = any(other["thread"] == thread for other in self._open)
+            self.records.append(record)
+            self._open.append(record)
+        self.write_json()
+
+        profiler = None if nested else self._start_profiler()
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield StageOutput(record)
+            record["status"] = "done"
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            record["wall_s"] = time.perf_counter() - wall
+            record["cpu_s"] = _cpu_seconds() - cpu
+            with self._lock:
+                self._open.remove(record)
+                record["peak_rss_mb"] = max(record["peak_rss_mb"], rss_bytes() / 1e6)
+                record["peak_rss_delta_mb"] = record["peak_rss_mb"] - record["rss_start_mb"]
+            if profiler is not None:
+                self._write_profile(profiler, name)
+            self.write_json()
+
+    def _start_profiler(self):
+        if self.profile == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.profile == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        return None
+
+    def _write_profile(self, profiler, name: str):
+        """one dump per stage run, numbered so repeated stages (years, gammas) do not overwrite"""
+        profile_dir = self.path / "profiles"
+        profile_dir.mkdir(exist_ok=True)
+        stem = f"{len(list(profile_dir.iterdir())):03d}_{name}"
+        if self.profile == "cprofile":
+            profiler.disable()
+            profiler.dump_stats(profile_dir / f"{stem}.prof")
+        else:
+            profiler.stop()
+            (profile_dir / f"{stem}.html").write_text(profiler.output_html())
+
+    def summary(self) -> dict:
+        """run-level figures for sizing a job: total time, process peak memory and the heaviest stage"""
+        done = [record for record in self.records if record["peak_rss_mb"] is not None]
+        heaviest = max(done, key=lambda record: record["peak_rss_mb"], default=None)
+        return {
+            "run_name": self.run_name,
+            "host": socket.gethostname(),
+            "cpus": os.cpu_count(),
+            "wall_s": time.time() - self.started,
+            "process_peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+            "heaviest_stage": heaviest["stage"] if heaviest else None,
+            **{name.lower(): os.environ[name] for name in SLURM_VARIABLES if name in os.environ},
+        }
+
+    def write_json(self):
+        with self._lock:
+            report = {"summary": self.summary(), "stages": [dict(record) for record in self.records]}
+        tmp_file = self.path / "run_report.json.tmp"
+        tmp_file.write_text(json.dumps(report, indent=2, default=str))
+        tmp_file.replace(self.path / "run_report.json")
+
+    def write(self):
+        """the final JSON report and the stage table as parquet"""
+        self.write_json()
+        if self.records:
+            pl.DataFrame(self.records, infer_schema_length=None).write_parquet(self.path / "run_report.parquet")
+
+class StageOutput:
+    """handle a stage body uses to record what it produced"""
+
+    def __init__(self, record: dict):
+        self.record = record
+
+    def output(self, data):
+        """record the rows and size of data as the stage output and hand it back"""
+        self.record["rows_out"], self.record["mb_out"] = _frame_stats(data)
+        return data
+
+@contextmanager
+def run_report(run_name: str, output_dir: str, profile: str | None = None):
+    """record every stage run inside the block, the report is written even when the run fails"""
+    global _active
+    report = RunReport(run_name, output_dir, profile)
+    report.start()
+    _active = report
+    try:
+        yield report
+    finally:
+        _active = None
+        report.stop()
+        report.write()
+        print(f"run report: {report.path / 'run_report.json'}")
+
+@contextmanager
+def stage(name: str, data: pl.DataFrame | pl.LazyFrame | None = None):
+    """a stage of the active run report, a no-op outside of one"""
+    if _active is None:
+        yield StageOutput({})
+        return
+    with _active.stage(name, data) as output:
+        yield output
+
+def _frame_stats(data) -> tuple:
+    """(rows, MB) of an eager frame, lazy frames are not counted"""
+    if isinstance(data, pl.DataFrame):
+        return len(data), data.estimated_size("mb")
+    return None, None
+
+def _cpu_seconds() -> float:
+    """user and system time of this process and of any worker processes it has waited for"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def rss_bytes() -> int:
+    """current resident set size, from /proc where there is one, else the process peak so far"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -8,8 +8,20 @@ import seaborn as sns
 import numpy as np
 from pathlib import Path
 
-def create_core_visualizations(weights: pl.DataFrame, alpha_data: pl.DataFrame, signal_name: str, output_path: str):
-    """create all core visualizations for signal research"""
+from src.analytics import compute_signal_analytics, read_signal_analytics, write_signal_analytics
+
+def create_core_visualizations(
+    weights: pl.DataFrame,
+    alpha_data: pl.DataFrame,
+    signal_name: str,
+    output_path: str,
+    analytics_path: str | None = None
+):
+    """
+    create all core visualizations for signal research
+    IC and quantile plots read the analytics tables at analytics_path,
+    without one they are computed once and written under output_path/analytics
+    """
     
     Path(output_path).mkdir(parents=True, exist_ok=True)
     
@@ -28,66 +40,81 @@ def create_core_visualizations(weights: pl.DataFrame, alpha_data: pl.DataFrame,
     summary = sfp.generate_summary_table(returns=returns)
     summary.write_parquet(Path(output_path) / "performance_summary.parquet")
     
-    # 4. information coefficient over time
-    _plot_information_coefficient(alpha_data, signal_name, output_path)
+    # 4. signal analytics, one pass over the panel
+    if analytics_path is None:
+        analytics_path = Path(output_path) / "analytics"
+        write_signal_analytics(compute_signal_analytics(alpha_data, signal_name), analytics_path)
+    analytics = read_signal_analytics(analytics_path)
+    
+    # 5. information coefficient over time and by horizon
+    _plot_information_coefficient(analytics, signal_name, output_path)
+    _plot_ic_decay(analytics, signal_name, output_path)
     
-    # 5. quantile portfolio returns
-    _plot_quantile_returns(alpha_data, signal_name, output_path)
+    # 6. quantile portfolio returns
+    _plot_quantile_returns(analytics, signal_name, output_path)
     
-    # 6. z-score distribution
+    # 7. z-score distribution
     _plot_zscore_distribution(alpha_data, signal_name, output_path)
     
-    # 7. weight distribution
+    # 8. weight distribution
     _plot_weight_distribution(weights, output_path)
 
-def _plot_information_coefficient(alpha_data: pl.DataFrame, signal_name: str, output_path: str):
-    """plot information coefficient over time"""
-    # calculate IC (correlation between signal and forward returns)
-    # this is simplified - you'd need to align dates properly
-    ic_data = alpha_data.with_columns(
-        pl.col(f"{signal_name}_alpha").shift(-1).alias('forward_alpha')
-    ).group_by("date").agg(
-        pl.corr(f"{signal_name}_alpha", "forward_alpha").alias('IC')
-    ).filter(pl.col("IC").is_not_null())
+def _plot_information_coefficient(analytics: dict, signal_name: str, output_path: str, window: int = 63):
+    """plot rolling rank IC of the alpha against forward returns, one line per horizon"""
+    ic_data = analytics["ic"]
     
     plt.figure(figsize=(10, 6))
-    plt.plot(ic_data["date"], ic_data["IC"])
-    plt.title(f"{signal_name} - Information Coefficient")
+    for (horizon,), horizon_ic in ic_data.partition_by("horizon", as_dict=True, maintain_order=True).items():
+        horizon_ic = horizon_ic.sort("date")
+        plt.plot(
+            horizon_ic["date"],
+            horizon_ic["ic"].rolling_mean(window, min_samples=1),
+            label=f"{horizon}d"
+        )
+    plt.title(f"{signal_name} - Rank IC ({window}d rolling mean)")
     plt.xlabel("Date")
     plt.ylabel("IC")
+    plt.legend()
     plt.grid(True)
     plt.savefig(Path(output_path) / "information_coefficient.png")
     plt.close()
 
-def _plot_quantile_returns(alpha_data: pl.DataFrame, signal_name: str, output_path: str):
-    """plot quantile portfolio returns"""
-    # create quintile portfolios based on signal
-    quantile_data = alpha_data.with_columns(
-        pl.col(f"{signal_name}_alpha").qcut(5).over("date").alias('quantile')
-    ).group_by(["date", "quantile"]).agg(
-        pl.col("return").mean().alias('quantile_return')
-    )
+def _plot_ic_decay(analytics: dict, signal_name: str, output_path: str):
+    """plot mean rank IC against the forward return horizon"""
+    decay = analytics["ic_decay"]
     
-    # pivot to get top and bottom quintile returns
-    pivot_data = quantile_data.pivot(
-        index="date", 
-        on="quantile", 
-        values="quantile_return"
-    )
+    plt.figure(figsize=(10, 6))
+    plt.bar([str(h) for h in decay["horizon"]], decay["mean_ic"])
+    plt.title(f"{signal_name} - IC Decay")
+    plt.xlabel("Horizon (days)")
+    plt.ylabel("Mean IC")
+    plt.grid(True)
+    plt.savefig(Path(output_path) / "ic_decay.png")
+    plt.close()
 
-    # Check if top and bottom quantiles exist before plotting
-    if "0" in pivot_data.columns and "4" in pivot_data.columns:
-        plt.figure(figsize=(10, 6))
-        plt.plot(pivot_data["date"], pivot_data["4"] - pivot_data["0"], label="Top-Bottom Spread")
-        plt.title(f"{signal_name} - Quantile Spread Returns")
-        plt.xlabel("Date")
-        plt.ylabel("Return Spread")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(Path(output_path) / "quantile_returns.png")
-        plt.close()
-    else:
+def _plot_quantile_returns(analytics: dict, signal_name: str, output_path: str):
+    """plot cumulative top minus bottom quantile next-day returns"""
+    quantile_data = analytics["quantile_returns"]
+    quantile_data = quantile_data.filter(pl.col("horizon") == quantile_data["horizon"].min())
+    top, bottom = quantile_data["quantile"].max(), quantile_data["quantile"].min()
+    
+    if top is None or top == bottom:
         raise ValueError("not enough data for all quantiles")
+    
+    spread = quantile_data.group_by("date").agg(
+        (pl.col("return").filter(pl.col("quantile") == top).first()
+         - pl.col("return").filter(pl.col("quantile") == bottom).first()).alias("spread")
+    ).drop_nulls().sort("date")
+    
+    plt.figure(figsize=(10, 6))
+    plt.plot(spread["date"], spread["spread"].cast(pl.Float64).cum_sum(), label="Top-Bottom Spread")
+    plt.title(f"{signal_name} - Quantile Spread Returns")
+    plt.xlabel("Date")
+    plt.ylabel("Cumulative Return Spread")
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(Path(output_path) / "quantile_returns.png")
+    plt.close()
 
 def _plot_zscore_distribution(alpha_data: pl.DataFrame, signal_name: str, output_path: str):
     """plot z-score distribution histogram"""
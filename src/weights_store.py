@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""sparse year-partitioned store for portfolio weights"""
+
+import polars as pl
+from pathlib import Path
+
+# weights smaller than this in absolute value are not stored, a long-only book is mostly zeros
+WEIGHT_THRESHOLD = 1e-6
+
+def write_sparse_weights(weights: pl.DataFrame, path: str, threshold: float = WEIGHT_THRESHOLD) -> list:
+    """
+    Weights with |weight| >= threshold as one zstd parquet file per year under path
+    Rows are in (gamma,) date, barrid order so the files can be streamed one date at a time
+    Returns the files written, years of an earlier store at path that are not rewritten are removed
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    keys = ['gamma', 'date', 'barrid'] if 'gamma' in weights.columns else ['date', 'barrid']
+
+    date = pl.col('date').str.to_date() if weights.schema['date'] == pl.String else pl.col('date').cast(pl.Date)
+    sparse = weights.filter(pl.col('weight').abs() >= threshold).with_columns(
+        date,
+        pl.col('barrid').cast(pl.Categorical)
+    ).sort(keys)
+
+    files = []
+    for (year,), year_weights in sparse.with_columns(pl.col('date').dt.year().alias('year')).partition_by(
+        'year', as_dict=True, maintain_order=True, include_key=False
+    ).items():
+        year_file = path / f"year={year}.parquet"
+        tmp_file = year_file.with_suffix(".parquet.tmp")
+        year_weights.write_parquet(tmp_file, compression="zstd", statistics=True)
+        tmp_file.replace(year_file)
+        files.append(year_file)
+
+    for stale in set(path.glob("year=*.parquet")) - set(files):
+        stale.unlink()
+
+    print(f"sparse weights: kept {len(sparse)} of {len(weights)} rows with |weight| >= {threshold:g}")
+    return files
+
+def scan_sparse_weights(path: str, gamma: float | None = None) -> pl.LazyFrame:
+    """lazy scan of a sparse weights store in date order, one gamma's weights when gamma is given"""
+    files = sorted(Path(path).glob("year=*.parquet"))
+    if not files:
+        raise FileNotFoundError(f"no weights files in {path}")
+
+    weights = pl.scan_parquet(files).with_columns(pl.col('barrid').cast(pl.String))
+    if gamma is not None:
+        weights = weights.filter(pl.col('gamma') == gamma).drop('gamma')
+    return weights
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests for alpha_store.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from src.alpha_store import read_alpha_artifact, scan_alpha_artifact, write_alpha_artifact
+
+
+@pytest.fixture
+def alpha_data() -> pl.DataFrame:
+    """Alphas of three assets across a year boundary, with raw columns the artifact leaves out."""
+    dates = pl.date_range(dt.date(2022, 12, 28), dt.date(2023, 1, 4), eager=True).to_list()
+    n = 3 * len(dates)
+    rng = np.random.default_rng(0)
+    return pl.DataFrame(
+        {
+            "date": dates * 3,
+            "barrid": [barrid for barrid in ["USA", "USB", "USC"] for _ in dates],
+            "price": rng.uniform(5, 50, n),
+            "return": rng.normal(0, 0.02, n),
+            "specific_risk": rng.uniform(0.1, 0.5, n),
+            "predicted_beta": rng.normal(1, 0.2, n),
+            "vol": rng.normal(0, 1, n),
+            "vol_score": rng.normal(0, 1, n),
+            "vol_alpha": rng.normal(0, 1, n),
+        }
+    )
+
+
+def test_round_trip(alpha_data, tmp_path):
+    """The artifact keeps the signal columns as Float32 in one file per year."""
+    files = write_alpha_artifact(alpha_data, "vol", tmp_path / "alphas")
+    assert [f.name for f in files] == ["year=2022.parquet", "year=2023.parquet"]
+
+    result = read_alpha_artifact(tmp_path / "alphas")
+    expected = alpha_data.drop("price").with_columns(pl.col(pl.Float64).cast(pl.Float32))
+    assert_frame_equal(result.with_columns(pl.col("barrid").cast(pl.String)), expected)
+    assert result.schema["barrid"] == pl.Categorical
+
+
+def test_date_range_scan(alpha_data, tmp_path):
+    """A range inside one year reads only that year's file and its dates."""
+    write_alpha_artifact(alpha_data.lazy(), "vol", tmp_path / "alphas")
+    (tmp_path / "alphas" / "year=2022.parquet").write_bytes(b"not parquet")
+
+    start, end = dt.date(2023, 1, 2), dt.date(2023, 1, 3)
+    result = scan_alpha_artifact(tmp_path / "alphas", start, end, columns=["date", "vol_alpha"]).collect()
+    assert result.columns == ["date", "vol_alpha"]
+    assert sorted(result["date"].unique().to_list()) == [start, end]
+
+
+def test_rewrite_drops_stale_years(alpha_data, tmp_path):
+    """Writing a shorter artifact to the same path removes years it no longer has."""
+    write_alpha_artifact(alpha_data, "vol", tmp_path / "alphas")
+    write_alpha_artifact(alpha_data.filter(pl.col("date").dt.year() == 2023), "vol", tmp_path / "alphas")
+    assert [f.name for f in (tmp_path / "alphas").iterdir()] == ["year=2023.parquet"]
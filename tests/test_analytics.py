@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests for analytics.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src.analytics import compute_signal_analytics, read_signal_analytics, write_signal_analytics
+
+
+@pytest.fixture
+def panel() -> pl.DataFrame:
+    """Thirty dates of twenty assets whose alpha partly predicts the next return."""
+    rng = np.random.default_rng(0)
+    n_dates, n_assets = 30, 20
+    dates = pl.date_range(dt.date(2024, 1, 1), dt.date(2024, 1, n_dates), eager=True).to_list()
+    alpha = rng.normal(size=(n_dates, n_assets))
+    returns = np.vstack([np.zeros((1, n_assets)), 0.01 * alpha[:-1] + rng.normal(scale=0.01, size=(n_dates - 1, n_assets))])
+    return pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in range(n_assets)],
+            "barrid": [f"US{i:02d}" for i in range(n_assets)] * n_dates,
+            "test_signal_alpha": alpha.ravel(),
+            "return": returns.ravel(),
+        }
+    ).sample(fraction=1.0, shuffle=True, seed=1)
+
+
+def _forward_returns(panel: pl.DataFrame, h: int) -> pl.DataFrame:
+    """h-day compounded forward return per barrid, the slow way"""
+    frames = []
+    for (barrid,), asset in panel.partition_by("barrid", as_dict=True).items():
+        asset = asset.sort("date")
+        r = asset["return"].to_numpy()
+        fwd = [np.prod(1 + r[i + 1:i + 1 + h]) - 1 if i + h < len(r) else None for i in range(len(r))]
+        frames.append(asset.select("date", "barrid", "test_signal_alpha").with_columns(pl.Series("fwd", fwd)))
+    return pl.concat(frames)
+
+
+@pytest.mark.parametrize("h", [1, 5])
+def test_rank_ic_matches_spearman(panel, h):
+    """The IC rebuilt from per-quantile rank sums equals each date's Spearman correlation."""
+    ic = compute_signal_analytics(panel, "test_signal", horizons=[1, 5])["ic"]
+
+    expected = _forward_returns(panel, h).drop_nulls().group_by("date").agg(
+        pl.corr("test_signal_alpha", "fwd", method="spearman").alias("expected")
+    )
+    joined = ic.filter(pl.col("horizon") == h).join(expected, on="date")
+    assert len(joined) == 30 - h
+    np.testing.assert_allclose(joined["ic"], joined["expected"], atol=1e-10)
+
+
+def test_ic_decay_and_quantiles(panel):
+    """A one-day signal has positive IC at 1 day and a top quantile that beats the bottom."""
+    analytics = compute_signal_analytics(panel, "test_signal", horizons=[1, 5], n_quantiles=4)
+
+    decay = analytics["ic_decay"]
+    assert decay["horizon"].to_list() == [1, 5]
+    assert decay["mean_ic"][0] > 0.3
+    assert decay["mean_ic"][0] > decay["mean_ic"][1]
+
+    next_day = analytics["quantile_returns"].filter(pl.col("horizon") == 1)
+    assert next_day["count"].unique().to_list() == [5]
+    by_quantile = next_day.group_by("quantile").agg(pl.col("return").mean()).sort("quantile")
+    assert by_quantile["return"][-1] > by_quantile["return"][0]
+
+
+def test_turnover_counts_new_members(panel):
+    """Every name is new on the first date, later dates churn with the random alphas."""
+    turnover = compute_signal_analytics(panel, "test_signal")["turnover"]
+
+    first = turnover.filter(pl.col("date") == dt.date(2024, 1, 1))
+    assert first["turnover"].to_list() == [1.0] * 5
+    assert turnover["turnover"].is_between(0, 1).all()
+
+
+def test_write_and_read_compact_tables(panel, tmp_path):
+    """Tables round-trip through parquet with floats stored as Float32."""
+    analytics = compute_signal_analytics(panel, "test_signal")
+    write_signal_analytics(analytics, tmp_path / "analytics")
+
+    read = read_signal_analytics(tmp_path / "analytics")
+    assert read.keys() == analytics.keys()
+    assert read["ic"].schema["ic"] == pl.Float32
+    assert read["quantile_returns"].schema["quantile"] == pl.Int8
+    assert len(read["quantile_returns"]) == len(analytics["quantile_returns"])
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Tests for artifact_cache.py and the cached pipeline stages"""
+
+from unittest.mock import patch
+
+import polars as pl
+import pytest
+import yaml
+
+from src import artifact_cache
+from src.artifact_cache import cached_stage, stage_key
+from src.pipeline import main, stage_keys
+from src.signals import SIGNALS
+
+
+@pytest.fixture
+def base_config(tmp_path) -> dict:
+    return {
+        "data_loading": {"start_date": "2023-01-01", "end_date": "2023-01-05", "russell_filter": True},
+        "data_cleaning": {"filters": [{"usa_only": True, "min_price": 5.0}]},
+        "signal": {"name": "idio_vol", "type": "idio_vol", "window_size": 3},
+        "backtest": {"constraints": ["FullInvestment"], "gamma": 400, "n_cpus": 8},
+        "output": {"results_path": str(tmp_path / "results"), "cache_path": str(tmp_path / "cache")},
+    }
+
+
+def test_stage_key_ignores_non_semantic_keys(base_config):
+    """n_cpus and cache locations do not change artifact keys."""
+    other = yaml.safe_load(yaml.dump(base_config))
+    other["backtest"]["n_cpus"] = 1
+    other["data_loading"]["cache_path"] = "elsewhere"
+    assert stage_keys(other) == stage_keys(base_config)
+
+
+def test_stage_keys_invalidate_downstream_only(base_config):
+    """A gamma change keeps data/alpha keys, a filter change moves every key."""
+    keys = stage_keys(base_config)
+
+    gamma = yaml.safe_load(yaml.dump(base_config))
+    gamma["backtest"]["gamma"] = 10
+    gamma_keys = stage_keys(gamma)
+    assert gamma_keys["data"] == keys["data"]
+    assert gamma_keys["alphas"] == keys["alphas"]
+    assert gamma_keys["weights"] != keys["weights"]
+
+    filters = yaml.safe_load(yaml.dump(base_config))
+    filters["data_cleaning"]["filters"][0]["min_price"] = 1.0
+    filter_keys = stage_keys(filters)
+    assert all(filter_keys[stage] != keys[stage] for stage in keys)
+
+
+def test_stage_keys_follow_execution_mode(base_config):
+    """Pipelined alphas and weights are stored apart from monolithic ones, profiling changes nothing."""
+    keys = stage_keys(base_config)
+
+    pipelined = yaml.safe_load(yaml.dump(base_config))
+    pipelined["execution"] = {"mode": "pipelined", "profile": "cprofile"}
+    pipelined_keys = stage_keys(pipelined)
+    assert pipelined_keys["data"] == keys["data"]
+    assert pipelined_keys["alphas"] != keys["alphas"]
+
+    profiled = yaml.safe_load(yaml.dump(base_config))
+    profiled["execution"] = {"mode": "monolithic", "profile": "cprofile"}
+    assert stage_keys(profiled) == keys
+    # a sweep runs a pipelined config monolithically on the data it loaded
+    assert stage_keys(pipelined, "monolithic") == keys
+
+
+def test_stage_keys_hash_only_the_backtest_mode_run(base_config):
+    """Quick settings do not move an mvo run's keys, optimizer settings do not move a quick run's."""
+    keys = stage_keys(base_config)
+
+    quick_settings = yaml.safe_load(yaml.dump(base_config))
+    quick_settings["backtest"]["quick"] = {"portfolio": "rank"}
+    assert stage_keys(quick_settings) == keys
+
+    quick = yaml.safe_load(yaml.dump(base_config))
+    quick["backtest"].update(mode="quick", quick={"portfolio": "rank"})
+    quick_keys = stage_keys(quick)
+    assert quick_keys["weights"] != keys["weights"]
+
+    quick["backtest"].update(gamma=10, constraints=["LongOnly"])
+    assert stage_keys(quick) == quick_keys
+    quick["backtest"]["quick"]["portfolio"] = "alpha"
+    assert stage_keys(quick)["weights"] != quick_keys["weights"]
+
+
+def test_stage_keys_hash_returns_settings_the_engine_reads(base_config):
+    """Costs only move the returns key of the streaming engine."""
+    base_config["returns"] = {"engine": "sf_quant", "cost_bps": 5.0}
+    keys = stage_keys(base_config)
+    base_config["returns"]["cost_bps"] = 10.0
+    assert stage_keys(base_config) == keys
+
+    base_config["returns"]["engine"] = "streaming"
+    streaming_keys = stage_keys(base_config)
+    base_config["returns"]["cost_bps"] = 5.0
+    assert stage_keys(base_config)["returns"] != streaming_keys["returns"]
+
+
+def test_stage_keys_follow_code_versions(base_config, monkeypatch):
+    """Bumping the cache version moves every key, a signal's version moves its alphas and below."""
+    keys = stage_keys(base_config)
+
+    monkeypatch.setitem(SIGNALS, "idio_vol", {**SIGNALS["idio_vol"], "version": 2})
+    signal_keys = stage_keys(base_config)
+    assert signal_keys["data"] == keys["data"]
+    assert all(signal_keys[stage] != keys[stage] for stage in ["alphas", "weights", "returns"])
+
+    monkeypatch.setattr(artifact_cache, "CACHE_VERSION", artifact_cache.CACHE_VERSION + 1)
+    assert all(stage_keys(base_config)[stage] != signal_keys[stage] for stage in keys)
+
+
+def test_cached_stage_reuses_artifact(tmp_path):
+    """A stored artifact is returned without calling compute again, unless forced."""
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return pl.DataFrame({"a": [1, 2]})
+
+    cached_stage(str(tmp_path), "alphas", stage_key({"x": 1}), compute)
+    result = cached_stage(str(tmp_path), "alphas", stage_key({"x": 1}), compute)
+    assert result["a"].to_list() == [1, 2]
+    assert len(calls) == 1
+
+    cached_stage(str(tmp_path), "alphas", stage_key({"x": 1}), compute, force=True)
+    assert len(calls) == 2
+
+
+@patch("src.pipeline.sfp.generate_returns_from_weights")
+@patch("src.pipeline.run_mvo_backtest")
+@patch("src.pipeline.compute_alphas")
+@patch("src.pipeline.load_barra_data")
+def test_gamma_change_reuses_alphas(mock_load, mock_alphas, mock_backtest, mock_returns, base_config, tmp_path):
+    """Re-running with a new gamma skips the data and signal stages."""
+    frame = pl.DataFrame({"date": ["2023-01-04"], "barrid": ["US1"], "weight": [1.0]})
+    mock_load.return_value = frame
+    mock_alphas.return_value = frame
+    mock_backtest.return_value = frame
+    mock_returns.return_value = pl.DataFrame({"date": ["2023-01-04"], "return": [0.01]})
+
+    config_path = tmp_path / "run.yaml"
+    config_path.write_text(yaml.dump(base_config))
+    main(str(config_path))
+
+    base_config["backtest"]["gamma"] = 10
+    config_path.write_text(yaml.dump(base_config))
+    main(str(config_path))
+
+    assert mock_load.call_count == 1
+    assert mock_alphas.call_count == 1
+    assert mock_backtest.call_count == 2
+
+    main(str(config_path), force=True)
+    assert mock_load.call_count == 2
+    assert mock_alphas.call_count == 2
+
+
+@patch("src.pipeline.sfp.generate_returns_from_weights")
+@patch("src.pipeline.run_mvo_backtest")
+@patch("src.pipeline.compute_alphas")
+def test_sweep_of_pipelined_config_keys_monolithic(mock_alphas, mock_backtest, mock_returns, base_config, tmp_path):
+    """Alphas a sweep computes monolithically for a pipelined config are stored under the monolithic key."""
+    frame = pl.DataFrame({"date": ["2023-01-04"], "barrid": ["US1"], "weight": [1.0]})
+    mock_alphas.return_value = frame
+    mock_backtest.return_value = frame
+    mock_returns.return_value = pl.DataFrame({"date": ["2023-01-04"], "return": [0.01]})
+
+    config_path = tmp_path / "run.yaml"
+    base_config["execution"] = {"mode": "pipelined"}
+    config_path.write_text(yaml.dump(base_config))
+    main(str(config_path), load_data=lambda: frame)
+
+    base_config["execution"] = {"mode": "monolithic"}
+    config_path.write_text(yaml.dump(base_config))
+    main(str(config_path), load_data=lambda: frame)
+
+    assert mock_alphas.call_count == 1
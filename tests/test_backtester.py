@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Tests for backtester.py"""
+
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src.backtester import drift_weights, plan_chunks, plan_in_flight, rebalance_dates, run_mvo_backtest
+from src.solve_log import SOLVE_COLUMNS, read_solve_log, summarize_solves
+
+
+def _fake_solve(date_, subset, constraint_objects, gamma, risk_model=None):
+    """Deterministic stand-in for the per-date optimizer: weight = alpha, nothing logged."""
+    return subset.sort("barrid").select("date", "barrid", pl.col("alpha").alias("weight")), []
+
+
+@pytest.fixture
+def alpha_data() -> pl.DataFrame:
+    """Small alpha panel as produced by compute_alphas."""
+    return pl.DataFrame(
+        {
+            "date": [dt.date(2023, 1, 3)] * 3 + [dt.date(2023, 1, 4)] * 3,
+            "barrid": ["USA", "USB", "USC"] * 2,
+            "return": [0.01, -0.02, 0.005, 0.0, 0.01, -0.01],
+            "specific_risk": [0.2, 0.3, 0.25] * 2,
+            "predicted_beta": [1.0, 1.2, 0.8] * 2,
+            "test_signal_alpha": [0.01, None, -0.02, 0.03, 0.01, -0.01],
+        }
+    )
+
+
+@pytest.fixture
+def long_alpha_data() -> pl.DataFrame:
+    dates = pl.date_range(dt.date(2023, 1, 2), dt.date(2023, 1, 11), eager=True).to_list()
+    return pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in range(2)],
+            "barrid": ["USA", "USB"] * len(dates),
+            "predicted_beta": [1.0, 1.1] * len(dates),
+            "test_signal_alpha": [float(i) for i in range(2 * len(dates))],
+        }
+    )
+
+
+@patch("src.backtester._solve_date", side_effect=_fake_solve)
+def test_run_mvo_backtest_drops_null_alphas(mock_solve, alpha_data):
+    """Rows without an alpha never reach the optimizer."""
+    weights = run_mvo_backtest(alpha_data, "test_signal", ["FullInvestment"], gamma=2, n_cpus=1)
+
+    sent = pl.concat([call.args[1] for call in mock_solve.call_args_list])
+    assert sent.columns == ["date", "barrid", "alpha", "predicted_beta"]
+    assert len(sent) == 5
+    assert weights.columns == ["date", "barrid", "weight"]
+
+
+@patch("src.backtester._solve_date", side_effect=_fake_solve)
+def test_run_mvo_backtest_accepts_compact_dtypes(mock_solve, alpha_data):
+    """Categorical/Float32 panels are cast back to the dtypes sf_quant expects."""
+    compact = alpha_data.with_columns(
+        pl.col("barrid").cast(pl.Categorical),
+        pl.col("test_signal_alpha", "predicted_beta").cast(pl.Float32),
+    )
+    run_mvo_backtest(compact, "test_signal", ["FullInvestment"], gamma=2, n_cpus=1)
+
+    sent = mock_solve.call_args.args[1]
+    assert sent.schema["barrid"] == pl.String
+    assert sent.schema["alpha"] == pl.Float64
+    assert sent.schema["predicted_beta"] == pl.Float64
+
+
+def test_run_mvo_backtest_unknown_constraint(alpha_data):
+    """Unknown constraint names raise a ValueError."""
+    with pytest.raises(ValueError, match="unknown constraint"):
+        run_mvo_backtest(alpha_data, "test_signal", ["NotAConstraint"], gamma=2, n_cpus=1)
+
+
+@patch("src.backtester._solve_date", side_effect=_fake_solve)
+def test_checkpointed_backtest_resumes(mock_solve, long_alpha_data, tmp_path):
+    """A crashed run resumes from its checkpoints and matches an uninterrupted run."""
+    expected = run_mvo_backtest(long_alpha_data, "test_signal", ["FullInvestment"], 2, 1)
+
+    def crash_on_fifth_date(date_, subset, constraint_objects, gamma, risk_model=None):
+        if mock_solve.call_count == 5:
+            raise MemoryError("oom")
+        return _fake_solve(date_, subset, constraint_objects, gamma)
+
+    mock_solve.reset_mock()
+    mock_solve.side_effect = crash_on_fifth_date
+    with pytest.raises(MemoryError):
+        run_mvo_backtest(
+            long_alpha_data, "test_signal", ["FullInvestment"], 2, 1,
+            checkpoint_dir=str(tmp_path), checkpoint_every=4
+        )
+
+    mock_solve.reset_mock()
+    mock_solve.side_effect = _fake_solve
+    result = run_mvo_backtest(
+        long_alpha_data, "test_signal", ["FullInvestment"], 2, 1,
+        checkpoint_dir=str(tmp_path), checkpoint_every=4
+    )
+
+    # the first chunk of four dates was checkpointed before the crash and is not solved again
+    assert mock_solve.call_count == 6
+    assert result.equals(expected)
+
+
+@patch("src.backtester._solve_date", side_effect=_fake_solve)
+def test_fully_checkpointed_backtest_resumes(mock_solve, long_alpha_data, tmp_path):
+    """A job killed after its last chunk returns the checkpointed weights without solving or planning."""
+    args = (long_alpha_data, "test_signal", ["FullInvestment"], 2, 1)
+    expected = run_mvo_backtest(*args, checkpoint_dir=str(tmp_path), checkpoint_every=4, memory_budget_gb=24)
+
+    mock_solve.reset_mock()
+    result = run_mvo_backtest(*args, checkpoint_dir=str(tmp_path), checkpoint_every=4, memory_budget_gb=24)
+
+    assert mock_solve.call_count == 0
+    assert result.equals(expected)
+
+
+def test_plan_chunks_respects_memory_budget():
+    """Chunks stay under the per-chunk slice budget and never split a date."""
+    date_counts = pl.DataFrame({"date": list(range(10)), "len": [1000] * 10})
+
+    unbounded = plan_chunks(date_counts, in_flight=1, max_dates=250)
+    assert unbounded == [list(range(10))]
+
+    # budget leaves room for one solve of 1000 assets plus ~3 dates of slice data
+    budget_gb = (4 * 8 * 1000**2 + 3 * 1000 * 48) / 1e9
+    bounded = plan_chunks(date_counts, in_flight=1, memory_budget_gb=budget_gb)
+    assert [len(chunk) for chunk in bounded] == [3, 3, 3, 1]
+    assert sum(bounded, []) == list(range(10))
+
+
+def test_plan_in_flight_bounded_by_budget_and_cpus():
+    """In-flight chunks are capped by cpus, max_in_flight and the largest solve."""
+    date_counts = pl.DataFrame({"date": [0, 1], "len": [1000, 3000]})
+    assert plan_in_flight(date_counts, n_cpus=8) == 8
+    assert plan_in_flight(date_counts, n_cpus=8, max_in_flight=2) == 2
+    # one 3000-asset solve needs ~0.29 GB
+    assert plan_in_flight(date_counts, n_cpus=8, memory_budget_gb=0.6) == 2
+    assert plan_in_flight(date_counts, n_cpus=8, memory_budget_gb=0.01) == 1
+
+
+class _InProcessPool(ThreadPoolExecutor):
+    """Stands in for the spawned pool so the patched solve is visible to workers."""
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers)
+
+
+@patch("src.backtester.ProcessPoolExecutor", _InProcessPool)
+@patch("src.backtester._solve_date", side_effect=_fake_solve)
+def test_process_executor_matches_in_process(mock_solve, long_alpha_data):
+    """The local pool spools slices through ipc files and returns the in-process weights."""
+    expected = run_mvo_backtest(long_alpha_data, "test_signal", ["FullInvestment"], 2, n_cpus=1)
+    result = run_mvo_backtest(
+        long_alpha_data, "test_signal", ["FullInvestment"], 2, n_cpus=3, executor="processes"
+    )
+    assert result.equals(expected)
+
+
+def test_unknown_executor(long_alpha_data):
+    """Unknown executors raise a ValueError."""
+    with pytest.raises(ValueError, match="unknown executor"):
+        run_mvo_backtest(long_alpha_data, "test_signal", ["FullInvestment"], 2, 1, executor="slurm")
+
+
+def _fake_factor_model(date_, barrids):
+    """One-factor risk model with equal specific risk for every asset."""
+    n_assets = len(barrids)
+    return np.ones((n_assets, 1)), np.array([[0.01]]), np.full(n_assets, 0.04)
+
+
+@patch("src.backtester.load_factor_model", side_effect=_fake_factor_model)
+def test_native_solver_backtest(mock_model, long_alpha_data):
+    """The native solver fully invests each date, tilting towards the higher alpha."""
+    result = run_mvo_backtest(
+        long_alpha_data, "test_signal", ["FullInvestment", "LongOnly"], 2, n_cpus=1, solver="native"
+    )
+
+    assert result.columns == ["date", "barrid", "weight"]
+    assert len(result) == len(long_alpha_data)
+    sums = result.group_by("date").agg(pl.col("weight").sum())["weight"]
+    assert (sums - 1).abs().max() < 1e-4
+    assert (result.filter(pl.col("barrid") == "USB")["weight"] >= 0.5).all()
+
+
+def test_native_solver_rejects_unsupported_constraints(long_alpha_data):
+    """Constraint sets without a native formulation fail before any solve."""
+    with pytest.raises(ValueError, match="native solver"):
+        run_mvo_backtest(long_alpha_data, "test_signal", ["ZeroBeta"], 2, 1, solver="native")
+
+
+def test_rebalance_dates():
+    """Weekly and monthly pick the first trading date of each period, n picks every n-th."""
+    dates = [dt.date(2024, 1, 30), dt.date(2024, 1, 31), dt.date(2024, 2, 1), dt.date(2024, 2, 5), dt.date(2024, 2, 6)]
+
+    assert rebalance_dates(dates, "daily") == dates
+    assert rebalance_dates(dates, "weekly") == [dt.date(2024, 1, 30), dt.date(2024, 2, 5)]
+    assert rebalance_dates(dates, "monthly") == [dt.date(2024, 1, 30), dt.date(2024, 2, 1)]
+    assert rebalance_dates(dates, 2) == [dt.date(2024, 1, 30), dt.date(2024, 2, 1), dt.date(2024, 2, 6)]
+    with pytest.raises(ValueError, match="unknown rebalance"):
+        rebalance_dates(dates, "yearly")
+
+
+def test_drift_weights_matches_daily_recursion():
+    """Closed-form drift equals rolling w * (1 + r) / (1 + sum(w * r)) forward one day at a time."""
+    dates = pl.date_range(dt.date(2024, 1, 1), dt.date(2024, 1, 4), eager=True).to_list()
+    weights = pl.DataFrame({"date": [dates[0]] * 2, "barrid": ["USA", "USB"], "weight": [0.3, 0.5]})
+    returns = pl.DataFrame({
+        "date": [d for d in dates for _ in range(2)],
+        "barrid": ["USA", "USB"] * 4,
+        "return": [0.01, -0.02, 0.03, 0.0, -0.01, 0.02, 0.0, 0.0],
+    })
+
+    result = drift_weights(weights, returns, dates).sort(["date", "barrid"])
+
+    expected = [0.3, 0.5]
+    for i, date_ in enumerate(dates):
+        if i > 0:
+            # yesterday's weights earn today's return, 20% cash earns nothing
+            r = returns.filter(pl.col("date") == date_)["return"].to_list()
+            total = 1 + sum(w * ret for w, ret in zip(expected, r))
+            expected = [w * (1 + ret) / total for w, ret in zip(expected, r)]
+        day = result.filter(pl.col("date") == date_)["weight"].to_list()
+        assert day == pytest.approx(expected)
+
+
+@patch("src.backtester._solve_date", side_effect=_fake_solve)
+def test_rebalanced_backtest_solves_only_rebalance_dates(mock_solve, long_alpha_data):
+    """Every third date is solved and the dates in between carry drifted weights."""
+    data = long_alpha_data.with_columns(pl.lit(0.01).alias("return"))
+    daily = run_mvo_backtest(data, "test_signal", ["FullInvestment"], 2, 1)
+    mock_solve.reset_mock()
+
+    result = run_mvo_backtest(data, "test_signal", ["FullInvestment"], 2, 1, rebalance=3)
+
+    assert mock_solve.call_count == 4
+    assert result["date"].to_list() == daily["date"].to_list()
+    solved = daily.filter(pl.col("date").is_in(rebalance_dates(data["date"].to_list(), 3)))
+    assert result.join(solved, on=["date", "barrid"], how="semi").equals(solved)
+
+
+def test_rebalance_requires_returns(long_alpha_data):
+    """Drifting weights without returns is an error."""
+    with pytest.raises(ValueError, match="'return' column"):
+        run_mvo_backtest(long_alpha_data, "test_signal", ["FullInvestment"], 2, 1, rebalance="weekly")
+
+
+def _fake_covariance(date_, barrids):
+    """Diagonal covariance frame in the shape sf_quant returns."""
+    return pl.DataFrame({"barrid": barrids, **{b: [0.04 * (b == c) for c in barrids] for b in barrids}})
+
+
+def _fake_optimizer(ids, alphas, covariance_matrix, gamma, constraints, betas):
+    """Unconstrained mean-variance weights alpha / (gamma * variance)."""
+    return pl.DataFrame({"barrid": ids, "weight": alphas / (gamma * np.diag(covariance_matrix))})
+
+
+@patch("src.backtester.sfo.mve_optimizer", side_effect=_fake_optimizer)
+@patch("src.backtester.sfd.construct_covariance_matrix", side_effect=_fake_covariance)
+def test_gamma_list_shares_covariance(mock_cov, mock_opt, long_alpha_data):
+    """Each date's covariance is built once and solved for every gamma, weights keyed by gamma."""
+    gammas = [1, 2.0, 4]
+    result = run_mvo_backtest(long_alpha_data, "test_signal", ["FullInvestment"], gammas, 1)
+
+    assert mock_cov.call_count == 10
+    assert mock_opt.call_count == 30
+    assert result.columns == ["gamma", "date", "barrid", "weight"]
+    assert result["gamma"].unique().sort().to_list() == [1.0, 2.0, 4.0]
+
+    single = run_mvo_backtest(long_alpha_data, "test_signal", ["FullInvestment"], 2, 1)
+    assert result.filter(pl.col("gamma") == 2.0).drop("gamma").equals(single)
+
+
+@patch("src.backtester.load_factor_model", side_effect=_fake_factor_model)
+def test_native_solver_gamma_list(mock_model, long_alpha_data):
+    """The native path loads each date's factor model once for all gammas."""
+    result = run_mvo_backtest(
+        long_alpha_data, "test_signal", ["FullInvestment", "LongOnly"], [2, 2000], n_cpus=1, solver="native"
+    )
+
+    assert mock_model.call_count == 10
+    assert len(result) == 2 * len(long_alpha_data)
+    # more risk aversion moves the book back towards equal weights
+    usb = result.filter(pl.col("barrid") == "USB").group_by("gamma").agg(pl.col("weight").mean()).sort("gamma")
+    assert usb["weight"][0] > usb["weight"][1]
+
+
+@patch("src.backtester.load_factor_model", side_effect=_fake_factor_model)
+def test_solve_log(mock_model, alpha_data, tmp_path, capsys):
+    """Each solved date is logged with its universe, alphas, iterations and status, and summarized."""
+    run_mvo_backtest(
+        alpha_data, "test_signal", ["FullInvestment", "LongOnly"], [2, 20], n_cpus=1, solver="native",
+        solve_log_path=str(tmp_path / "solves")
+    )
+
+    solves = read_solve_log(tmp_path / "solves")
+    assert solves.columns == list(SOLVE_COLUMNS)
+    assert solves.select("date", "gamma", "universe", "n_alphas").rows() == [
+        (dt.date(2023, 1, 3), 2.0, 3, 2),
+        (dt.date(2023, 1, 3), 20.0, 3, 2),
+        (dt.date(2023, 1, 4), 2.0, 3, 3),
+        (dt.date(2023, 1, 4), 20.0, 3, 3),
+    ]
+    assert solves["status"].to_list() == ["solved"] * 4
+    assert (solves["iterations"] > 0).all()
+    assert (solves["solve_s"] > 0).all() and (solves["rss_mb"] > 0).all()
+    assert "solves: 2 dates" in capsys.readouterr().out
+
+
+@patch("src.backtester.sfo.mve_optimizer", side_effect=_fake_optimizer)
+@patch("src.backtester.sfd.construct_covariance_matrix", side_effect=_fake_covariance)
+def test_solve_log_survives_resume(mock_cov, mock_opt, long_alpha_data, tmp_path):
+    """Dates solved before a restart keep their log rows from the checkpoints."""
+    checkpoint_dir = tmp_path / "checkpoints"
+    args = (long_alpha_data, "test_signal", ["FullInvestment"], 2, 1)
+    run_mvo_backtest(*args, checkpoint_dir=str(checkpoint_dir), checkpoint_every=4)
+    for path in sorted(checkpoint_dir.glob("*_2023-01-06_*.parquet")):
+        path.unlink()
+
+    run_mvo_backtest(*args, checkpoint_dir=str(checkpoint_dir), checkpoint_every=4, solve_log_path=str(tmp_path / "solves"))
+
+    solves = read_solve_log(tmp_path / "solves")
+    assert solves["date"].to_list() == long_alpha_data["date"].unique().sort().to_list()
+    assert solves["iterations"].is_null().all()
+    assert mock_opt.call_count == 10 + 4
+
+
+@patch("src.backtester.load_factor_model", side_effect=_fake_factor_model)
+def test_native_solver_infeasible_date_is_logged(mock_model, long_alpha_data, tmp_path, capsys):
+    """A long-only, fully invested book cannot have unit beta when every beta is 1.5."""
+    infeasible = long_alpha_data.with_columns(
+        pl.when(pl.col("date") == dt.date(2023, 1, 5)).then(1.5).otherwise(1.0).alias("predicted_beta")
+    )
+
+    result = run_mvo_backtest(
+        infeasible, "test_signal", ["FullInvestment", "LongOnly", "UnitBeta"], 2, n_cpus=1, solver="native",
+        solve_log_path=str(tmp_path / "solves")
+    )
+
+    solves = read_solve_log(tmp_path / "solves")
+    failed = summarize_solves(solves)["failed"]
+    assert failed.select("date", "status").rows() == [(dt.date(2023, 1, 5), "primal infeasible")]
+    assert len(solves) == 10
+    # the failed date gets no weights, the dates after it are still solved
+    assert result["date"].unique().sort().to_list() == solves.filter(pl.col("status") == "solved")["date"].to_list()
+    assert "solves: 1 not solved" in capsys.readouterr().out
+
+
+def _no_solution_optimizer(ids, alphas, covariance_matrix, gamma, constraints, betas):
+    """sf_quant's optimizer on an infeasible problem: cvxpy has no solution, every weight is null."""
+    return pl.DataFrame({"barrid": ids, "weight": None})
+
+
+@patch("src.backtester.sfo.mve_optimizer", side_effect=_no_solution_optimizer)
+@patch("src.backtester.sfd.construct_covariance_matrix", side_effect=_fake_covariance)
+def test_null_weights_are_not_solved(mock_cov, mock_opt, alpha_data, tmp_path):
+    """Null weights from sf_quant are a failed solve, logged and checkpointed, not a solved all-null book."""
+    checkpoint_dir = tmp_path / "checkpoints"
+    args = (alpha_data, "test_signal", ["FullInvestment"], [2, 20], 1)
+    result = run_mvo_backtest(*args, checkpoint_dir=str(checkpoint_dir), solve_log_path=str(tmp_path / "solves"))
+
+    assert result.is_empty()
+    solves = read_solve_log(tmp_path / "solves")
+    assert summarize_solves(solves)["failed"]["status"].to_list() == ["no solution (infeasible or unbounded)"] * 4
+
+    # a rerun does not retry the failed dates
+    run_mvo_backtest(*args, checkpoint_dir=str(checkpoint_dir))
+    assert mock_opt.call_count == 4
+
+
+@patch("src.backtester.sfo.mve_optimizer", side_effect=_fake_optimizer)
+@patch("src.backtester.sfd.construct_covariance_matrix", side_effect=_fake_covariance)
+def test_solve_log_of_shared_checkpoint_dir(mock_cov, mock_opt, long_alpha_data, tmp_path, capsys):
+    """Backtests sharing a checkpoint directory, as pipelined years do, log only their own dates."""
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    first = long_alpha_data.filter(pl.col("date") <= dt.date(2023, 1, 6))
+    second = long_alpha_data.filter(pl.col("date") > dt.date(2023, 1, 6))
+    run_mvo_backtest(first, "test_signal", ["FullInvestment"], 2, 1, checkpoint_dir=checkpoint_dir)
+
+    run_mvo_backtest(
+        second, "test_signal", ["FullInvestment"], 2, 1,
+        checkpoint_dir=checkpoint_dir, solve_log_path=str(tmp_path / "solves")
+    )
+
+    solves = read_solve_log(tmp_path / "solves")
+    assert solves["date"].to_list() == second["date"].unique().sort().to_list()
+    assert solves["universe"].null_count() == 0
+    assert "resuming backtest" not in capsys.readouterr().out
+
+
+@patch("src.backtester.sfo.mve_optimizer", side_effect=_fake_optimizer)
+@patch("src.backtester.sfd.construct_covariance_matrix", side_effect=_fake_covariance)
+def test_solve_log_string_dates(mock_cov, mock_opt, alpha_data, tmp_path):
+    """String dates are logged as strings, like the weights."""
+    data = alpha_data.with_columns(pl.col("date").cast(pl.String))
+    run_mvo_backtest(data, "test_signal", ["FullInvestment"], 2, 1, solve_log_path=str(tmp_path / "solves"))
+
+    solves = read_solve_log(tmp_path / "solves")
+    assert solves["date"].to_list() == ["2023-01-03", "2023-01-04"]
+    assert solves["universe"].to_list() == [3, 3]
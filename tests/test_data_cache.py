@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Tests for data_cache.py"""
+
+import datetime as dt
+from unittest.mock import patch
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from src.data_cache import load_assets_cached
+
+
+@pytest.fixture
+def source_data() -> pl.DataFrame:
+    """Two assets over two calendar years, standing in for the silverfund assets table."""
+    dates = pl.date_range(dt.date(2022, 12, 26), dt.date(2023, 1, 6), eager=True).to_list()
+    return pl.DataFrame(
+        {
+            "date": dates * 2,
+            "barrid": ["USA"] * len(dates) + ["USB"] * len(dates),
+            "price": [float(i) for i in range(2 * len(dates))],
+            "return": [0.1 * i for i in range(2 * len(dates))],
+        }
+    ).sort(["barrid", "date"])
+
+
+@pytest.fixture
+def fake_source(source_data):
+    """Mimic sfd.load_assets and record every call made to it."""
+    calls = []
+
+    def load_assets(start, end, columns, in_universe=None):
+        calls.append((start, end, list(columns)))
+        return (
+            source_data.filter(pl.col("date").is_between(start, end))
+            .sort(["barrid", "date"])
+            .select(columns)
+        )
+
+    with patch("src.data_cache.sfd.load_assets", side_effect=load_assets):
+        yield calls
+
+
+def test_cold_cache_matches_source(fake_source, source_data, tmp_path):
+    """A cold cache returns the same frame as the source."""
+    start, end = dt.date(2022, 12, 28), dt.date(2023, 1, 3)
+    result = load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+
+    expected = source_data.filter(pl.col("date").is_between(start, end)).select(["date", "barrid", "price"])
+    assert_frame_equal(result, expected)
+    # one fetch per year partition
+    assert len(fake_source) == 2
+
+
+def test_warm_cache_skips_source(fake_source, tmp_path):
+    """A repeated request is served entirely from disk."""
+    start, end = dt.date(2022, 12, 28), dt.date(2023, 1, 3)
+    load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+    fake_source.clear()
+
+    load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+    assert fake_source == []
+
+
+def test_extending_end_date_fetches_only_new_days(fake_source, source_data, tmp_path):
+    """Moving end_date forward by one day pulls only that day."""
+    start = dt.date(2022, 12, 28)
+    load_assets_cached(start, dt.date(2023, 1, 3), ["date", "barrid", "price"], True, str(tmp_path))
+    fake_source.clear()
+
+    result = load_assets_cached(start, dt.date(2023, 1, 4), ["date", "barrid", "price"], True, str(tmp_path))
+
+    assert [(s, e) for s, e, _ in fake_source] == [(dt.date(2023, 1, 4), dt.date(2023, 1, 4))]
+    assert result["date"].max() == dt.date(2023, 1, 4)
+    assert len(result) == len(source_data.filter(pl.col("date").is_between(start, dt.date(2023, 1, 4))))
+
+
+def test_new_columns_fetch_only_missing_columns(fake_source, source_data, tmp_path):
+    """Requesting an extra column pulls just that column for the cached range."""
+    start, end = dt.date(2023, 1, 2), dt.date(2023, 1, 5)
+    load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+    fake_source.clear()
+
+    result = load_assets_cached(start, end, ["date", "barrid", "price", "return"], True, str(tmp_path))
+
+    assert [cols for _, _, cols in fake_source] == [["date", "barrid", "return"]]
+    expected = source_data.filter(pl.col("date").is_between(start, end))
+    assert_frame_equal(result, expected)
+
+
+def test_universe_flag_is_cached_separately(fake_source, tmp_path):
+    """Universe and non-universe loads never share cache files."""
+    start, end = dt.date(2023, 1, 2), dt.date(2023, 1, 3)
+    load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+    fake_source.clear()
+
+    load_assets_cached(start, end, ["date", "barrid", "price"], False, str(tmp_path))
+    assert len(fake_source) == 1
+
+
+def test_years_with_different_columns(fake_source, source_data, tmp_path):
+    """A year extended with a column another year lacks still scans together with it."""
+    load_assets_cached(dt.date(2022, 12, 26), dt.date(2022, 12, 30), ["date", "barrid", "price"], True, str(tmp_path))
+    load_assets_cached(dt.date(2023, 1, 2), dt.date(2023, 1, 5), ["date", "barrid", "price", "return"], True, str(tmp_path))
+
+    start, end = dt.date(2022, 12, 28), dt.date(2023, 1, 3)
+    result = load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+
+    expected = source_data.filter(pl.col("date").is_between(start, end)).select(["date", "barrid", "price"])
+    assert_frame_equal(result.sort(["barrid", "date"]), expected)
+
+
+def test_dates_past_the_source_are_fetched_again(fake_source, source_data, tmp_path):
+    """Only dates the source returned are marked cached, later days are asked for on the next load."""
+    start, end = dt.date(2023, 1, 2), dt.date(2023, 1, 10)
+    load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+    fake_source.clear()
+
+    load_assets_cached(start, end, ["date", "barrid", "price"], True, str(tmp_path))
+    assert [(s, e) for s, e, _ in fake_source] == [(dt.date(2023, 1, 7), dt.date(2023, 1, 10))]
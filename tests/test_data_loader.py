@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 """Tests for data_loader.py"""
 
+import datetime as dt
+from unittest.mock import patch
+
 import polars as pl
 import pytest
+import yaml
 from polars.testing import assert_frame_equal
 
-from src.data_loader import apply_filters, prepare_data, validate_data
+from src.data_loader import apply_filters, load_asset_returns, load_barra_data, prepare_data, validate_data
+from src.telemetry import run_report
 
 
 def test_prepare_data_converts_to_decimal(barra_data: pl.DataFrame):
@@ -76,4 +81,178 @@ def test_validate_data_success(barra_data: pl.DataFrame):
 def test_validate_data_failure_missing_columns():
     """Test that validation fails if a required column is missing."""
     invalid_data = pl.DataFrame({"date": [], "barrid": []})
-    assert validate_data(invalid_data) is False
\ No newline at end of file
+    assert validate_data(invalid_data) is False
+
+def test_lazy_chain_matches_eager(barra_data: pl.DataFrame):
+    """Test that prepare_data and apply_filters give the same result on a LazyFrame."""
+    config = {"convert_returns_to_decimal": True, "replace_zero_volume": True}
+    filters = [{"usa_only": True, "min_price": 5.0}]
+
+    eager = apply_filters(prepare_data(barra_data, config), filters)
+    lazy = apply_filters(prepare_data(barra_data.lazy(), config), filters)
+
+    assert isinstance(lazy, pl.LazyFrame)
+    assert_frame_equal(lazy.collect(engine="streaming"), eager)
+
+
+def test_validate_data_lazy(barra_data: pl.DataFrame):
+    """Test that validation works on a LazyFrame without collecting it."""
+    assert validate_data(barra_data.lazy()) is True
+    assert validate_data(barra_data.lazy().filter(pl.col("price") < 0)) is False
+
+
+def test_load_barra_data_lazy_matches_eager(barra_data: pl.DataFrame, tmp_path):
+    """Test that the streaming lazy path over the parquet cache matches the eager load."""
+    source = barra_data.with_columns(pl.col("date").str.to_date())
+
+    def load_assets(start, end, columns, in_universe=None):
+        return source.filter(pl.col("date").is_between(start, end)).select(columns)
+
+    config = {
+        "data_loading": {
+            "start_date": "2023-01-01",
+            "end_date": "2023-01-02",
+            "russell_filter": True,
+            "columns": source.columns,
+        },
+        "data_cleaning": {"filters": [{"usa_only": True}]},
+    }
+    eager_path = tmp_path / "eager.yaml"
+    eager_path.write_text(yaml.dump(config))
+    config["data_loading"].update({"lazy": True, "cache_path": str(tmp_path / "cache")})
+    lazy_path = tmp_path / "lazy.yaml"
+    lazy_path.write_text(yaml.dump(config))
+
+    with patch("src.data_loader.sfd.load_assets", side_effect=load_assets):
+        with run_report("eager", tmp_path / "eager"):
+            eager = load_barra_data(str(eager_path))
+        with run_report("lazy", tmp_path / "lazy"):
+            lazy = load_barra_data(str(lazy_path))
+
+    assert_frame_equal(lazy.sort(["barrid", "date"]), eager.sort(["barrid", "date"]))
+    assert lazy["date"].min() == dt.date(2023, 1, 1)
+
+    # the lazy chain does all its work when collected, it is one stage rather than empty plan-building ones
+    stages = {
+        name: pl.read_parquet(tmp_path / name / "telemetry" / "run_report.parquet") for name in ["eager", "lazy"]
+    }
+    assert stages["eager"]["stage"].to_list() == ["load", "prepare", "filter"]
+    assert stages["lazy"].select("stage", "rows_out").rows() == [("load+filter (streaming)", len(lazy))]
+
+
+def test_prepare_data_compact_dtypes(barra_data: pl.DataFrame):
+    """Test that the opt-in compact schema shrinks identifiers, floats and dates."""
+    config = {"convert_returns_to_decimal": True, "compact_dtypes": True}
+    result = prepare_data(barra_data, config)
+
+    assert result.schema["date"] == pl.Date
+    assert result.schema["barrid"] == pl.Categorical
+    assert result.schema["iso_country_code"] == pl.Categorical
+    assert result.schema["return"] == pl.Float32
+    assert result.schema["specific_risk"] == pl.Float32
+    assert result.estimated_size() < barra_data.estimated_size()
+    assert result["return"].to_list() == pytest.approx([0.01, -0.005, 0.02])
+
+
+def test_apply_filters_on_compact_dtypes(barra_data: pl.DataFrame):
+    """Test that the USA filter works on Categorical identifiers."""
+    compact = prepare_data(barra_data, {"compact_dtypes": True})
+    result = apply_filters(compact, [{"usa_only": True}])
+    assert sorted(result["barrid"].cast(pl.String).to_list()) == ["US123", "US789"]
+
+
+def test_apply_filters_liquidity_percentiles():
+    """Percentile cutoffs rank each date on the previous day's dollar volume and spread."""
+    day_one = {"date": ["2023-01-01"] * 4, "barrid": ["US1", "US2", "US3", "US4"]}
+    day_two = {"date": ["2023-01-02"] * 4, "barrid": ["US1", "US2", "US3", "US4"]}
+    data = pl.DataFrame(
+        {
+            "date": day_two["date"] + day_one["date"],
+            "barrid": day_two["barrid"] + day_one["barrid"],
+            "price": [10.0] * 8,
+            # the second day would rank the other way, only the first day's values count for it
+            "daily_volume": [1.0, 2.0, 3.0, 4.0, 400.0, 300.0, 200.0, 100.0],
+            "bid_ask_spread": [0.9, 0.9, 0.9, 0.9, 0.01, 0.02, 0.03, 0.04],
+            "return": [0.0] * 8,
+            "specific_risk": [0.1] * 8,
+        }
+    )
+    kept = lambda filters: sorted(apply_filters(data, [{"usa_only": False, **filters}])["barrid"].to_list())
+
+    assert kept({"dollar_volume_percentile": 0.25}) == ["US1", "US2", "US3"]
+    assert kept({"bid_ask_spread_percentile": 0.5}) == ["US1", "US2"]
+    assert kept({"quality_level": 0.5}) == ["US1", "US2"]
+    assert apply_filters(data, [{"usa_only": False, "quality_level": 0.5}]).columns == data.columns
+
+    lazy = apply_filters(data.lazy(), [{"usa_only": False, "dollar_volume_percentile": 0.25}]).collect()
+    assert sorted(lazy["barrid"].to_list()) == ["US1", "US2", "US3"]
+
+
+def test_load_asset_returns_reads_sfp_returns(barra_data: pl.DataFrame, tmp_path):
+    """Held assets get the universe's forward returns sfp prices with, as decimals, with no cleaning filters."""
+    source = barra_data.with_columns((pl.col("return") * 2).alias("fwd_return"))
+    calls = []
+
+    def load_assets(start, end, columns, in_universe=None):
+        calls.append((columns, in_universe))
+        return source.filter(pl.col("date").str.to_date().is_between(start, end)).select(columns)
+
+    config_path = tmp_path / "run.yaml"
+    config_path.write_text(yaml.dump({
+        "data_loading": {"start_date": "2023-01-01", "end_date": "2023-01-02", "russell_filter": False, "columns": barra_data.columns},
+        "data_cleaning": {"filters": [{"usa_only": True, "min_price": 1000.0}]},
+    }))
+
+    with patch("src.data_loader.sfd.load_assets", side_effect=load_assets):
+        returns = load_asset_returns(str(config_path), dt.date(2023, 1, 1), dt.date(2023, 1, 2), ["CA456", "US789"])
+
+    assert calls == [(["date", "barrid", "fwd_return"], True)]
+    assert returns.schema["date"] == pl.Date
+    assert returns["barrid"].to_list() == ["CA456", "US789"]
+    assert returns["fwd_return"].to_list() == pytest.approx([-0.01, 0.04])
+
+
+def test_load_asset_returns_shares_research_cache(barra_data: pl.DataFrame, tmp_path):
+    """With the parquet cache the returns are read from the research panel's universe, not a second one."""
+    source = barra_data.with_columns(pl.col("date").str.to_date(), (pl.col("return") * 2).alias("fwd_return"))
+
+    def load_assets(start, end, columns, in_universe=None):
+        return source.filter(pl.col("date").is_between(start, end)).select(columns)
+
+    config_path = tmp_path / "run.yaml"
+    config_path.write_text(yaml.dump({
+        "data_loading": {
+            "start_date": "2023-01-01", "end_date": "2023-01-02", "russell_filter": True,
+            "columns": barra_data.columns, "cache_path": str(tmp_path / "cache"),
+        },
+    }))
+
+    with patch("src.data_loader.sfd.load_assets", side_effect=load_assets):
+        load_barra_data(str(config_path))
+        returns = load_asset_returns(str(config_path), dt.date(2023, 1, 2), dt.date(2023, 1, 2), ["US123", "US789"])
+
+    assert returns.select("barrid", "fwd_return").rows() == [("US789", pytest.approx(0.04))]
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["in_universe=True"]
+
+
+def test_liquidity_filters_keep_country_pushdown(tmp_path):
+    """usa_only conditions still reach the parquet scan with a lagged liquidity filter in the plan."""
+    pl.DataFrame({
+        "date": [dt.date(2023, 1, 1)] * 2,
+        "barrid": ["USA1", "GBB2"],
+        "rootid": ["USA1", "GBB2"],
+        "iso_country_code": ["USA", "GBR"],
+        "price": [10.0, 10.0],
+        "daily_volume": [1.0, 2.0],
+        "bid_ask_spread": [0.1, 0.1],
+        "return": [0.0, 0.0],
+        "specific_risk": [0.1, 0.1],
+    }).write_parquet(tmp_path / "assets.parquet")
+
+    plan = apply_filters(
+        pl.scan_parquet(tmp_path / "assets.parquet"), [{"min_price": 5.0, "dollar_volume_percentile": 0.2}]
+    ).explain()
+
+    selection = plan.split("SELECTION:")[1].splitlines()[0]
+    assert "iso_country_code" in selection
+    assert "price" not in selection
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for factor_solver.py"""
+
+import cvxpy as cp
+import numpy as np
+import pytest
+
+from src.factor_solver import align_warm_start, solve_mvo, solve_mvo_gammas
+
+CONSTRAINTS = ["FullInvestment", "LongOnly", "NoBuyingOnMargin", "UnitBeta"]
+
+
+@pytest.fixture
+def factor_model():
+    """Small random factor model with a feasible unit-beta long-only portfolio."""
+    rng = np.random.default_rng(0)
+    n_assets, n_factors = 60, 6
+    loadings = rng.normal(size=(n_factors, n_factors)) * 0.1
+    return {
+        "alphas": rng.normal(size=n_assets) * 0.05,
+        "exposures": rng.normal(size=(n_assets, n_factors)),
+        "factor_cov": loadings @ loadings.T + np.eye(n_factors) * 1e-3,
+        "specific_var": rng.uniform(0.01, 0.1, n_assets),
+        "betas": rng.uniform(0.5, 1.5, n_assets),
+    }
+
+
+def _dense_solve(model, gamma):
+    """Reference solve on the dense covariance, as the sf_quant optimizer does."""
+    covariance = (
+        model["exposures"] @ model["factor_cov"] @ model["exposures"].T
+        + np.diag(model["specific_var"])
+    )
+    weights = cp.Variable(len(model["alphas"]))
+    problem = cp.Problem(
+        cp.Maximize(model["alphas"] @ weights - 0.5 * gamma * cp.quad_form(weights, covariance)),
+        [cp.sum(weights) == 1, weights >= 0, cp.sum(weights) <= 1, model["betas"] @ weights == 1],
+    )
+    problem.solve(solver="OSQP", eps_abs=1e-8, eps_rel=1e-8)
+    return weights.value
+
+
+def test_matches_dense_optimizer(factor_model):
+    """The lifted factor formulation lands on the dense-covariance solution."""
+    weights, info, _ = solve_mvo(gamma=2, constraints=CONSTRAINTS, **factor_model)
+
+    assert info.status == "solved"
+    np.testing.assert_allclose(weights, _dense_solve(factor_model, 2), atol=1e-4)
+    assert weights.sum() == pytest.approx(1, abs=1e-5)
+    assert factor_model["betas"] @ weights == pytest.approx(1, abs=1e-5)
+
+
+def test_warm_start_matches_cold_solve(factor_model):
+    """Starting from the previous date's state gives the same answer in fewer iterations."""
+    _, cold_first, state = solve_mvo(gamma=2, constraints=CONSTRAINTS, **factor_model)
+
+    # next day: same assets, slightly different alphas
+    rng = np.random.default_rng(1)
+    factor_model["alphas"] = factor_model["alphas"] + rng.normal(size=60) * 0.002
+
+    cold, cold_info, _ = solve_mvo(gamma=2, constraints=CONSTRAINTS, **factor_model)
+    warm, warm_info, _ = solve_mvo(gamma=2, constraints=CONSTRAINTS, warm_start=state, **factor_model)
+
+    np.testing.assert_allclose(warm, cold, atol=1e-4)
+    assert warm_info.iter <= cold_info.iter
+
+
+def test_gamma_sweep_matches_separate_solves(factor_model):
+    """One setup solved for several gammas gives each gamma's own solution."""
+    gammas = [1, 2, 5, 10, 50]
+    results = solve_mvo_gammas(gammas=gammas, constraints=CONSTRAINTS, **factor_model)
+
+    assert len(results) == len(gammas)
+    for gamma, (weights, info, _) in zip(gammas, results):
+        assert info.status == "solved"
+        np.testing.assert_allclose(weights, _dense_solve(factor_model, gamma), atol=1e-4)
+
+
+def test_unsupported_constraint_raises(factor_model):
+    """Constraints without a native formulation are rejected."""
+    with pytest.raises(ValueError, match="ZeroBeta"):
+        solve_mvo(gamma=2, constraints=["FullInvestment", "ZeroBeta"], **factor_model)
+
+
+def test_align_warm_start_maps_by_barrid():
+    """State follows each barrid, assets entering the universe start at 0."""
+    state = {
+        "weights": np.array([0.2, 0.8]),
+        "asset_duals": np.array([-1.0, 0.0]),
+        "duals": np.array([0.5]),
+        "rho": 0.1,
+    }
+    aligned = align_warm_start(state, ["USA", "USB"], ["USB", "USC", "USA"])
+
+    np.testing.assert_array_equal(aligned["weights"], [0.8, 0.0, 0.2])
+    np.testing.assert_array_equal(aligned["asset_duals"], [0.0, 0.0, -1.0])
+    assert aligned["rho"] == 0.1
@@ -2,6 +2,8 @@ import pytest
 import polars as pl
 from polars.testing import assert_frame_equal
 
+from src.data_loader import compact_schema
+from src.signal_loader import compute_alphas
 from src.signals.idio_vol import compute_idio_vol
 
 
@@ -36,4 +38,23 @@ def test_compute_idio_vol_missing_columns():
     config = {"window_size": 20, "direction": 1, "shift": 0}
 
     with pytest.raises(pl.exceptions.ColumnNotFoundError):
-        compute_idio_vol(data, "test_signal", config)
\ No newline at end of file
+        compute_idio_vol(data, "test_signal", config)
+
+def test_compute_idio_vol_compact_dtypes():
+    """Test that the signal and alpha stages run on a compact (Categorical/Float32) panel."""
+    data = pl.DataFrame(
+        {
+            "date": ["2023-01-02", "2023-01-03", "2023-01-04"] * 2,
+            "barrid": ["A", "A", "A", "B", "B", "B"],
+            "specific_risk": [0.2, 0.21, 0.22, 0.3, 0.31, 0.32],
+        }
+    )
+    config = {"name": "idio_vol", "type": "idio_vol", "window_size": 2, "min_periods": 1}
+
+    expected = compute_alphas(data, config)
+    result = compute_alphas(compact_schema(data), config)
+
+    assert result.schema["idio_vol_alpha"] == pl.Float32
+    assert result["idio_vol_alpha"].to_list() == pytest.approx(
+        expected["idio_vol_alpha"].to_list(), nan_ok=True
+    )
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for normalization.py"""
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src.normalization import normalize_signal
+
+
+@pytest.fixture
+def cross_section() -> pl.DataFrame:
+    """Five dates of forty assets with a fat-tailed signal, two exposures, an industry and a few gaps."""
+    rng = np.random.default_rng(0)
+    n_dates, n_assets = 5, 40
+    n = n_dates * n_assets
+    return pl.DataFrame(
+        {
+            "date": np.repeat(np.arange(n_dates), n_assets),
+            "barrid": np.tile([f"US{i}" for i in range(n_assets)], n_dates),
+            "signal": rng.standard_t(2, n),
+            "predicted_beta": rng.normal(1, 0.3, n),
+            "size": rng.normal(0, 1, n),
+            "industry": rng.choice(["tech", "energy", "banks"], n),
+        }
+    ).with_columns(
+        pl.when(pl.int_range(pl.len()) % 17 == 0).then(None).otherwise(pl.col("predicted_beta")).alias("predicted_beta")
+    )
+
+
+def test_default_is_zscore(cross_section):
+    """Without a normalization section the score is the per-date z-score."""
+    result = normalize_signal(cross_section, "signal")
+    expected = cross_section.select(
+        ((pl.col("signal") - pl.col("signal").mean().over("date")) / pl.col("signal").std().over("date"))
+    ).to_series()
+    assert result["signal_score"].to_list() == expected.to_list()
+
+
+def test_rank_and_winsorize(cross_section):
+    """Ranks ignore monotone transforms, winsorized scores are re-standardized after clipping."""
+    ranked = normalize_signal(cross_section, "signal", {"rank": True})
+    cubed = normalize_signal(cross_section.with_columns(pl.col("signal") ** 3), "signal", {"rank": True})
+    np.testing.assert_allclose(ranked["signal_score"].to_numpy(), cubed["signal_score"].to_numpy())
+
+    clipped = normalize_signal(cross_section, "signal", {"winsorize": 2.0})
+    stats = clipped.group_by("date").agg(
+        pl.col("signal_score").mean().alias("mean"),
+        pl.col("signal_score").std().alias("std"),
+        pl.col("signal_score").abs().max().alias("max")
+    )
+    np.testing.assert_allclose(stats["mean"].to_numpy(), 0, atol=1e-12)
+    np.testing.assert_allclose(stats["std"].to_numpy(), 1)
+    assert (stats["max"] < 4).all()
+
+
+def test_neutralize_matches_least_squares(cross_section):
+    """The score is the standardized residual of the z-score on industry dummies and the exposures."""
+    settings = {"winsorize": 3.0, "neutralize": ["predicted_beta", "size"], "groups": "industry"}
+    result = normalize_signal(cross_section, "signal", settings)
+
+    assert result.columns == [*cross_section.columns, "signal_score"]
+    assert result.filter(pl.col("predicted_beta").is_null())["signal_score"].null_count() == (
+        cross_section["predicted_beta"].null_count()
+    )
+
+    for (date,), day in result.group_by("date"):
+        # the z-score uses the whole date, the regression only rows with every exposure
+        signal = day["signal"].to_numpy()
+        day = day.with_columns(pl.Series("z", np.clip((signal - signal.mean()) / signal.std(ddof=1), -3, 3)))
+        day = day.filter(pl.col("predicted_beta").is_not_null())
+        z = day["z"].to_numpy()
+        dummies = day["industry"].to_dummies().to_numpy().astype(float)
+        design = np.column_stack([dummies, day["predicted_beta"].to_numpy(), day["size"].to_numpy()])
+        residual = z - design @ np.linalg.lstsq(design, z, rcond=None)[0]
+        expected = (residual - residual.mean()) / residual.std(ddof=1)
+        np.testing.assert_allclose(day["signal_score"].to_numpy(), expected, atol=1e-10)
+
+
+def test_unknown_key_raises(cross_section):
+    """Misspelled normalization settings are rejected instead of ignored."""
+    with pytest.raises(ValueError, match="unknown normalization keys"):
+        normalize_signal(cross_section, "signal", {"winsorise": 3.0})
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Tests for panel.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src import panel as panel_module
+from src.panel import DateIndex, Panel, is_sorted_panel, sort_panel
+
+
+@pytest.fixture
+def long_frame() -> pl.DataFrame:
+    """Shuffled long panel with gaps in asset histories and a few null values."""
+    rng = np.random.default_rng(0)
+    n_dates, n_assets = 60, 7
+    dates = pl.date_range(dt.date(2024, 1, 1), dt.date(2024, 1, 1) + dt.timedelta(days=n_dates - 1), eager=True)
+    frame = pl.DataFrame(
+        {
+            "date": np.repeat(dates.to_numpy(), n_assets),
+            "barrid": np.tile([f"US{i}" for i in range(n_assets)], n_dates),
+            "x": rng.normal(100, 1, n_dates * n_assets),
+        }
+    ).sample(fraction=0.8, seed=1)
+    return frame.with_columns(
+        pl.when(pl.int_range(pl.len()) % 13 == 0).then(None).otherwise(pl.col("x")).alias("x")
+    ).sample(fraction=1.0, shuffle=True, seed=2)
+
+
+@pytest.mark.parametrize(
+    "method, kwargs, expected",
+    [
+        ("rolling_sum", {"window": 5, "min_periods": 3}, pl.col("x").rolling_sum(5, min_samples=3)),
+        ("rolling_mean", {"window": 5}, pl.col("x").rolling_mean(5)),
+        ("rolling_std", {"window": 10, "min_periods": 2}, pl.col("x").rolling_std(10, min_samples=2)),
+        ("shift", {"periods": 2}, pl.col("x").shift(2)),
+        ("shift", {"periods": -1}, pl.col("x").shift(-1)),
+    ],
+)
+def test_matches_long_frame_windows(long_frame, method, kwargs, expected, monkeypatch):
+    """Matrix kernels equal .over('barrid') on the date-sorted long frame, across blocks of assets."""
+    monkeypatch.setattr(panel_module, "BLOCK_COLUMNS", 3)
+    panel = Panel(long_frame, ["x"])
+    result = getattr(panel, method)(panel["x"], **kwargs)
+
+    got = long_frame.with_columns(panel.series("result", result)).sort(["barrid", "date"])
+    reference = long_frame.sort(["barrid", "date"]).with_columns(expected.over("barrid").alias("result"))
+    assert got["result"].is_null().to_list() == reference["result"].is_null().to_list()
+    np.testing.assert_allclose(
+        got["result"].drop_nulls().to_numpy(), reference["result"].drop_nulls().to_numpy(), rtol=1e-12
+    )
+
+
+def test_rolling_windows_in_one_pass(long_frame, monkeypatch):
+    """Several windows and lags of one column equal running each kernel and shift on its own."""
+    monkeypatch.setattr(panel_module, "BLOCK_COLUMNS", 3)
+    panel = Panel(long_frame, ["x"])
+    x = panel["x"]
+    results = panel.rolling(x, [("sum", 5, 3, 0), ("mean", 10, None, 2), ("std", 4, 2, 1)])
+
+    expected = [
+        panel.rolling_sum(x, 5, 3),
+        panel.shift(panel.rolling_mean(x, 10), 2),
+        panel.shift(panel.rolling_std(x, 4, 2), 1),
+    ]
+    for result, reference in zip(results, expected):
+        np.testing.assert_allclose(result, reference, rtol=1e-12)
+
+    with pytest.raises(ValueError, match="unknown rolling kernel"):
+        panel.rolling(x, [("median", 5, None, 0)])
+
+
+def test_by_asset_matches_sort(long_frame):
+    """Reading rows off the grid gives the (barrid, date) sort of the source frame."""
+    panel = Panel(long_frame, ["x"])
+    assert panel.by_asset(long_frame).equals(long_frame.sort(["barrid", "date"]))
+
+
+def test_categorical_and_string_dates():
+    """Categorical barrids and string dates index the same way as their sorted values."""
+    frame = pl.DataFrame(
+        {
+            "date": ["2024-01-03", "2024-01-02", "2024-01-02"],
+            "barrid": pl.Series(["USB", "USB", "USA"], dtype=pl.Categorical),
+            "x": [3.0, 2.0, 1.0],
+        }
+    )
+    panel = Panel(frame, ["x"])
+
+    assert panel.dates.to_list() == ["2024-01-02", "2024-01-03"]
+    assert panel.barrids.to_list() == ["USA", "USB"]
+    np.testing.assert_array_equal(panel["x"], [[1.0, 2.0], [np.nan, 3.0]])
+
+
+def test_duplicate_rows_raise():
+    """Two rows for the same (date, barrid) cannot share a cell."""
+    frame = pl.DataFrame({"date": [1, 1], "barrid": ["USA", "USA"], "x": [1.0, 2.0]})
+    with pytest.raises(ValueError, match="unique"):
+        Panel(frame, ["x"])
+
+
+def test_sort_panel_and_date_index(long_frame):
+    """Sorted frames are passed through, each date of a date-sorted frame is a slice of its rows."""
+    by_date = sort_panel(long_frame, "date")
+    assert by_date.equals(long_frame.sort(["date", "barrid"]))
+    assert sort_panel(by_date, "date") is by_date
+    assert not is_sorted_panel(by_date, "asset")
+    assert is_sorted_panel(long_frame.sort(["barrid", "date"]).with_columns(pl.col("barrid").cast(pl.Categorical)))
+
+    index = DateIndex(by_date)
+    assert index.counts().equals(by_date.group_by("date", maintain_order=True).len())
+    for date_, rows in index:
+        assert rows.equals(by_date.filter(pl.col("date") == date_))
+    first, last = index.dates[3], index.dates[7]
+    assert index.between(first, last).equals(by_date.filter(pl.col("date").is_between(first, last)))
+
+    with pytest.raises(ValueError, match="sorted by date"):
+        DateIndex(long_frame)
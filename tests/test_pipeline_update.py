@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests for the incremental update in pipeline.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+import yaml
+from polars.testing import assert_frame_equal
+
+from src import pipeline
+from src.alpha_store import read_alpha_artifact
+from src.weights_store import scan_sparse_weights
+
+
+@pytest.fixture
+def history() -> pl.DataFrame:
+    """Five assets over two months, one listing after the first run ended."""
+    rng = np.random.default_rng(0)
+    dates = pl.date_range(dt.date(2023, 1, 2), dt.date(2023, 2, 28), eager=True).to_list()
+    n = 5 * len(dates)
+    frame = pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in range(5)],
+            "barrid": [f"US{i}" for i in range(5)] * len(dates),
+            "return": rng.normal(0, 0.02, n),
+            "specific_risk": rng.uniform(0.1, 0.5, n),
+            "predicted_beta": rng.normal(1, 0.2, n),
+        }
+    )
+    late = (pl.col("barrid") == "US4") & (pl.col("date") < dt.date(2023, 2, 10))
+    return frame.filter(~late).sort(["barrid", "date"])
+
+
+def _write_config(path, end_date, results_path, rebalance="daily"):
+    config = {
+        "data_loading": {"start_date": "2023-01-02", "end_date": end_date},
+        "signal": {"name": "str", "type": "str", "window_size": 10},
+        "backtest": {"mode": "quick", "quick": {"portfolio": "alpha"}, "rebalance": rebalance},
+        "output": {"results_path": str(results_path)},
+    }
+    path.write_text(yaml.dump(config))
+    return str(path)
+
+
+@pytest.fixture
+def fake_source(history, monkeypatch):
+    """load_barra_data over the history, ending at the config's end_date."""
+    def load(config_path, start=None, end=None):
+        with open(config_path) as f:
+            data_config = yaml.safe_load(f)["data_loading"]
+        start = start or dt.date.fromisoformat(data_config["start_date"])
+        end = end or dt.date.fromisoformat(data_config["end_date"])
+        return history.filter(pl.col("date").is_between(start, end))
+
+    def returns(weights):
+        return weights.group_by("date").agg(pl.col("weight").sum().alias("return")).sort("date")
+
+    monkeypatch.setattr(pipeline, "load_barra_data", load)
+    monkeypatch.setattr(pipeline.sfp, "generate_returns_from_weights", returns)
+
+
+def test_update_matches_full_run(fake_source, tmp_path):
+    """Extending a finished run gives the artifacts of running the longer config from scratch."""
+    config_path = tmp_path / "str_10.yaml"
+    _write_config(config_path, "2023-02-15", tmp_path / "updated")
+    pipeline.main(str(config_path))
+    _write_config(config_path, "2023-02-28", tmp_path / "updated")
+    pipeline.update_run(str(config_path))
+
+    (tmp_path / "configs").mkdir()
+    pipeline.main(_write_config(tmp_path / "configs" / "str_10.yaml", "2023-02-28", tmp_path / "full"))
+
+    updated, full = tmp_path / "updated" / "str_10", tmp_path / "full" / "str_10"
+    assert_frame_equal(read_alpha_artifact(updated / "str_10_alphas"), read_alpha_artifact(full / "str_10_alphas"))
+    assert_frame_equal(
+        scan_sparse_weights(updated / "str_10_weights").collect(),
+        scan_sparse_weights(full / "str_10_weights").collect(),
+        rel_tol=1e-5
+    )
+    assert pl.read_parquet(updated / "str_10_returns.parquet")["date"].max() == dt.date(2023, 2, 28)
+
+
+def test_update_needs_daily_rebalance(fake_source, tmp_path):
+    """A monthly period running across the last stored date cannot be extended."""
+    config_path = _write_config(tmp_path / "str_10.yaml", "2023-02-28", tmp_path, rebalance="monthly")
+    with pytest.raises(ValueError, match="daily rebalancing"):
+        pipeline.update_run(config_path)
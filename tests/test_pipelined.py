@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Tests for pipelined.py"""
+
+import datetime as dt
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import polars as pl
+import pytest
+import yaml
+from polars.testing import assert_frame_equal
+
+from src import pipelined
+from src.data_loader import load_barra_data
+from src.pipelined import run_pipelined, segment_ranges
+from src.quick_backtester import run_quick_backtest
+from src.signal_loader import compute_alphas
+
+
+@pytest.fixture
+def history() -> pl.DataFrame:
+    """Six assets over three calendar years, one listing late and one with a stretch missing."""
+    rng = np.random.default_rng(0)
+    dates = pl.date_range(dt.date(2021, 11, 1), dt.date(2023, 2, 28), eager=True).to_list()
+    n = 6 * len(dates)
+    frame = pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in range(6)],
+            "barrid": [f"US{i}" for i in range(6)] * len(dates),
+            "return": rng.normal(0, 0.02, n),
+            "specific_risk": rng.uniform(0.1, 0.5, n),
+            "predicted_beta": rng.normal(1, 0.2, n),
+        }
+    )
+    gap = (pl.col("barrid") == "US1") & pl.col("date").is_between(dt.date(2021, 12, 20), dt.date(2022, 1, 20))
+    late = (pl.col("barrid") == "US5") & (pl.col("date") < dt.date(2022, 12, 30))
+    return frame.filter(~gap & ~late).sort(["barrid", "date"])
+
+
+@pytest.fixture
+def config_path(tmp_path) -> str:
+    path = tmp_path / "run.yaml"
+    path.write_text(yaml.dump({"data_loading": {"start_date": "2021-11-01", "end_date": "2023-02-28"}}))
+    return str(path)
+
+
+def test_segment_ranges():
+    """Segments are calendar years clipped to the requested range."""
+    assert segment_ranges(dt.date(2021, 11, 1), dt.date(2023, 2, 28)) == [
+        (dt.date(2021, 11, 1), dt.date(2021, 12, 31)),
+        (dt.date(2022, 1, 1), dt.date(2022, 12, 31)),
+        (dt.date(2023, 1, 1), dt.date(2023, 2, 28)),
+    ]
+
+
+@pytest.mark.parametrize("signal_config", [
+    {"name": "idio_vol", "type": "idio_vol", "window_size": 30, "min_periods": 10},
+    {"name": "str", "type": "str"},
+], ids=lambda config: config["type"])
+def test_matches_monolithic_run(history, config_path, signal_config, monkeypatch):
+    """Year segments give the alphas and weights of one run over the whole history."""
+    events = []
+
+    def fake_load(path, start, end, filtered=True):
+        events.append(("load", start, threading.current_thread().name))
+        return history.filter(pl.col("date").is_between(start, end))
+
+    def backtest(alpha_data):
+        events.append(("backtest", alpha_data["date"].min(), threading.current_thread().name))
+        return run_quick_backtest(alpha_data, signal_config["name"], portfolio="alpha", rebalance="monthly")
+
+    monkeypatch.setattr(pipelined, "load_barra_data", fake_load)
+    alphas, weights = run_pipelined(config_path, signal_config, backtest, rebalance="monthly")
+
+    expected_alphas = compute_alphas(history, signal_config)
+    assert_frame_equal(alphas, expected_alphas)
+    expected_weights = run_quick_backtest(expected_alphas, signal_config["name"], portfolio="alpha", rebalance="monthly")
+    assert_frame_equal(weights, expected_weights)
+
+    # loads run off the main thread, each one only reads its own year
+    assert [event[0] for event in events] == ["load", "load", "backtest", "load", "backtest", "backtest"]
+    assert all(name.startswith("prefetch") for kind, _, name in events if kind == "load")
+    assert events[1][1] == dt.date(2022, 1, 1)
+
+
+def test_load_overlaps_compute(history, config_path, monkeypatch):
+    """Wall-clock time is close to the slower of loading and computing, not their sum."""
+    def slow_load(path, start, end, filtered=True):
+        time.sleep(0.3)
+        return history.filter(pl.col("date").is_between(start, end))
+
+    def slow_backtest(alpha_data):
+        time.sleep(0.3)
+        return pl.DataFrame()
+
+    monkeypatch.setattr(pipelined, "load_barra_data", slow_load)
+    started = time.perf_counter()
+    run_pipelined(config_path, {"name": "str", "type": "str"}, slow_backtest)
+    # three segments: 1.8s run one after the other, 1.2s with the loads overlapped
+    assert time.perf_counter() - started < 1.6
+
+
+def test_weekly_rebalance_raises(config_path):
+    """Weeks spanning new year would be rebalanced in both segments."""
+    with pytest.raises(ValueError, match="pipelined execution"):
+        run_pipelined(config_path, {"name": "str", "type": "str"}, lambda alphas: alphas, rebalance="weekly")
+
+
+@pytest.mark.parametrize("gap", [None, (dt.date(2021, 11, 20), dt.date(2022, 1, 10))], ids=["", "gap_past_31_days"])
+def test_matches_monolithic_run_with_liquidity_filters(history, tmp_path, gap):
+    """
+    The lagged liquidity filter drops the first date in both modes, later years see their previous day
+    An asset whose previous observation is weeks before the new year is still lagged against it
+    """
+    if gap is not None:
+        history = history.filter(~((pl.col("barrid") == "US2") & pl.col("date").is_between(*gap)))
+    rng = np.random.default_rng(1)
+    source = history.with_columns(
+        pl.lit(10.0).alias("price"),
+        pl.Series("daily_volume", rng.uniform(1, 100, len(history))),
+        pl.Series("bid_ask_spread", rng.uniform(0.01, 0.1, len(history))),
+        # the source quotes returns and risk in percent
+        pl.col("return", "specific_risk") * 100,
+        pl.lit(0.0).alias("specific_return"),
+    )
+
+    def load_assets(start, end, columns, in_universe=None):
+        return source.filter(pl.col("date").is_between(start, end)).select(columns)
+
+    config_path = tmp_path / "filtered.yaml"
+    config_path.write_text(yaml.dump({
+        "data_loading": {
+            # the source has earlier dates, which only a padded first segment would see
+            "start_date": "2021-11-15", "end_date": "2023-02-28", "russell_filter": True, "columns": source.columns
+        },
+        "data_cleaning": {"filters": [{"usa_only": False, "dollar_volume_percentile": 0.3}]},
+    }))
+    signal_config = {"name": "str", "type": "str"}
+    # the filter leaves dates with two assets, whose beta-neutral book is rounding noise
+    backtest = lambda alpha_data: run_quick_backtest(
+        alpha_data, "str", portfolio="alpha", beta_neutral=False, rebalance="monthly"
+    )
+
+    with patch("src.data_loader.sfd.load_assets", side_effect=load_assets):
+        alphas, weights = run_pipelined(str(config_path), signal_config, backtest, rebalance="monthly")
+        expected_alphas = compute_alphas(load_barra_data(str(config_path)), signal_config)
+
+    assert_frame_equal(alphas, expected_alphas)
+    assert alphas["date"].min() == dt.date(2021, 11, 16)
+    assert_frame_equal(weights, backtest(expected_alphas))
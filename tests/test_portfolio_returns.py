@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Tests for portfolio_returns.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src import pipeline, portfolio_returns
+from src.portfolio_returns import stream_portfolio_returns
+from src.weights_store import write_sparse_weights
+
+
+@pytest.fixture
+def panel() -> tuple:
+    """Daily weights of a changing long-only book and the forward returns of every date."""
+    rng = np.random.default_rng(0)
+    dates = pl.date_range(dt.date(2024, 1, 1), dt.date(2024, 1, 12), eager=True).to_list()
+    barrids = [f"US{i}" for i in range(6)]
+    returns = pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in barrids],
+            "barrid": barrids * len(dates),
+            "fwd_return": rng.normal(0, 0.02, len(dates) * len(barrids)),
+        }
+    ).filter(~((pl.col("barrid") == "US2") & (pl.col("date") == dates[4])))
+    raw = rng.uniform(0, 1, (len(dates) - 2, len(barrids) - 1))
+    raw[raw < 0.4] = 0
+    weights = pl.DataFrame(
+        {
+            "date": [d for d in dates[:-2] for _ in barrids[:-1]],
+            "barrid": barrids[:-1] * (len(dates) - 2),
+            "weight": (raw / raw.sum(axis=1, keepdims=True)).ravel(),
+        }
+    ).filter(pl.col("weight") > 0)
+    return weights, returns
+
+
+def _loader(returns: pl.DataFrame, calls: list | None = None):
+    """load_returns over a frame, recording each requested range and its assets."""
+    def load(start, end, barrids):
+        if calls is not None:
+            calls.append((start, end, sorted(barrids)))
+        return returns.filter(pl.col("date").is_between(start, end) & pl.col("barrid").is_in(barrids))
+    return load
+
+
+def test_matches_dense_computation(panel, monkeypatch):
+    """Streaming in small chunks gives the dense same-date forward return and drifted-book turnover."""
+    weights, returns = panel
+    batches = pl.LazyFrame.collect_batches
+    monkeypatch.setattr(pl.LazyFrame, "collect_batches", lambda self, **kwargs: batches(self, chunk_size=3))
+    monkeypatch.setattr(portfolio_returns, "RETURN_CHUNK_DATES", 4)
+    calls = []
+
+    result = stream_portfolio_returns(
+        weights.lazy(), _loader(returns.sample(fraction=1.0, shuffle=True, seed=1), calls), cost_bps=10
+    )
+
+    # one load per chunk of weight dates, each for the held assets only, the ranges meet end to start
+    dates = weights["date"].unique().sort().to_list()
+    assert [(start, end) for start, end, _ in calls] == [(dates[0], dates[3]), (dates[3], dates[7]), (dates[7], dates[9])]
+    assert all("US5" not in barrids for _, _, barrids in calls)
+
+    dense = weights.join(returns, on=["date", "barrid"], how="left").with_columns(pl.col("fwd_return").fill_null(0.0))
+    expected = dense.group_by("date").agg((pl.col("weight") * pl.col("fwd_return")).sum().alias("return")).sort("date")
+    assert result["date"].to_list() == expected["date"].to_list()
+    np.testing.assert_allclose(result["return"].to_numpy(), expected["return"].to_numpy())
+
+    next_date = dict(zip(dates[:-1], dates[1:]))
+    drifted = dense.filter(pl.col("date") < dates[-1]).with_columns(
+        (pl.col("weight") * (1 + pl.col("fwd_return"))
+         / (1 + (pl.col("weight") * pl.col("fwd_return")).sum().over("date"))).alias("held"),
+        pl.col("date").replace_strict(next_date),
+    ).select("date", "barrid", "held")
+    turnover = weights.join(drifted, on=["date", "barrid"], how="full", coalesce=True).group_by("date").agg(
+        (pl.col("weight").fill_null(0) - pl.col("held").fill_null(0)).abs().sum().alias("turnover")
+    ).sort("date")
+    assert result["turnover"][0] == pytest.approx(1.0)
+    np.testing.assert_allclose(result["turnover"].to_numpy()[1:], turnover["turnover"].to_numpy()[1:])
+    np.testing.assert_allclose(result["net_return"], result["return"] - 0.001 * result["turnover"])
+
+
+def test_book_drifts_between_weight_dates(panel):
+    """A date without weights, like a failed solve, drifts the held book on and is not reported."""
+    weights, returns = panel
+    dates = weights["date"].unique().sort().to_list()
+    sparse = weights.filter(pl.col("date") != dates[2])
+
+    result = stream_portfolio_returns(sparse, _loader(returns))
+
+    assert result["date"].to_list() == dates[:2] + dates[3:]
+    held = weights.filter(pl.col("date") == dates[1]).select("barrid", "weight")
+    for date_ in dates[1:3]:
+        day = held.join(returns.filter(pl.col("date") == date_), on="barrid", how="left").fill_null(0.0)
+        period = (day["weight"] * day["fwd_return"]).sum()
+        held = day.select("barrid", (pl.col("weight") * (1 + pl.col("fwd_return")) / (1 + period)).alias("weight"))
+    traded = weights.filter(pl.col("date") == dates[3]).join(held, on="barrid", how="full", coalesce=True)
+    assert result["turnover"][2] == pytest.approx(
+        (traded["weight"].fill_null(0) - traded["weight_right"].fill_null(0)).abs().sum()
+    )
+
+
+def test_weights_off_calendar_raise(panel):
+    """Weights on a date the asset returns never cover cannot be priced."""
+    weights, returns = panel
+    missing = weights["date"].unique().sort()[3]
+    with pytest.raises(ValueError, match="no asset returns"):
+        stream_portfolio_returns(weights, _loader(returns.filter(pl.col("date") != missing)))
+    with pytest.raises(ValueError, match="no asset returns"):
+        stream_portfolio_returns(weights, _loader(returns.filter(pl.col("date") < missing)))
+
+
+def test_generate_returns_prices_held_assets_from_source(tmp_path, monkeypatch):
+    """The held assets are priced with the same date's forward return from the source."""
+    weights = pl.DataFrame({
+        "date": [dt.date(2024, 1, 2), dt.date(2024, 1, 2)],
+        "barrid": ["US0", "US1"],
+        "weight": [0.5, 0.5],
+    })
+    write_sparse_weights(weights, tmp_path / "weights")
+    source = pl.DataFrame({
+        "date": [dt.date(2024, 1, 2)] * 3 + [dt.date(2024, 1, 3)] * 3,
+        "barrid": ["US0", "US1", "US2"] * 2,
+        "fwd_return": [-0.4, 0.1, 0.9, 0.0, 0.0, 0.0],
+    })
+    requested = []
+
+    def fake_load(config_path, start, end, barrids):
+        requested.append((config_path, start, end, sorted(barrids)))
+        return source.filter(pl.col("date").is_between(start, end) & pl.col("barrid").is_in(barrids))
+
+    monkeypatch.setattr(pipeline, "load_asset_returns", fake_load)
+    returns = pipeline.generate_returns(weights, {"engine": "streaming"}, tmp_path / "weights", "run.yaml")
+
+    assert requested == [("run.yaml", dt.date(2024, 1, 2), dt.date(2024, 1, 2), ["US0", "US1"])]
+    assert returns["return"].to_list() == pytest.approx([0.5 * -0.4 + 0.5 * 0.1])
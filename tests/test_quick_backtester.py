@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Tests for quick_backtester.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src.quick_backtester import run_quick_backtest
+
+
+@pytest.fixture
+def panel() -> pl.DataFrame:
+    """Two dates of ten assets with spread-out alphas and betas."""
+    rng = np.random.default_rng(0)
+    dates = [dt.date(2024, 1, 2), dt.date(2024, 1, 3)]
+    n_assets = 10
+    return pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in range(n_assets)],
+            "barrid": [f"US{i:02d}" for i in range(n_assets)] * len(dates),
+            "test_signal_alpha": rng.normal(size=n_assets * len(dates)),
+            "predicted_beta": rng.uniform(0.5, 1.5, n_assets * len(dates)),
+            "return": rng.normal(scale=0.01, size=n_assets * len(dates)),
+        }
+    )
+
+
+def _book(weights: pl.DataFrame, panel: pl.DataFrame) -> pl.DataFrame:
+    """per-date long, short and beta exposure of a weights frame"""
+    return weights.join(panel, on=["date", "barrid"]).group_by("date").agg(
+        pl.col("weight").clip(lower_bound=0).sum().alias("long"),
+        pl.col("weight").clip(upper_bound=0).sum().alias("short"),
+        (pl.col("weight") * pl.col("predicted_beta")).sum().alias("beta"),
+    )
+
+
+@pytest.mark.parametrize("portfolio", ["quantile", "rank", "alpha"])
+def test_books_are_dollar_and_beta_neutral(panel, portfolio):
+    """Every portfolio type is 1 long / 1 short with no beta exposure."""
+    weights = run_quick_backtest(panel, "test_signal", portfolio=portfolio)
+
+    assert weights.columns == ["date", "barrid", "weight"]
+    book = _book(weights, panel)
+    np.testing.assert_allclose(book["long"], 1, atol=1e-12)
+    np.testing.assert_allclose(book["short"], -1, atol=1e-12)
+    np.testing.assert_allclose(book["beta"], 0, atol=1e-12)
+
+
+def test_quantile_legs_without_beta_neutral(panel):
+    """Top quintile is bought and bottom quintile sold, equally weighted, the rest is flat."""
+    weights = run_quick_backtest(panel, "test_signal", n_quantiles=5, beta_neutral=False)
+
+    day = weights.join(panel, on=["date", "barrid"]).filter(pl.col("date") == dt.date(2024, 1, 2))
+    ranked = day.sort("test_signal_alpha")["weight"].to_list()
+    assert ranked == pytest.approx([-0.5, -0.5] + [0.0] * 6 + [0.5, 0.5])
+
+
+def test_alpha_weights_follow_alpha(panel):
+    """Alpha-proportional books rank assets the same way the alphas do."""
+    weights = run_quick_backtest(panel, "test_signal", portfolio="alpha", beta_neutral=False)
+
+    joined = weights.join(panel, on=["date", "barrid"])
+    corr = joined.group_by("date").agg(pl.corr("weight", "test_signal_alpha"))["weight"]
+    np.testing.assert_allclose(corr, 1)
+
+
+def test_monthly_rebalance_drifts_weights(panel):
+    """Only the first date is formed from alphas, the second is the drifted book."""
+    daily = run_quick_backtest(panel, "test_signal", portfolio="rank")
+    monthly = run_quick_backtest(panel, "test_signal", portfolio="rank", rebalance="monthly")
+
+    first = dt.date(2024, 1, 2)
+    assert monthly.filter(pl.col("date") == first).equals(daily.filter(pl.col("date") == first))
+    assert not monthly.filter(pl.col("date") != first).equals(daily.filter(pl.col("date") != first))
+
+
+def test_unknown_portfolio(panel):
+    """Unknown portfolio types raise a ValueError."""
+    with pytest.raises(ValueError, match="unknown portfolio"):
+        run_quick_backtest(panel, "test_signal", portfolio="momentum")
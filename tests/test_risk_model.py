@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tests for risk_model.py"""
+
+import datetime as dt
+from unittest.mock import patch
+
+import numpy as np
+import polars as pl
+import pytest
+
+import sf_quant.data as sfd
+
+from src.risk_model import RiskModelStore, load_factor_model
+
+DATE = dt.date(2024, 1, 3)
+
+
+@pytest.fixture
+def fake_barra():
+    """
+    Barra tables in percent units, recording how often they are read
+    F3 is in the tables but not in sf_quant's factor list, like USSLOWL_NETRET
+    """
+    calls = []
+
+    def exposures(date_):
+        calls.append(date_)
+        return pl.DataFrame({
+            "date": [date_] * 3,
+            "barrid": ["USA", "USB", "USC"],
+            "F1": [1.0, 0.5, None],
+            "F2": [0.2, -0.3, 1.0],
+            "F3": [1.0, 1.0, 1.0],
+        })
+
+    def covariances(date_):
+        # upper triangle only, like the barra file
+        return pl.DataFrame({
+            "date": [date_] * 3,
+            "factor_1": ["F1", "F2", "F3"],
+            "F1": [400.0, None, None],
+            "F2": [100.0, 900.0, None],
+            "F3": [50.0, 50.0, 2500.0],
+        })
+
+    def assets(date_, in_universe, columns):
+        return pl.DataFrame({
+            "date": [date_] * 3,
+            "barrid": ["USA", "USB", "USD"],
+            "specific_risk": [20.0, 30.0, 40.0],
+        })
+
+    # sf_quant's covariance module holds its own references to the loaders and factor list
+    with patch("src.risk_model.sfd.load_exposures_by_date", side_effect=exposures), \
+            patch("src.risk_model.sfd.load_covariances_by_date", side_effect=covariances), \
+            patch("src.risk_model.sfd.load_assets_by_date", side_effect=assets), \
+            patch("src.risk_model.sfd.get_factor_names", return_value=["F1", "F2"]), \
+            patch("sf_quant.data.covariance_matrix.load_exposures_by_date", side_effect=exposures), \
+            patch("sf_quant.data.covariance_matrix.load_covariances_by_date", side_effect=covariances), \
+            patch("sf_quant.data.covariance_matrix.load_assets_by_date", side_effect=assets), \
+            patch("sf_quant.data.covariance_matrix.factors", ["F1", "F2"]):
+        yield calls
+
+
+def _dense_covariance(barrids):
+    """The same covariance written out by hand in decimal space."""
+    exposures = {"USA": [1.0, 0.2], "USB": [0.5, -0.3], "USC": [0.0, 1.0], "USD": [0.0, 0.0]}
+    specific = {"USA": 20.0, "USB": 30.0, "USC": 0.0, "USD": 40.0, "USX": 0.0}
+    B = np.array([exposures.get(b, [0.0, 0.0]) for b in barrids])
+    F = np.array([[400.0, 100.0], [100.0, 900.0]])
+    return (B @ F @ B.T + np.diag([specific[b] ** 2 for b in barrids])) / 100**2
+
+
+def test_covariance_matches_dense_construction(fake_barra, tmp_path):
+    """The stored components multiply out to the construct_covariance_matrix result."""
+    barrids = ["USA", "USB", "USC", "USD", "USX"]
+    store = RiskModelStore(str(tmp_path))
+
+    covariance = store.covariance_matrix(DATE, barrids)
+
+    assert covariance["barrid"].to_list() == barrids
+    # the store keeps float32
+    np.testing.assert_allclose(covariance.drop("barrid").to_numpy(), _dense_covariance(barrids), rtol=1e-6)
+
+
+def test_covariance_matches_sf_quant(fake_barra, tmp_path):
+    """The store serves what construct_covariance_matrix builds from the same tables, on its factor list."""
+    barrids = ["USA", "USB", "USC"]
+    expected = sfd.construct_covariance_matrix(DATE, barrids)
+
+    covariance = RiskModelStore(str(tmp_path)).covariance_matrix(DATE, barrids)
+
+    assert covariance.columns == expected.columns
+    np.testing.assert_allclose(covariance.drop("barrid").to_numpy(), expected.drop("barrid").to_numpy(), rtol=1e-6)
+
+
+def test_store_matches_direct_load(fake_barra, tmp_path):
+    """Components from the store equal the ones loaded straight from sf_quant."""
+    barrids = ["USB", "USA"]
+    direct = load_factor_model(DATE, barrids)
+    stored = RiskModelStore(str(tmp_path)).factor_model(DATE, barrids)
+
+    for expected, result in zip(direct, stored):
+        np.testing.assert_allclose(result, expected, rtol=1e-6)
+
+
+def test_store_holds_solved_assets(fake_barra, tmp_path):
+    """A date stores only the assets asked for, later assets are added as another float32 part."""
+    store = RiskModelStore(str(tmp_path))
+    store.factor_model(DATE, ["USB", "USA"])
+    store.factor_model(DATE, ["USC", "USA"])
+
+    parts = sorted((tmp_path / DATE.isoformat()).iterdir())
+    assert sorted(pl.read_parquet(part / "barrids.parquet")["barrid"].to_list() for part in parts) == [
+        ["USA", "USB"], ["USC"]
+    ]
+    assert np.load(parts[0] / "exposures.npy").dtype == np.float32
+    np.testing.assert_allclose(
+        store.covariance_matrix(DATE, ["USC", "USB"]).drop("barrid").to_numpy(),
+        _dense_covariance(["USC", "USB"]), rtol=1e-6
+    )
+
+
+def test_dates_are_built_once(fake_barra, tmp_path):
+    """A new store on the same path reads the date from disk without touching the source."""
+    RiskModelStore(str(tmp_path)).factor_model(DATE, ["USA", "USB"])
+    fake_barra.clear()
+
+    store = RiskModelStore(str(tmp_path))
+    store.factor_model(DATE, ["USA"])
+    store.covariance_matrix(DATE, ["USB"])
+
+    assert fake_barra == []
+    assert list(tmp_path.iterdir()) == [tmp_path / DATE.isoformat()]
+
+
+def test_lru_is_bounded(fake_barra, tmp_path):
+    """Only the most recently used dates stay open."""
+    store = RiskModelStore(str(tmp_path), max_dates=2)
+    dates = [DATE + dt.timedelta(days=i) for i in range(3)]
+    for date_ in dates:
+        store.load(date_, ["USA"])
+    store.load(dates[1], ["USA"])
+
+    assert list(store._dates) == [dates[2], dates[1]]
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Tests for the incremental path of signal_loader.py"""
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from src.alpha_store import read_alpha_artifact, write_alpha_artifact
+from src.signal_loader import compute_alphas, update_alphas
+from src.signals import SIGNALS, compute_signals, signal_expression, signal_lookback
+
+CONFIGS = [
+    {"name": "idio_vol", "type": "idio_vol", "window_size": 5, "min_periods": 3},
+    {"name": "str", "type": "str"},
+]
+
+
+@pytest.fixture
+def raw_data() -> pl.DataFrame:
+    """Forty dates of six assets, with one asset missing for a stretch and one entering late."""
+    rng = np.random.default_rng(0)
+    dates = pl.date_range(dt.date(2024, 1, 1), dt.date(2024, 2, 9), eager=True).to_list()
+    frame = pl.DataFrame(
+        {
+            "date": [d for d in dates for _ in range(6)],
+            "barrid": [f"US{i}" for i in range(6)] * len(dates),
+            "return": rng.normal(0, 0.02, 6 * len(dates)),
+            "specific_risk": rng.uniform(0.1, 0.5, 6 * len(dates)),
+        }
+    )
+    gap = (pl.col("barrid") == "US1") & pl.col("date").is_between(dt.date(2024, 1, 10), dt.date(2024, 2, 1))
+    late = (pl.col("barrid") == "US5") & (pl.col("date") < dt.date(2024, 2, 7))
+    return frame.filter(~gap & ~late).sort(["date", "barrid"])
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda config: config["type"])
+def test_update_matches_full_recompute(raw_data, config):
+    """Appending three dates gives the same rows as recomputing the whole history."""
+    split = dt.date(2024, 2, 7)
+    full = compute_alphas(raw_data, config).filter(pl.col("date") >= split)
+
+    artifact = compute_alphas(raw_data.filter(pl.col("date") < split), config)
+    updated = update_alphas(artifact, raw_data.filter(pl.col("date") >= split), config)
+
+    assert len(updated) == len(artifact) + len(full)
+    added = updated.filter(pl.col("date") >= split).sort(["date", "barrid"])
+    assert_frame_equal(added, full.sort(["date", "barrid"]))
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda config: config["type"])
+def test_update_asset_absent_from_recent_dates(raw_data, config):
+    """An asset missing from every date of the last lookback still continues its own history."""
+    split = dt.date(2024, 2, 7)
+    away = (pl.col("barrid") == "US3") & pl.col("date").is_between(dt.date(2024, 1, 8), split - dt.timedelta(days=1))
+    raw_data = raw_data.filter(~away)
+    full = compute_alphas(raw_data, config).filter(pl.col("date") >= split)
+
+    artifact = compute_alphas(raw_data.filter(pl.col("date") < split), config)
+    updated = update_alphas(artifact, raw_data.filter(pl.col("date") >= split), config)
+
+    added = updated.filter(pl.col("date") >= split).sort(["date", "barrid"])
+    assert_frame_equal(added, full.sort(["date", "barrid"]))
+
+
+def test_update_lazy_artifact_and_old_rows(raw_data):
+    """A scanned artifact stays lazy, rows it already has are not added again."""
+    config = CONFIGS[0]
+    split = dt.date(2024, 2, 5)
+    artifact = compute_alphas(raw_data.filter(pl.col("date") < split), config)
+
+    updated = update_alphas(artifact.lazy(), raw_data.filter(pl.col("date") >= dt.date(2024, 2, 1)), config)
+
+    assert isinstance(updated, pl.LazyFrame)
+    assert updated.collect()["date"].n_unique() == raw_data["date"].n_unique()
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda config: config["type"])
+def test_update_compact_artifact(raw_data, config, tmp_path):
+    """A stored artifact without the unused raw columns still takes new dates."""
+    raw_data = raw_data.with_columns(pl.lit(1.0).alias("predicted_beta"), pl.lit(10.0).alias("price"))
+    split = dt.date(2024, 2, 7)
+    write_alpha_artifact(compute_alphas(raw_data.filter(pl.col("date") < split), config), config["name"], tmp_path)
+    artifact = read_alpha_artifact(tmp_path)
+
+    updated = update_alphas(artifact, raw_data.filter(pl.col("date") >= split), config)
+
+    added = updated.filter(pl.col("date") >= split).sort(["date", "barrid"])
+    full = compute_alphas(raw_data, config).filter(pl.col("date") >= split).select(artifact.columns)
+    assert_frame_equal(added, full.sort(["date", "barrid"]), check_dtypes=False, rel_tol=1e-5)
+
+
+def test_update_requires_signal_inputs(raw_data):
+    """An artifact without the columns the signal reads cannot be continued."""
+    artifact = compute_alphas(raw_data, CONFIGS[0]).drop("specific_risk")
+    with pytest.raises(ValueError, match="missing signal inputs"):
+        update_alphas(artifact, raw_data.tail(1), CONFIGS[0])
+
+
+def test_fused_signals_match_single_runs(raw_data):
+    """Several signals and windows in one pass equal computing each on its own."""
+    configs = [
+        {"name": "idio_vol_5", "type": "idio_vol", "window_size": 5, "min_periods": 3},
+        {"name": "idio_vol_10", "type": "idio_vol", "window_size": 10, "min_periods": 3},
+        {"name": "str_5", "type": "str", "window_size": 5},
+        {"name": "str_22", "type": "str"},
+    ]
+    fused = compute_alphas(raw_data, configs)
+
+    assert fused.columns.count("log_return") == 1
+    for config in configs:
+        single = compute_alphas(raw_data, config)
+        name = config["name"]
+        assert_frame_equal(
+            fused.select("date", "barrid", name, f"{name}_alpha"),
+            single.select("date", "barrid", name, f"{name}_alpha"),
+        )
+
+
+def test_registry_metadata(raw_data):
+    """Config window_size, shift and direction override a signal's declared defaults."""
+    base = {"name": "vol", "type": "idio_vol", "window_size": 3}
+    declared = compute_alphas(raw_data, base)
+    flipped = compute_alphas(raw_data, {**base, "direction": 1, "shift": 0})
+
+    expected = declared.select(pl.col("specific_risk").rolling_mean(3).over("barrid"))["specific_risk"]
+    lagged = declared.select(-pl.col("specific_risk").rolling_mean(3).shift(2).over("barrid"))["specific_risk"]
+    assert flipped["vol"].to_list() == pytest.approx(expected.to_list(), nan_ok=True)
+    assert declared["vol"].to_list() == pytest.approx(lagged.to_list(), nan_ok=True)
+    assert signal_lookback(base) == 4
+
+
+def test_liquidity_signals(raw_data):
+    """cost and price_impact configs from the notebooks compute."""
+    data = raw_data.with_columns(
+        pl.lit(0.01).alias("bid_ask_spread"), pl.lit(20.0).alias("price"), pl.lit(1e5).alias("daily_volume")
+    )
+    result = compute_alphas(data, [
+        {"name": "cost_5", "type": "cost", "window_size": 5},
+        {"name": "price_impact_5", "type": "price_impact", "window_size": 5},
+    ])
+
+    assert result["cost_5"].drop_nulls().unique().to_list() == [0.01]
+    expected = raw_data.sort(["barrid", "date"]).select(
+        (pl.col("return").abs() / 2e6).rolling_mean(5).shift(2).over("barrid")
+    ).to_series()
+    assert result["price_impact_5"].to_list() == pytest.approx(expected.to_list(), nan_ok=True)
+
+
+@pytest.mark.parametrize("signal_type", sorted(SIGNALS))
+def test_panel_matches_long_frame_expression(raw_data, signal_type):
+    """Every registered signal computed on the panel equals its polars window over the long frame."""
+    data = raw_data.with_columns(
+        pl.col("specific_risk").alias("bid_ask_spread"), pl.lit(20.0).alias("price"),
+        (pl.col("specific_risk") * 1e5).alias("daily_volume")
+    ).sample(fraction=1.0, shuffle=True, seed=3)
+    config = {"name": "signal", "type": signal_type, "window_size": 5, "min_periods": 3}
+
+    result = compute_signals(data, [config])
+    shared = [pl.col("return").log1p().alias("log_return"), (pl.col("price") * pl.col("daily_volume")).alias("dollar_volume")]
+    expected = data.sort(["barrid", "date"]).with_columns(shared).with_columns(signal_expression(config))
+
+    assert result.select("date", "barrid").equals(expected.select("date", "barrid"))
+    assert result["signal"].to_list() == pytest.approx(expected["signal"].to_list(), nan_ok=True)
+
+
+def test_unknown_signal_type(raw_data):
+    """Types missing from the registry raise a ValueError."""
+    with pytest.raises(ValueError, match="unknown signal type"):
+        compute_alphas(raw_data, {"name": "x", "type": "momentum"})
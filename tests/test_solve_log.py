@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Tests for solve_log.py"""
+
+import datetime as dt
+
+import polars as pl
+import pytest
+
+from src.solve_log import print_solve_summary, read_solve_log, solve_frame, summarize_solves, write_solve_log
+
+
+@pytest.fixture
+def solves() -> pl.DataFrame:
+    """Three dates solved for two gammas, the third date's second gamma hitting the iteration limit."""
+    rows = [
+        (dt.date(2023, 1, 3), 2.0, 100, 0.5, 0.1, 50, "solved", 900.0),
+        (dt.date(2023, 1, 3), 20.0, 100, 0.5, 0.1, 40, "solved", 900.0),
+        (dt.date(2023, 1, 4), 2.0, 120, 0.5, 2.0, 400, "solved", 950.0),
+        (dt.date(2023, 1, 4), 20.0, 120, 0.5, 1.0, 300, "solved", 950.0),
+        (dt.date(2023, 1, 5), 2.0, 110, 0.5, 0.2, 60, "solved", 920.0),
+        (dt.date(2023, 1, 5), 20.0, 110, 0.5, 0.4, 20000, "maximum iterations reached", 920.0),
+    ]
+    return solve_frame(rows).with_columns(pl.lit(150, pl.UInt32).alias("universe"))
+
+
+def test_summary(solves):
+    """Dates rank by setup plus every gamma's solve time, failed solves are listed by gamma."""
+    summary = summarize_solves(solves, n_slowest=2)
+
+    assert summary["slowest"]["date"].to_list() == [dt.date(2023, 1, 4), dt.date(2023, 1, 5)]
+    assert summary["slowest"]["total_s"].to_list() == pytest.approx([3.5, 1.1])
+    assert summary["slowest"]["iterations"].to_list() == [700, 20060]
+    assert summary["failed"].select("date", "gamma").rows() == [(dt.date(2023, 1, 5), 20.0)]
+    assert summary["solve_s"] == pytest.approx(5.3)
+
+
+def test_summary_without_iterations(solves, capsys):
+    """sf_quant solves have no iteration counts, the summary leaves them out."""
+    print_solve_summary(solves.with_columns(pl.lit(None, pl.Int64).alias("iterations")), n_slowest=1)
+
+    out = capsys.readouterr().out
+    assert "2023-01-04: 3.50s, 120 alphas of 150 assets, 950 MB" in out
+    assert "2023-01-05 gamma 20: maximum iterations reached" in out
+
+
+def test_log_files(solves, tmp_path):
+    """Each backtest call adds a file named by its dates, the log reads back in date order."""
+    write_solve_log(solves.filter(pl.col("date") > dt.date(2023, 1, 3)), tmp_path)
+    write_solve_log(solves.filter(pl.col("date") == dt.date(2023, 1, 3)), tmp_path)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "solves_2023-01-03_2023-01-03.parquet", "solves_2023-01-04_2023-01-05.parquet"
+    ]
+    assert read_solve_log(tmp_path).equals(solves)
+
+
+def test_missing_log_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_solve_log(tmp_path)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Tests for the multi-config sweep in pipeline.py"""
+
+from unittest.mock import patch
+
+import polars as pl
+import pytest
+import yaml
+
+from src.pipeline import expand_config_paths, group_configs, run_sweep
+
+
+def _write_config(path, start_date, signal_name, results_path):
+    config = {
+        "data_loading": {"start_date": start_date, "end_date": "2023-01-05", "russell_filter": True},
+        "data_cleaning": {"filters": [{"usa_only": True}]},
+        "signal": {"name": signal_name, "type": "idio_vol"},
+        "backtest": {"constraints": ["FullInvestment"], "gamma": 400, "n_cpus": 1},
+        "output": {"results_path": str(results_path)},
+    }
+    path.write_text(yaml.dump(config))
+    return str(path)
+
+
+@pytest.fixture
+def sweep_configs(tmp_path):
+    """Two configs sharing a data section and one with a different universe window."""
+    results = tmp_path / "results"
+    return [
+        _write_config(tmp_path / "idio_vol_126.yaml", "2023-01-01", "idio_vol", results),
+        _write_config(tmp_path / "idio_vol_252.yaml", "2023-01-01", "idio_vol", results),
+        _write_config(tmp_path / "str_22.yaml", "2022-01-01", "str", results),
+    ]
+
+
+def test_group_configs_by_data_section(sweep_configs):
+    """Configs with identical data sections land in the same group."""
+    groups = sorted(group_configs(sweep_configs).values(), key=len)
+    assert groups == [[sweep_configs[2]], sweep_configs[:2]]
+
+
+def test_expand_config_paths_globs(sweep_configs, tmp_path):
+    """Glob patterns expand to sorted unique paths."""
+    paths = expand_config_paths([str(tmp_path / "idio_vol_*.yaml"), sweep_configs[0]])
+    assert paths == sweep_configs[:2]
+
+
+@patch("src.pipeline.sfp.generate_returns_from_weights")
+@patch("src.pipeline.run_mvo_backtest")
+@patch("src.pipeline.compute_alphas")
+@patch("src.pipeline.load_barra_data")
+def test_run_sweep_loads_once_per_group(mock_load, mock_alphas, mock_backtest, mock_returns, sweep_configs, tmp_path):
+    """Data loads once per group and each config writes its own results."""
+    frame = pl.DataFrame({"date": ["2023-01-04"], "barrid": ["US1"], "weight": [1.0]})
+    mock_load.return_value = frame
+    mock_alphas.return_value = frame
+    mock_backtest.return_value = frame
+    mock_returns.return_value = pl.DataFrame({"date": ["2023-01-04"], "return": [0.01]})
+
+    run_sweep(sweep_configs)
+
+    assert mock_load.call_count == 2
+    assert mock_alphas.call_count == 3
+    for name in ["idio_vol_126", "idio_vol_252", "str_22"]:
+        assert (tmp_path / "results" / name / f"{name}_weights" / "year=2023.parquet").exists()
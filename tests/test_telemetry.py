@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for telemetry.py"""
+
+import json
+import threading
+
+import numpy as np
+import polars as pl
+import pytest
+
+from src import telemetry
+from src.telemetry import run_report, stage
+
+
+@pytest.fixture
+def frame() -> pl.DataFrame:
+    return pl.DataFrame({"barrid": [f"US{i}" for i in range(1000)], "value": np.arange(1000.0)})
+
+
+def read_report(output_dir) -> dict:
+    return json.loads((output_dir / "telemetry" / "run_report.json").read_text())
+
+
+def test_records_stages(tmp_path, frame):
+    """Each stage gets its time, rows in and out, and frame sizes, in JSON and parquet."""
+    with run_report("run", tmp_path):
+        with stage("filter", frame) as timed:
+            timed.output(frame.head(10))
+        with stage("write"):
+            pass
+
+    report = read_report(tmp_path)
+    assert report["summary"]["run_name"] == "run"
+    assert [record["stage"] for record in report["stages"]] == ["filter", "write"]
+
+    filtered = report["stages"][0]
+    assert filtered["status"] == "done"
+    assert (filtered["rows_in"], filtered["rows_out"]) == (1000, 10)
+    assert filtered["mb_in"] == pytest.approx(frame.estimated_size("mb"))
+    assert filtered["wall_s"] >= 0 and filtered["cpu_s"] >= 0
+    assert filtered["peak_rss_delta_mb"] >= 0
+
+    table = pl.read_parquet(tmp_path / "telemetry" / "run_report.parquet")
+    assert table["stage"].to_list() == ["filter", "write"]
+    assert table["rows_out"].to_list() == [10, None]
+
+
+def test_peak_memory_of_stage(tmp_path):
+    """A stage that allocates and frees memory still reports its peak."""
+    with run_report("run", tmp_path):
+        with stage("allocate"):
+            block = np.ones(50_000_000)
+            threading.Event().wait(2 * telemetry.SAMPLE_INTERVAL)
+            del block
+
+    record = read_report(tmp_path)["stages"][0]
+    assert record["peak_rss_delta_mb"] > 300
+
+
+def test_failed_stage_is_reported(tmp_path):
+    """The report is written when the run fails, naming the stage it failed in."""
+    with pytest.raises(RuntimeError):
+        with run_report("run", tmp_path):
+            with stage("backtest"):
+                raise RuntimeError("solver failed")
+
+    assert [(record["stage"], record["status"]) for record in read_report(tmp_path)["stages"]] == [("backtest", "failed")]
+
+
+def test_running_stage_on_disk(tmp_path):
+    """A stage is on disk while it runs, so a killed job shows where it was."""
+    with run_report("run", tmp_path):
+        with stage("alpha"):
+            assert read_report(tmp_path)["stages"][0]["status"] == "running"
+
+
+def test_stage_outside_report(frame):
+    """Without an active report stages run their body and record nothing."""
+    with stage("signal", frame) as timed:
+        assert timed.output(frame) is frame
+
+
+def test_cprofile_dump(tmp_path):
+    """Each profiled stage run gets its own numbered dump, nested stages run in their parent's."""
+    with run_report("run", tmp_path, profile="cprofile"):
+        for _ in range(2):
+            with stage("backtest"):
+                with stage("inner"):
+                    sum(range(1000))
+
+    dumps = sorted(path.name for path in (tmp_path / "telemetry" / "profiles").iterdir())
+    assert dumps == ["000_backtest.prof", "001_backtest.prof"]
+
+
+def test_unknown_profiler_raises(tmp_path):
+    with pytest.raises(ValueError, match="unknown profiler"):
+        with run_report("run", tmp_path, profile="perf"):
+            pass
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Tests for weights_store.py"""
+
+import datetime as dt
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from src.weights_store import scan_sparse_weights, write_sparse_weights
+
+
+def test_sparse_round_trip(tmp_path):
+    """Tiny weights are dropped, each gamma scans back in date order across the year files."""
+    dates = [dt.date(2022, 12, 30), dt.date(2023, 1, 3)]
+    weights = pl.DataFrame(
+        {
+            "gamma": [10.0] * 4 + [20.0] * 4,
+            "date": [dates[1], dates[1], dates[0], dates[0]] * 2,
+            "barrid": ["USB", "USA"] * 4,
+            "weight": [0.6, 0.4, 1e-9, 1.0, 0.5, 0.5, 0.0, 1.0],
+        }
+    )
+
+    files = write_sparse_weights(weights, tmp_path / "weights")
+    assert [f.name for f in files] == ["year=2022.parquet", "year=2023.parquet"]
+
+    result = scan_sparse_weights(tmp_path / "weights", gamma=10.0).collect()
+    expected = pl.DataFrame({"date": [dates[0], dates[1], dates[1]], "barrid": ["USA", "USA", "USB"], "weight": [1.0, 0.4, 0.6]})
+    assert_frame_equal(result, expected)
+    assert scan_sparse_weights(tmp_path / "weights").collect().height == 6